@@ -1,9 +1,15 @@
 import os
 import sys
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, AnyHttpUrl, field_validator
-from typing import List, Dict, Optional
-import joblib
+import asyncio
+import base64
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, AnyHttpUrl, ValidationError, field_validator
+from typing import List, Dict, Literal, Optional
 
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,17 +17,176 @@ from fastapi.middleware.cors import CORSMiddleware
 # Add parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.tech_fingerprinter import detect_technologies
-from services.cve_lookup import find_cves_for_tech
+from services.tech_fingerprinter import detect_technologies_from_fetched
+from services.cve_lookup import (
+    match_rows, risk_summary, top_cves, register_risk_scorer, swap_risk_scorer, get_index, get_predicted_risk,
+)
+from services import model_registry
+from services.risk_scoring import score_cve_store
+
+from services.src_check import fetch_page_async, analyze_fetched_async, close_http_clients, warm_up as warm_up_page_analyser
+from services.browser_pool import PLAYWRIGHT_AVAILABLE, get_pool, shutdown_pool
+from services.analysis_pool import UNKNOWN_VERDICT, empty_page_metrics, shutdown_analysis_pool
+from services.scan_cache import RESULT_CACHE, normalize_url
+from services.blocklist import start_reloader as start_blocklist
+from services.scan_history import get_history
+from services.scan_jobs import JobQueue, QueueFull
+from services.net import hostname_of
+from services.metrics import STAGE_TIMEOUTS, PROFILER, render_prometheus, span, start_timings
+
+
+# Nothing heavy happens at import time: the model (and scikit-learn with it),
+# the CVE store and the page analyser are loaded by the warm-up task started in
+# lifespan, or on first use if a request gets there first.
+#   RISK_API_WARMUP=background  serve /healthz at once, warm up in the background (default)
+#   RISK_API_WARMUP=blocking    finish warming up before accepting requests
+#   RISK_API_WARMUP=off         load everything on first use
+WARMUP_MODE = os.environ.get("RISK_API_WARMUP", "background")
+
+# The model is whichever version services/model_registry.py marks current. A
+# daemon thread polls for a newly published one every RISK_MODEL_RELOAD_SECONDS
+# (0 = never) and swaps it in without a restart; see reload_model().
+MODEL_RELOAD_SECONDS = float(os.environ.get("RISK_MODEL_RELOAD_SECONDS", 30))
+
+_model = None        # (metadata, model), always replaced as a pair
+_model_stamp = None  # model_registry.current_stamp() as of the last load
+_model_lock = threading.Lock()
+_model_reloader = None
+
+def _load_model():
+    stamp = model_registry.current_stamp()
+    with span("model_load"):
+        return stamp, model_registry.load()
+
+def get_model():
+    global _model, _model_stamp
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model_stamp, _model = _load_model()
+    return _model[1]
+
+def model_info():
+    get_model()
+    return _model[0]
+
+def reload_model():
+    """Serve the current model version if it changed. Returns True if the model was swapped.
+
+    The new model scores the CVE store before it replaces the old one, so
+    requests never wait on the swap and in-flight ones finish on the old scores.
+    """
+    global _model, _model_stamp
+    if _model is None:
+        get_model()
+        return False
+    with _model_lock:
+        stamp = model_registry.current_stamp()
+        if stamp == _model_stamp:
+            return False
+        # a broken version is reported once, not on every poll
+        _model_stamp = stamp
+        stamp, loaded = _load_model()
+        if loaded[0]["version"] == _model[0]["version"]:
+            return False
+        swap_risk_scorer(lambda store, model=loaded[1]: score_cve_store(model, store))
+        _model, _model_stamp = loaded, stamp
+    print(f"[INFO] Serving risk model version {loaded[0]['version']}")
+    return True
+
+def _model_reload_loop():
+    while True:
+        time.sleep(MODEL_RELOAD_SECONDS)
+        try:
+            reload_model()
+        except Exception as e:
+            print(f"[WARN] Risk model reload failed: {str(e)}")
 
-from services.Page_Source_Analyser import scan_page
+def start_model_reloader():
+    """Load the model now and keep it in sync with the registry from a daemon thread."""
+    global _model_reloader
+    get_model()
+    if _model_reloader is None and MODEL_RELOAD_SECONDS > 0:
+        _model_reloader = threading.Thread(target=_model_reload_loop, name="model-reload", daemon=True)
+        _model_reloader.start()
 
+# Score every CVE once (when the store is first opened); per-request scoring is then just a column read
+register_risk_scorer(lambda store: score_cve_store(get_model(), store))
+
+# Per-stage timeouts (seconds)
+PAGE_FETCH_TIMEOUT = 30
+TECH_DETECT_TIMEOUT = 5
+CVE_LOOKUP_TIMEOUT = 10
+PAGE_ANALYZE_TIMEOUT = 15
+
+# /analyze/batch limits
+BATCH_MAX_URLS = 10000
+BATCH_CONCURRENCY = 16
+BATCH_PER_HOST_CONCURRENCY = 2
+BATCH_PER_HOST_INTERVAL = 0.5  # seconds between scans of the same host
+BATCH_BUFFERED_RESULTS = 2 * BATCH_CONCURRENCY  # finished lines held for a slow reader
+
+# Vulnerabilities in an /analyze response; the rest are paged through GET /vulnerabilities
+TOP_VULNERABILITIES = 10
+VULNERABILITY_PAGE_MAX = 500
+
+# /scans job mode: longest ?wait= long-poll, in seconds
+SCAN_MAX_WAIT = 60
+
+# /debug/profiler/* (runtime sampling profiler) is only mounted when this is set
+PROFILER_ENDPOINTS = os.environ.get("RISK_API_PROFILER_ENDPOINTS") == "1"
+
+# ---------- Startup ----------
+
+# Warm-up steps in order; /readyz reports which ones have finished
+WARMUP_STEPS = {
+    "model": start_model_reloader,
+    "cve_index": get_index,
+    "cve_scores": get_predicted_risk,
+    "page_analyser": warm_up_page_analyser,
+    "blocklist": start_blocklist,
+}
+READINESS = {"ready": False, "done": [], "error": None}
+
+def _start_browser_pool():
+    # The API process owns the shared browser pool: start it with the app, close it on shutdown
+    if PLAYWRIGHT_AVAILABLE:
+        try:
+            get_pool().start()
+        except Exception as e:
+            print(f"Browser pool failed to start, will retry on first render: {str(e)}")
+
+async def _warm_up():
+    try:
+        for name, step in WARMUP_STEPS.items():
+            await asyncio.to_thread(step)
+            READINESS["done"].append(name)
+        await asyncio.to_thread(_start_browser_pool)
+        READINESS["ready"] = True
+    except Exception as e:
+        # requests still load whatever is missing on first use; readiness stays false
+        READINESS["error"] = str(e)
+        print(f"Warm-up failed: {str(e)}")
 
-# Update model path to be relative to script location
-MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "risk_model.joblib")
-model = joblib.load(MODEL_PATH)
+@asynccontextmanager
+async def lifespan(app):
+    task = None
+    if WARMUP_MODE == "blocking":
+        await _warm_up()
+    elif WARMUP_MODE == "background":
+        task = asyncio.create_task(_warm_up())
+    else:
+        READINESS["ready"] = True
+    SCAN_JOBS.start()
+    yield
+    await SCAN_JOBS.stop()
+    if task is not None:
+        task.cancel()
+    await asyncio.to_thread(shutdown_pool)
+    shutdown_analysis_pool()
+    await close_http_clients()
 
-app = FastAPI(title="Cyber Risk Scoring API")
+app = FastAPI(title="Cyber Risk Scoring API", lifespan=lifespan)
 
 class URLRequest(BaseModel):
     url: str
@@ -35,89 +200,446 @@ class URLRequest(BaseModel):
 
 class VulnerabilityResponse(BaseModel):
     cve_id: str
-    cvss_score: float
-    exploitability_score: float
-    severity: str
+    cvss_score: Optional[float] = None  # null for CVEs without CVSS v3 metrics
+    exploitability_score: Optional[float] = None
+    severity: Optional[str] = None
     description: str
     tech: str
-    predicted_risk: float
+    predicted_risk: Optional[float] = None  # null for CVEs the risk model couldn't score
 
 class AnalysisResponse(BaseModel):
     url: str
     status: str
+    message: Optional[str] = None
     technologies: List[str]
     overall_risk_score: float  # New field
+    vulnerabilities: List[VulnerabilityResponse]  # the TOP_VULNERABILITIES highest-risk ones
+    vulnerability_count: int = 0
+    next_cursor: Optional[str] = None  # GET /vulnerabilities?cursor=... for the rest
+    page_scanner: Optional[Dict] = None
+    timings: Optional[Dict[str, float]] = None  # per-stage ms, only with ?timings=true
+
+class VulnerabilityPage(BaseModel):
+    technologies: List[str]
+    total: int
     vulnerabilities: List[VulnerabilityResponse]
+    next_cursor: Optional[str] = None
 
-@app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_url(request: URLRequest):
+class ScanRequest(URLRequest):
+    priority: Literal["high", "normal", "low"] = "normal"
+
+class BatchRequest(BaseModel):
+    urls: List[str]
+
+async def _detect_technologies(fetched):
+    """Stage 2a: fingerprint techs from the page we already fetched."""
     try:
-        url = request.url
-        techs = detect_technologies(url)
-        
-        if not techs:
-            return {
-                "url": url,
-                "status": "warning",
-                "overall_risk_score": 0.0,
-                "message": "No technologies detected",
-                "technologies": [],
-                "vulnerabilities": [], 
-                "page_scanner": scan_page(url)
-            }
-
-        all_results = []
-        total_risk = 0.0
-        vuln_count = 0
-
-        # Step 2: For each tech, lookup CVEs
-        for tech in techs:
-            try:
-                vulns = find_cves_for_tech(tech)
-                for v in vulns:
-                    risk = float(model.predict([
-                        [
-                            float(v.get("cvss_score", 0)), 
-                            float(v.get("exploitability_score", 0))
-                        ]
-                    ])[0])
-                    v["predicted_risk"] = risk
-                    v["tech"] = tech
-                    all_results.append(v)
-                    total_risk += risk
-                    vuln_count += 1
-            except Exception as e:
-                print(f"Error processing tech {tech}: {str(e)}")
-                continue
-
-        # Calculate overall risk score
-        overall_risk = total_risk / vuln_count if vuln_count > 0 else 0.0
-        print("   ")
-        print("   ")
-        print("   ")
-        print("   ")
-        print("   ")
-        print(url)
-        scanner_result = scan_page(url)
-        return {
+        with span("tech_detect"):
+            return await asyncio.wait_for(asyncio.to_thread(detect_technologies_from_fetched, fetched), TECH_DETECT_TIMEOUT)
+    except asyncio.TimeoutError:
+        STAGE_TIMEOUTS.inc(stage="tech_detect")
+        print(f"Technology detection timed out for {fetched['final_url']}")
+        return []
+
+async def _lookup_cves(fetched, lookup=match_rows):
+    """Stage 2a+3: detect techs, then find their CVEs' row ids. Runs alongside page analysis."""
+    techs = await _detect_technologies(fetched)
+    if not techs:
+        return techs, {}
+    with span("cve_lookup"):
+        rows_by_tech = await asyncio.wait_for(asyncio.to_thread(lookup, techs), CVE_LOOKUP_TIMEOUT)
+    return techs, rows_by_tech
+
+def _no_analysis():
+    # same shape as analyze_html's result, so clients can render a scan that has none
+    return {
+        "verdict": UNKNOWN_VERDICT,
+        "score": 0,
+        "score_factors": {},
+        "raw_findings_count": 0,
+        "findings": [],
+        "page_metrics": empty_page_metrics(),
+    }
+
+async def _scan_page(url, fetched):
+    """Stage 2b: analyze page source."""
+    try:
+        with span("page_analysis"):
+            return await analyze_fetched_async(url, fetched, PAGE_ANALYZE_TIMEOUT)
+    except asyncio.TimeoutError:
+        STAGE_TIMEOUTS.inc(stage="page_analysis")
+        return {"url_submitted": url, "final_url": fetched['final_url'], "error": "Page analysis timed out",
+                "analysis": _no_analysis()}
+
+def _encode_cursor(techs, after):
+    data = json.dumps({"techs": techs, "after": list(after)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor):
+    """(techs, sort key of the last vulnerability already returned)."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        risk, row, tech = data["after"]
+        return [str(t) for t in data["techs"]], (float(risk), int(row), str(tech))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _vulnerability_page(techs, rows_by_tech, limit, after=None):
+    """(page of the techs' CVEs, highest risk first; cursor for the next page or None)."""
+    vulnerabilities, last, remaining = top_cves(rows_by_tech, limit, after)
+    next_cursor = _encode_cursor(techs, last) if remaining > len(vulnerabilities) else None
+    return vulnerabilities, next_cursor
+
+def _top_vulnerabilities(techs, rows_by_tech):
+    total_risk, vuln_count = risk_summary(rows_by_tech)
+    vulnerabilities, next_cursor = _vulnerability_page(techs, rows_by_tech, TOP_VULNERABILITIES)
+    return total_risk, vuln_count, vulnerabilities, next_cursor
+
+async def _analyze(url, lookup=match_rows):
+    """Full /analyze pipeline for one URL. Raises asyncio.TimeoutError if the fetch times out."""
+    cache_key = "analyze:" + normalize_url(url)
+    cached = RESULT_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Stage 1: fetch the page once for both fingerprinting and analysis
+    try:
+        with span("fetch"):
+            fetched = await fetch_page_async(url, PAGE_FETCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        STAGE_TIMEOUTS.inc(stage="fetch")
+        raise
+    (techs, rows_by_tech), scanner_result = await asyncio.gather(
+        _lookup_cves(fetched, lookup),
+        _scan_page(url, fetched),
+    )
+    
+    if not techs:
+        response = {
             "url": url,
-            "status": "success",
-            "technologies": techs,
-            "overall_risk_score": round(overall_risk, 2),
-            "vulnerabilities": sorted(
-                all_results[:10], 
-                key=lambda x: x["predicted_risk"], 
-                reverse=True
-            ) ,
+            "status": "warning",
+            "overall_risk_score": 0.0,
+            "message": "No technologies detected",
+            "technologies": [],
+            "vulnerabilities": [], 
+            "vulnerability_count": 0,
             "page_scanner": scanner_result
         }
+        if "error" not in scanner_result:
+            RESULT_CACHE.set(cache_key, response)
+        return response
+
+    # Stage 4: rank on row ids and the risk column; only the top CVEs become records
+    with span("cve_rank"):
+        total_risk, vuln_count, vulnerabilities, next_cursor = await asyncio.to_thread(
+            _top_vulnerabilities, techs, rows_by_tech)
+
+    # Calculate overall risk score
+    overall_risk = total_risk / vuln_count if vuln_count > 0 else 0.0
+    response = {
+        "url": url,
+        "status": "success",
+        "technologies": techs,
+        "overall_risk_score": round(overall_risk, 2),
+        "vulnerabilities": vulnerabilities,
+        "vulnerability_count": vuln_count,
+        "next_cursor": next_cursor,
+        "page_scanner": scanner_result
+    }
+    if "error" not in scanner_result:
+        RESULT_CACHE.set(cache_key, response)
+    return response
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: model, CVE data and page analyser are loaded."""
+    if not READINESS["ready"]:
+        raise HTTPException(status_code=503, detail=READINESS)
+    return READINESS
 
+@app.get("/model")
+async def model_version():
+    """Metadata of the risk model version being served."""
+    return await asyncio.to_thread(model_info)
+
+@app.post("/model/reload")
+async def reload_model_version():
+    """Switch to the current model version now instead of at the next poll."""
+    try:
+        swapped = await asyncio.to_thread(reload_model)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load model: {str(e)}")
+    return {"swapped": swapped, "model": model_info()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of stage latencies and scan counters."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/analyze", response_model=AnalysisResponse)
+async def analyze_url(request: URLRequest, timings: bool = False):
+    """Analyze one URL. With ?timings=true the response includes per-stage times in ms."""
+    stage_timings = start_timings()
+    try:
+        with span("analyze"):
+            result = await _analyze(request.url)
+        # cached results are shared, so attach the timings to a copy
+        return {**result, "timings": stage_timings} if timings else result
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Timed out fetching {request.url}")
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error analyzing URL: {str(e)}"
         )
 
+@app.get("/vulnerabilities", response_model=VulnerabilityPage)
+async def list_vulnerabilities(tech: List[str] = Query(default=[]), cursor: Optional[str] = None, limit: int = 50):
+    """All CVEs matching the given techs, highest risk first, one page at a time.
+
+    Start with ?tech=...&tech=... or with the next_cursor of an /analyze
+    response; each page's next_cursor continues from where it stopped.
+    """
+    if not 1 <= limit <= VULNERABILITY_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {VULNERABILITY_PAGE_MAX}")
+    techs, after = _decode_cursor(cursor) if cursor else (list(dict.fromkeys(tech)), None)
+    if not techs:
+        raise HTTPException(status_code=400, detail="Pass at least one tech or a cursor")
+
+    def page():
+        rows_by_tech = match_rows(techs)
+        vulnerabilities, next_cursor = _vulnerability_page(techs, rows_by_tech, limit, after)
+        total = sum(len(rows) for rows in rows_by_tech.values())
+        return {"technologies": techs, "total": total, "vulnerabilities": vulnerabilities,
+                "next_cursor": next_cursor}
+
+    with span("cve_page"):
+        return await asyncio.to_thread(page)
+
+@app.get("/history")
+async def scan_history(domain: str, since: Optional[float] = None, until: Optional[float] = None, limit: int = 100):
+    """Earlier page scans of a registered domain (newest first); since/until are epoch seconds."""
+    history = get_history()
+    if history is None:
+        raise HTTPException(status_code=404, detail="Scan history is disabled")
+    domain = domain.strip().lower()
+    scans = await asyncio.to_thread(history.domain_scans, domain, since, until, min(max(limit, 1), 1000))
+    first_seen = await asyncio.to_thread(history.first_seen, domain)
+    return {"domain": domain, "first_seen": first_seen, "scans": scans}
+
+# ---------- Scan jobs ----------
+
+async def _run_scan_job(url):
+    try:
+        with span("analyze"):
+            result = await _analyze(url)
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"Timed out fetching {url}")
+    return AnalysisResponse.model_validate(result).model_dump(mode="json")
+
+SCAN_JOBS = JobQueue(_run_scan_job)
+
+def _job_links(job):
+    return {"self": f"/scans/{job.id}", "events": f"/scans/{job.id}/events"}
+
+def _get_job(job_id):
+    job = SCAN_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired scan job")
+    return job
+
+@app.post("/scans", status_code=202)
+async def submit_scan(request: ScanRequest, response: Response):
+    """Queue a scan and return its job id at once; a URL already queued or running joins that job."""
+    try:
+        job, attached = SCAN_JOBS.submit(request.url, request.priority)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["Location"] = _job_links(job)["self"]
+    return {**job.to_dict(), "attached": attached, "links": _job_links(job)}
+
+@app.get("/scans/{job_id}")
+async def get_scan(job_id: str, wait: float = 0):
+    """Job status, with the AnalysisResponse once done. ?wait=N long-polls up to N seconds for the result."""
+    job = _get_job(job_id)
+    if wait > 0 and not job.finished:
+        await job.wait(min(wait, SCAN_MAX_WAIT))
+    return {**job.to_dict(), "links": _job_links(job)}
+
+@app.get("/scans/{job_id}/events")
+async def scan_events(job_id: str):
+    """Server-Sent Events: one event per status change (queued, running, done/failed), then the stream ends."""
+    job = _get_job(job_id)
+
+    async def stream():
+        async for event in job.events():
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['status']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+if PROFILER_ENDPOINTS:
+    @app.post("/debug/profiler/start")
+    async def start_profiler(interval: float = 0.01):
+        """Start sampling every thread's stack every `interval` seconds."""
+        if interval <= 0:
+            raise HTTPException(status_code=400, detail="interval must be positive")
+        if not PROFILER.start(interval):
+            raise HTTPException(status_code=409, detail="Profiler already running")
+        return {"status": "started", "interval": interval}
+
+    @app.post("/debug/profiler/stop", response_class=PlainTextResponse)
+    async def stop_profiler():
+        """Stop the profiler; returns collapsed stacks for flamegraph.pl / speedscope."""
+        if not PROFILER.running:
+            raise HTTPException(status_code=409, detail="Profiler not running")
+        return PlainTextResponse(await asyncio.to_thread(PROFILER.stop))
+
+# ---------- Batch scanning ----------
+
+class _BatchCVELookup:
+    """match_rows memoized for one batch, so each tech is looked up once."""
+
+    def __init__(self):
+        self._by_tech = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, techs):
+        with self._lock:
+            missing = [t for t in techs if t not in self._by_tech]
+        if missing:
+            found = match_rows(missing)
+            with self._lock:
+                self._by_tech.update(found)
+        with self._lock:
+            return {t: self._by_tech.get(t, []) for t in techs}
+
+class _HostLimiter:
+    """Per-host concurrency cap plus a minimum gap between request starts."""
+
+    def __init__(self, per_host, interval):
+        self.per_host = per_host
+        self.interval = interval
+        self._slots = {}
+        self._next_start = {}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        host = hostname_of(url)
+        sem = self._slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with sem:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+def _parse_url_list(text):
+    """One URL per line; blank lines and # comments are skipped."""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return urls
+
+async def _read_batch_urls(request: Request):
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            payload = BatchRequest.model_validate(await request.json())
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=json.loads(e.json(include_url=False)))
+        urls = payload.urls
+    elif content_type.startswith("multipart/form-data"):
+        # needs python-multipart, like any FastAPI upload
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Expected a 'file' field with one URL per line")
+        urls = _parse_url_list((await upload.read()).decode("utf-8", "replace"))
+    else:
+        urls = _parse_url_list((await request.body()).decode("utf-8", "replace"))
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if len(urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+    # normalize up front: once the NDJSON stream has started, a bad URL can only truncate it
+    entries, errors = [], []
+    for i, u in enumerate(urls):
+        url = URLRequest(url=u).url
+        try:
+            entries.append((normalize_url(url), url))
+        except ValueError as e:
+            errors.append({"type": "url_parsing", "loc": ["urls", i], "msg": f"Invalid URL: {str(e)}", "input": u})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return entries
+
+async def _batch_lines(entries):
+    """NDJSON lines for [(normalized url, url)] from _read_batch_urls."""
+    # duplicates (after normalization) are scanned once and answered for every submission
+    submitted = {}
+    for key, url in entries:
+        submitted.setdefault(key, []).append(url)
+
+    pending = asyncio.Queue()
+    for key, originals in submitted.items():
+        pending.put_nowait((key, originals[0]))
+    # bounded, so workers wait instead of piling up results the client hasn't read yet
+    done = asyncio.Queue(maxsize=BATCH_BUFFERED_RESULTS)
+    lookup = _BatchCVELookup()
+    limiter = _HostLimiter(BATCH_PER_HOST_CONCURRENCY, BATCH_PER_HOST_INTERVAL)
+
+    async def worker():
+        while True:
+            try:
+                key, url = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                async with limiter.slot(url):
+                    result = await _analyze(url, lookup)
+                line = AnalysisResponse.model_validate(result).model_dump_json()
+            except asyncio.TimeoutError:
+                line = json.dumps({"url": url, "status": "error", "detail": f"Timed out fetching {url}"})
+            except Exception as e:
+                line = json.dumps({"url": url, "status": "error", "detail": f"Error analyzing URL: {str(e)}"})
+            await done.put((key, line))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(BATCH_CONCURRENCY, len(submitted)))]
+    try:
+        for _ in range(len(submitted)):
+            key, line = await done.get()
+            for _ in submitted[key]:
+                yield line + "\n"
+    finally:
+        # client went away or we're done: stop any workers still running
+        for w in workers:
+            w.cancel()
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: Request):
+    """Analyze many URLs; streams one AnalysisResponse per line (NDJSON) as each finishes.
+
+    Body: {"urls": [...]}, a plain-text list (one URL per line), or a
+    multipart upload with a `file` field.
+    """
+    entries = await _read_batch_urls(request)
+    return StreamingResponse(_batch_lines(entries), media_type="application/x-ndjson")
+
 
 app.add_middleware(
     CORSMiddleware,
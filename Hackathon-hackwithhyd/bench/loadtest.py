@@ -0,0 +1,217 @@
+"""
+loadtest.py
+
+Offline end-to-end load test of the risk API.
+
+Starts the fake site corpus (fake_sites.py) and a synthetic CVE store, then for
+each worker count launches `uvicorn api.risk_api:app --workers N`, waits for
+/readyz and drives POST /analyze at a fixed arrival rate (open loop: requests
+are sent on schedule whether or not earlier ones finished, and latency is
+measured from the scheduled send time so queueing shows up in the tail).
+
+Every URL points at the local corpus, so fetching, fingerprinting, CVE lookup
+and page analysis all run for real, without touching the internet. The
+corpus pages reference third-party scripts and iframes, so a launched API has
+external resource checks turned off (PAGE_SCANNER_MAX_RESOURCES=0).
+
+Usage:
+    python bench/loadtest.py --workers 1 2 4 --rate 20 --duration 30
+    python bench/loadtest.py --rate 50 --site-latency-ms 100 --cache-bust
+    python bench/loadtest.py --api-url http://127.0.0.1:8000 --rate 10   # an API you started yourself
+                                                                         # (with PAGE_SCANNER_MAX_RESOURCES=0)
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from bench.fake_sites import KINDS, corpus_urls, start_server
+from bench.generators import write_cve_dataset
+
+DATA_DIR = os.path.join(tempfile.gettempdir(), "risk_api_bench")
+READY_TIMEOUT = 120      # seconds to wait for the API to warm up
+REQUEST_TIMEOUT = 60
+MAX_IN_FLIGHT = 256
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+# ---------- API process ----------
+
+def start_api(workers, cve_csv, cve_store, port=None):
+    """Launch uvicorn with `workers` processes; returns (process, base_url) once ready."""
+    port = port or _free_port()
+    # the corpus links scripts/iframes on real hosts; keep the API from downloading them
+    env = dict(os.environ, CVE_DATA_PATH=cve_csv, CVE_STORE_PATH=cve_store, RISK_API_WARMUP="blocking",
+               PAGE_SCANNER_MAX_RESOURCES="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.risk_api:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    wait_ready(base_url, proc, consecutive=3 * workers)
+    return proc, base_url
+
+
+def wait_ready(base_url, proc=None, consecutive=3, timeout=READY_TIMEOUT):
+    # several workers share the port, so require a run of ready answers
+    deadline, streak = time.time() + timeout, 0
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"API exited with code {proc.returncode} during startup")
+        try:
+            streak = streak + 1 if requests.get(base_url + "/readyz", timeout=2).ok else 0
+        except requests.RequestException:
+            streak = 0
+        if streak >= consecutive:
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"API at {base_url} not ready after {timeout}s")
+
+
+def stop_api(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ---------- Load generation ----------
+
+def drive(api_url, urls, rate, duration, cache_bust=False, max_in_flight=MAX_IN_FLIGHT):
+    """Send POST /analyze at `rate`/s for `duration` seconds; returns the run's stats."""
+    local = threading.local()
+    results = []  # (latency seconds, outcome)
+    results_lock = threading.Lock()
+
+    def send(i, scheduled):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        url = urls[i % len(urls)]
+        if cache_bust:
+            url += f"?r={i}"
+        try:
+            r = session.post(api_url + "/analyze", json={"url": url}, timeout=REQUEST_TIMEOUT)
+            outcome = "ok" if r.ok else f"http_{r.status_code}"
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        with results_lock:
+            results.append((time.perf_counter() - scheduled, outcome))
+
+    pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="loadgen")
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    sent = 0
+    while True:
+        scheduled = start + sent * interval
+        if scheduled - start >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pool.submit(send, sent, scheduled)
+        sent += 1
+    pool.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+
+    outcomes = Counter(outcome for _, outcome in results)
+    ok_latencies = sorted(lat for lat, outcome in results if outcome == "ok")
+    ms = lambda v: None if v is None else round(v * 1000, 1)
+    return {
+        "target_rate": rate,
+        "sent": sent,
+        "ok": outcomes.get("ok", 0),
+        "error_rate": round(1 - outcomes.get("ok", 0) / sent, 4) if sent else 0.0,
+        "errors": {k: v for k, v in outcomes.items() if k != "ok"},
+        "throughput": round(outcomes.get("ok", 0) / elapsed, 2),
+        "p50_ms": ms(_percentile(ok_latencies, 0.50)),
+        "p95_ms": ms(_percentile(ok_latencies, 0.95)),
+        "p99_ms": ms(_percentile(ok_latencies, 0.99)),
+        "max_ms": ms(ok_latencies[-1] if ok_latencies else None),
+        "elapsed_s": round(elapsed, 1),
+    }
+
+
+def print_report(rows):
+    print(f"\n{'workers':>7} {'rate':>6} {'sent':>6} {'ok/s':>7} {'err%':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  errors")
+    for row in rows:
+        fmt = lambda v: f"{v:>8.1f}" if v is not None else f"{'-':>8}"
+        print(f"{row['workers']:>7} {row['target_rate']:>6} {row['sent']:>6} {row['throughput']:>7.1f} "
+              f"{row['error_rate'] * 100:>5.1f}% {fmt(row['p50_ms'])} {fmt(row['p95_ms'])} "
+              f"{fmt(row['p99_ms'])} {fmt(row['max_ms'])}  {row['errors'] or ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test of POST /analyze against local fake sites.")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2], help="uvicorn worker counts to test")
+    parser.add_argument("--rate", type=float, default=10, help="requests per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per worker count")
+    parser.add_argument("--pages-per-kind", type=int, default=25)
+    parser.add_argument("--kinds", nargs="*", default=KINDS, choices=KINDS)
+    parser.add_argument("--site-latency-ms", type=float, default=0, help="added latency of the fake sites")
+    parser.add_argument("--site-size-kb", type=int, default=0, help="pad fake pages to this size")
+    parser.add_argument("--cache-bust", action="store_true", help="make every URL unique so caches never answer")
+    parser.add_argument("--cve-rows", type=int, default=50000, help="rows in the synthetic CVE store")
+    parser.add_argument("--api-url", help="load an already running API instead of starting uvicorn")
+    parser.add_argument("--save", help="write the report rows to this JSON file")
+    args = parser.parse_args(argv)
+
+    server, site_url = start_server(latency_ms=args.site_latency_ms, size_kb=args.site_size_kb)
+    urls = corpus_urls(site_url, args.pages_per_kind, args.kinds)
+    print(f"[INFO] Fake sites on {site_url}: {len(urls)} pages ({', '.join(args.kinds)})")
+
+    rows = []
+    try:
+        if args.api_url:
+            wait_ready(args.api_url)
+            rows.append({"workers": "ext", **drive(args.api_url, urls, args.rate, args.duration, args.cache_bust)})
+        else:
+            cve_csv, cve_store = write_cve_dataset(args.cve_rows, DATA_DIR)
+            for workers in args.workers:
+                print(f"[INFO] Starting API with {workers} worker(s)...")
+                proc, api_url = start_api(workers, cve_csv, cve_store)
+                try:
+                    print(f"[INFO] Driving {args.rate}/s for {args.duration}s")
+                    rows.append({"workers": workers,
+                                 **drive(api_url, urls, args.rate, args.duration, args.cache_bust)})
+                finally:
+                    stop_api(proc)
+    finally:
+        server.shutdown()
+
+    print_report(rows)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"[INFO] Saved report to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
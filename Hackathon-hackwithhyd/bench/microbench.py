@@ -0,0 +1,255 @@
+"""
+microbench.py
+
+Microbenchmarks for the analysis and lookup hot paths.
+
+Cases:
+    html_parse / analyze_html    PageContext and the full rule run on small,
+                                 medium and large synthetic pages
+    needs_rendering              static-vs-render decision on the medium page
+    detect_technologies          fingerprinting the medium page + headers
+    cve_index_build[N]           CVEIndex.from_store over an N-row store
+    find_cves_for_tech[N]        one tech, cold (lookup cache cleared)
+    find_cves_for_techs[N]       five techs at once, cold
+    top_cves[N]                  top 10 by risk over the same five techs' matches
+    score_cve_store[N]           predicted_risk for every row
+    analyze_endpoint             POST /analyze end to end, fetch stubbed out
+
+Each case reports throughput, p50/p99 latency and peak traced memory (from a
+separate tracemalloc pass, so tracing doesn't skew the timings).
+
+Usage:
+    python bench/microbench.py                        # quick run (10k / 100k CVE rows)
+    python bench/microbench.py --cve-rows 10000 100000 500000
+    python bench/microbench.py --only analyze --save bench/baseline.json
+    python bench/microbench.py --compare bench/baseline.json   # exit 1 on regressions
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from bench.generators import TECH_WORDS, synthetic_html, write_cve_dataset
+
+DEFAULT_CVE_ROWS = [10000, 100000]
+DATA_DIR = os.path.join(tempfile.gettempdir(), "risk_api_bench")
+MIN_TIME = 1.0          # seconds of timed runs per case
+MAX_ITERATIONS = 2000
+MEMORY_ITERATIONS = 3   # runs under tracemalloc for the peak
+REGRESSION_THRESHOLD = 0.15  # p50 slowdown that counts as a regression
+
+PAGES = {
+    "small": dict(scripts=5, inline_scripts=2, inline_size=1000, anchors=20, forms=1, iframes=1, paragraphs=10),
+    "medium": dict(scripts=20, inline_scripts=10, inline_size=5000, anchors=200, forms=3, iframes=3, paragraphs=100),
+    "large": dict(scripts=60, inline_scripts=30, inline_size=20000, anchors=2000, forms=20, iframes=10, paragraphs=500),
+}
+HEADERS = {"server": "nginx/1.24.0", "x-powered-by": "PHP/8.1.2"}
+COOKIES = ["PHPSESSID", "wordpress_test_cookie"]
+
+
+# ---------- Runner ----------
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_case(name, fn, setup=None, min_time=MIN_TIME, max_iterations=MAX_ITERATIONS, params=None):
+    """Time fn() repeatedly; `setup` (untimed) runs before every call."""
+    for _ in range(2):  # warm-up
+        if setup:
+            setup()
+        fn()
+
+    latencies = []
+    gc.collect()
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < max_iterations and (time.perf_counter() < deadline or len(latencies) < 5):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(MEMORY_ITERATIONS):
+        if setup:
+            setup()
+        tracemalloc.reset_peak()
+        fn()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    latencies.sort()
+    result = {
+        "iterations": len(latencies),
+        "ops_per_sec": round(len(latencies) / sum(latencies), 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "peak_mem_kb": round(peak / 1024, 1),
+        "params": params or {},
+    }
+    print(f"{name:<32} {result['ops_per_sec']:>10.1f}/s  p50 {result['p50_ms']:>9.3f} ms"
+          f"  p99 {result['p99_ms']:>9.3f} ms  peak {result['peak_mem_kb']:>9.1f} KB", flush=True)
+    return result
+
+
+# ---------- Cases ----------
+
+def html_cases():
+    from services.Page_Source_Analyser import analyze_html, needs_rendering
+    from services.html_rules import PageContext
+    from services.tech_fingerprinter import detect_technologies_from_page
+
+    pages = {size: synthetic_html(seed=1, **spec) for size, spec in PAGES.items()}
+    url = "http://login-secure-0042.example.tk/account"
+    for size, html in pages.items():
+        params = {**PAGES[size], "bytes": len(html)}
+        yield f"html_parse[{size}]", (lambda h=html: PageContext(h, url)), None, params
+        yield f"analyze_html[{size}]", (lambda h=html: analyze_html(h, url)), None, params
+
+    medium = pages["medium"]
+    yield "needs_rendering[medium]", (lambda: needs_rendering(medium)), None, {"bytes": len(medium)}
+    yield ("detect_technologies[medium]", (lambda: detect_technologies_from_page(medium, HEADERS, COOKIES)),
+           None, {"bytes": len(medium)})
+
+
+def cve_cases(rows, model):
+    from services import cve_lookup
+    from services.cve_index import CVEIndex
+    from services.risk_scoring import score_cve_store
+
+    _, store_path = write_cve_dataset(rows, DATA_DIR)
+    store = cve_lookup.use_store(store_path)
+    if model is not None:
+        cve_lookup.register_risk_scorer(lambda s: score_cve_store(model, s))
+    index = cve_lookup.get_index()
+    cve_lookup.get_predicted_risk()
+
+    techs = iter(range(10 ** 9))
+    params = {"rows": rows}
+    yield f"cve_index_build[{rows}]", (lambda: CVEIndex.from_store(store)), None, params
+    yield (f"find_cves_for_tech[{rows}]",
+           (lambda: cve_lookup.find_cves_for_tech(TECH_WORDS[next(techs) % len(TECH_WORDS)])),
+           index.lookup.cache_clear, params)
+    yield (f"find_cves_for_techs[{rows}]",
+           (lambda: cve_lookup.find_cves_for_techs(["WordPress", "jQuery", "PHP", "Nginx", "MySQL"])),
+           index.lookup.cache_clear, params)
+    matches = cve_lookup.match_rows(["WordPress", "jQuery", "PHP", "Nginx", "MySQL"])
+    yield f"top_cves[{rows}]", (lambda: cve_lookup.top_cves(matches, 10)), None, params
+    if model is not None:
+        yield f"score_cve_store[{rows}]", (lambda: score_cve_store(model, store)), None, params
+
+
+def endpoint_cases():
+    """POST /analyze with the network fetch replaced by a canned page."""
+    import services.Page_Source_Analyser as psa
+    from api import risk_api
+    from fastapi.testclient import TestClient
+
+    html = synthetic_html(seed=2, **PAGES["medium"])
+
+    async def fake_fetch(url):
+        return {
+            "html": html, "final_url": url, "method": "requests", "headers": HEADERS, "cookies": COOKIES,
+            "fetched_by": {"method": "requests", "reason": "static_ok"}, "fetched_at": "2025-01-01T00:00:00Z",
+        }
+
+    psa.fetch_full_page_async = fake_fetch
+    client = TestClient(risk_api.app)
+    counter = iter(range(10 ** 9))
+
+    def analyze():
+        # a new URL every call so the result and analysis caches never answer
+        response = client.post("/analyze", json={"url": f"http://bench-{next(counter)}.example.com/"})
+        response.raise_for_status()
+
+    yield "analyze_endpoint[medium]", analyze, None, {"bytes": len(html)}
+
+
+def load_model():
+    try:
+        from api.risk_api import get_model
+        return get_model()
+    except Exception as e:
+        print(f"[WARN] Risk model unavailable, skipping model cases: {str(e)}")
+        return None
+
+
+# ---------- Baselines ----------
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Print p50 ratios against a saved run; returns the names that regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\nCompared with {baseline_path} (regression = p50 more than {threshold:.0%} slower):")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["p50_ms"] / baseline[name]["p50_ms"] if baseline[name]["p50_ms"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:<32} {baseline[name]['p50_ms']:>9.3f} -> {result['p50_ms']:>9.3f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the analysis and CVE lookup hot paths.")
+    parser.add_argument("--cve-rows", type=int, nargs="*", default=DEFAULT_CVE_ROWS, help="CVE dataset sizes")
+    parser.add_argument("--only", help="run only cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds of timed runs per case")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    def groups():
+        yield html_cases()
+        model = load_model()
+        for rows in args.cve_rows:
+            yield cve_cases(rows, model)
+        if model is not None:
+            yield endpoint_cases()
+
+    results = {}
+    for cases in groups():
+        for name, fn, setup, params in cases:
+            if args.only and args.only not in name:
+                continue
+            results[name] = run_case(name, fn, setup, min_time=args.min_time, params=params)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "python": sys.version.split()[0],
+                    "platform": platform.platform(),
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"[INFO] Saved results to {args.save}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
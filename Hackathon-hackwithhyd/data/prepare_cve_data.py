@@ -1,25 +1,105 @@
-import requests
-import zipfile
-import io
+"""
+prepare_cve_data.py
+
+Build / refresh the CVE dataset (cve_2025_dataset.csv) from NVD JSON 2.0 feeds.
+
+Feeds are parsed as a stream: records are decoded one at a time straight from
+the zip member (or .json file) and written out in chunks, so peak memory is a
+few thousand records rather than several copies of the whole feed.
+
+Usage:
+    # full build from one or more yearly feeds (downloaded if not on disk)
+    python prepare_cve_data.py --years 2024 2025
+
+    # full build from local files only (no network)
+    python prepare_cve_data.py --feeds feeds/nvdcve-2.0-2024.json.zip feeds/nvdcve-2.0-2025.json.zip
+
+    # apply the "modified" delta feed to the existing dataset as upserts
+    python prepare_cve_data.py --modified feeds/nvdcve-2.0-modified.json.zip
+"""
+
+import argparse
+import codecs
+import csv
 import json
-import pandas as pd
+import os
+import re
+import sys
+import zipfile
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(DATA_DIR, "cve_2025_dataset.csv")
+FEEDS_DIR = os.path.join(DATA_DIR, "feeds")
+FEED_URL = "https://nvd.nist.gov/feeds/json/cve/2.0/nvdcve-2.0-{name}.json.zip"
+
+COLUMNS = ["cve_id", "description", "cvss_score", "severity", "exploitability_score", "last_modified"]
+CHUNK_RECORDS = 5000
+READ_SIZE = 1 << 20
+
 
-# Step 1: Download CVE-2025 ZIP file (Schema 2.0)
-url = "https://nvd.nist.gov/feeds/json/cve/2.0/nvdcve-2.0-2025.json.zip"
-print("[INFO] Downloading CVE-2025 feed...")
-response = requests.get(url)
+# ---------------------------
+# Streaming JSON parsing
+# ---------------------------
+SEPARATORS_RE = re.compile(r"[\s,]*")
 
-# Step 2: Unzip
-with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-    json_filename = z.namelist()[0]  # should be nvdcve-2.0-2025.json
-    with z.open(json_filename) as f:
-        data = json.load(f)
 
-# Step 3: Parse JSON (Schema 2.0 structure)
-vulns = data["vulnerabilities"]
-records = []
+def iter_array_items(fp, key="vulnerabilities", read_size=READ_SIZE):
+    """Yield items of the top-level JSON array `key` from a binary stream, one at a time."""
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, eof = "", 0, False
 
-for item in vulns:
+    def fill():
+        # drop what we've consumed, then append the next decoded chunk
+        nonlocal buf, pos, eof
+        chunk = fp.read(read_size)
+        eof = not chunk
+        buf = buf[pos:] + text.decode(chunk, final=eof)
+        pos = 0
+
+    # find the start of the array
+    marker = f'"{key}"'
+    while True:
+        start = buf.find(marker)
+        if start != -1:
+            bracket = buf.find("[", start + len(marker))
+            if bracket != -1:
+                pos = bracket + 1
+                break
+        if eof:
+            return
+        fill()
+
+    while True:
+        pos = SEPARATORS_RE.match(buf, pos).end()
+        if pos >= len(buf):
+            if eof:
+                return
+            fill()
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            item, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # item continues in the next chunk
+            fill()
+            continue
+        yield item
+
+
+def open_feed(path):
+    """Binary stream over a feed: the JSON member of a .zip, or a plain .json file."""
+    if zipfile.is_zipfile(path):
+        z = zipfile.ZipFile(path)
+        name = next(n for n in z.namelist() if n.endswith(".json"))
+        return z.open(name)  # decompresses as it is read; nothing is extracted to memory
+    return open(path, "rb")
+
+
+def record_from_item(item):
     cve = item["cve"]
     cve_id = cve["id"]
     description = cve.get("descriptions", [{}])[0].get("value", "")
@@ -28,29 +108,165 @@ for item in vulns:
     cvss_score, severity, exploitability = None, None, None
 
     metrics = cve.get("metrics", {})
-    if "cvssMetricV31" in metrics:
-        metric = metrics["cvssMetricV31"][0]
-        cvss_score = metric["cvssData"]["baseScore"]
-        severity = metric["cvssData"]["baseSeverity"]
-        exploitability = metric.get("exploitabilityScore")
-    elif "cvssMetricV30" in metrics:
-        metric = metrics["cvssMetricV30"][0]
-        cvss_score = metric["cvssData"]["baseScore"]
-        severity = metric["cvssData"]["baseSeverity"]
-        exploitability = metric.get("exploitabilityScore")
-
-    records.append({
+    for key in ("cvssMetricV31", "cvssMetricV30"):
+        if key in metrics:
+            metric = metrics[key][0]
+            cvss_score = metric["cvssData"]["baseScore"]
+            severity = metric["cvssData"]["baseSeverity"]
+            exploitability = metric.get("exploitabilityScore")
+            break
+
+    return {
         "cve_id": cve_id,
         "description": description,
         "cvss_score": cvss_score,
         "severity": severity,
-        "exploitability_score": exploitability
-    })
+        "exploitability_score": exploitability,
+        "last_modified": cve.get("lastModified"),
+    }
+
+
+def iter_feed_records(path):
+    with open_feed(path) as fp:
+        for item in iter_array_items(fp):
+            yield record_from_item(item)
+
+
+# ---------------------------
+# Writing
+# ---------------------------
+def _row(record):
+    return ["" if record.get(c) is None else record.get(c) for c in COLUMNS]
+
+
+def _write_chunked(records, out_path):
+    """Write records to a temp file in CHUNK_RECORDS batches, then atomically replace out_path."""
+    tmp_path = out_path + ".tmp"
+    count = 0
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        chunk = []
+        for record in records:
+            chunk.append(_row(record))
+            if len(chunk) >= CHUNK_RECORDS:
+                writer.writerows(chunk)
+                count += len(chunk)
+                chunk = []
+        writer.writerows(chunk)
+        count += len(chunk)
+    os.replace(tmp_path, out_path)
+    return count
+
+
+def build_dataset(feed_paths, out_path=DATASET_PATH):
+    """Full build from yearly feeds. Later feeds win if a CVE appears twice."""
+    def records():
+        seen = set()
+        # walk feeds newest-first so the first copy of a CVE we see is the one we keep
+        for path in reversed(feed_paths):
+            print(f"[INFO] Parsing {path}")
+            for record in iter_feed_records(path):
+                if record["cve_id"] not in seen:
+                    seen.add(record["cve_id"])
+                    yield record
+
+    count = _write_chunked(records(), out_path)
+    print(f"[INFO] Extracted {count} CVEs")
+    print(f"[INFO] Saved dataset as {out_path}")
+    return count
+
+
+def apply_delta(delta_path, dataset_path=DATASET_PATH):
+    """Upsert a "modified" delta feed into an existing dataset.
+
+    Only the delta is held in memory; the dataset is streamed through once,
+    rows with a newer delta record are replaced and new CVEs are appended.
+    """
+    delta = {r["cve_id"]: r for r in iter_feed_records(delta_path)}
+    print(f"[INFO] Delta has {len(delta)} CVEs")
+    stats = {"updated": 0, "unchanged": 0, "added": 0}
+
+    def records():
+        with open(dataset_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                new = delta.pop(row["cve_id"], None)
+                # older datasets have no last_modified column; treat the delta as newer
+                if new is not None and (new["last_modified"] or "") >= (row.get("last_modified") or ""):
+                    stats["updated"] += 1
+                    yield new
+                else:
+                    stats["unchanged"] += 1
+                    yield row
+        stats["added"] = len(delta)
+        yield from delta.values()
+
+    _write_chunked(records(), dataset_path)
+    print(f"[INFO] Upserted delta: {stats['updated']} updated, {stats['added']} added, "
+          f"{stats['unchanged']} unchanged")
+    return stats
+
+
+# ---------------------------
+# Feed download (optional)
+# ---------------------------
+def download_feed(name, feeds_dir=FEEDS_DIR):
+    """Stream an NVD feed zip to disk (name is a year or "modified") and return its path."""
+    import requests
+
+    os.makedirs(feeds_dir, exist_ok=True)
+    url = FEED_URL.format(name=name)
+    path = os.path.join(feeds_dir, os.path.basename(url))
+    print(f"[INFO] Downloading {url}...")
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(path + ".part", "wb") as f:
+            for chunk in response.iter_content(chunk_size=READ_SIZE):
+                f.write(chunk)
+    os.replace(path + ".part", path)
+    return path
+
+
+def _feed_path(name, offline):
+    path = os.path.join(FEEDS_DIR, os.path.basename(FEED_URL.format(name=name)))
+    if os.path.exists(path) or offline:
+        return path
+    return download_feed(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the CVE dataset from NVD JSON 2.0 feeds.")
+    parser.add_argument("--years", nargs="*", default=[], help="yearly feeds to build from (e.g. 2024 2025)")
+    parser.add_argument("--feeds", nargs="*", default=[], help="local feed files (.json.zip or .json)")
+    parser.add_argument("--modified", help="delta feed to upsert into the existing dataset "
+                                           "(path, or 'latest' to use/download the NVD modified feed)")
+    parser.add_argument("--out", default=DATASET_PATH, help="dataset CSV path")
+    parser.add_argument("--offline", action="store_true", help="never download; only use files in data/feeds")
+    args = parser.parse_args(argv)
+
+    feed_paths = list(args.feeds) + [_feed_path(year, args.offline) for year in args.years]
+    if not feed_paths and not args.modified:
+        feed_paths = [_feed_path("2025", args.offline)]
+
+    delta = None
+    if args.modified:
+        delta = _feed_path("modified", args.offline) if args.modified == "latest" else args.modified
+
+    missing = [p for p in feed_paths + [delta] if p and not os.path.exists(p)]
+    if delta and not feed_paths and not os.path.exists(args.out):
+        missing.append(args.out)
+    if missing:
+        for path in missing:
+            print(f"[ERROR] File not found: {path}")
+        if args.offline:
+            print("[ERROR] --offline never downloads; put the feeds in data/feeds or drop --offline")
+        sys.exit(1)
+
+    if feed_paths:
+        build_dataset(feed_paths, args.out)
+    if delta:
+        apply_delta(delta, args.out)
 
-# Step 4: Create DataFrame
-df = pd.DataFrame(records)
-print(f"[INFO] Extracted {len(df)} CVEs")
 
-# Step 5: Save CSV
-df.to_csv("cve_2025_dataset.csv", index=False)
-print("[INFO] Saved dataset as cve_2025_dataset.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,187 @@
-import pandas as pd
-import joblib
+"""
+risk_scoring_model.py
+
+Train the CVE risk model and publish it as a new model version (see
+services/model_registry.py). A running API swaps to it without a restart.
+
+The model is a HistGradientBoostingRegressor: features are binned once and
+every boosting round runs on all cores, so training stays quick as the
+dataset grows to all NVD years.
+
+Usage:
+    # full retrain on the whole CVE store
+    python models/risk_scoring_model.py
+
+    # fit only the CVEs added since the current version was trained; falls back
+    # to a full retrain if the store was rebuilt or corrections have piled up
+    python models/risk_scoring_model.py --incremental
+
+    # train and save, but keep serving the current version
+    python models/risk_scoring_model.py --no-activate
+"""
+
+import argparse
 import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.metrics import r2_score
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import GradientBoostingRegressor
 
 # Define paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_PATH = os.path.join(BASE_DIR, "data", "cve_2025_dataset.csv")
-MODEL_PATH = os.path.join(BASE_DIR, "models", "risk_model.joblib")
+
+sys.path.append(BASE_DIR)
+from services import model_registry
+from services.cve_lookup import get_store
+from services.risk_scoring import FEATURE_COLUMNS, StagedRiskModel
+
+MODEL_PARAMS = {"max_iter": 200, "max_depth": 3, "learning_rate": 0.1, "random_state": 42}
+CORRECTION_PARAMS = {"max_iter": 50, "max_depth": 3, "learning_rate": 0.1, "random_state": 42}
+MAX_CORRECTIONS = 5         # incremental fits before the next one is a full retrain
+MAX_NEW_FRACTION = 0.5      # ...or once the new rows outgrow this share of the trained ones
+EVAL_SAMPLE_ROWS = 200000
+
 
 # ---------------------------
 # Step 1: Load Dataset
 # ---------------------------
-df = pd.read_csv(DATA_PATH)
+def load_rows(store, start=0):
+    """Features and risk target for store rows [start:].
 
-# Handle missing values
-df["cvss_score"] = df["cvss_score"].fillna(0.0)
-df["exploitability_score"] = df["exploitability_score"].fillna(0.0)
+    Only the numeric columns are needed, so they are read from the columnar
+    store (built from the CSV on first use) instead of parsing the whole CSV.
+    Missing scores count as 0.
+    """
+    X = pd.DataFrame({c: np.nan_to_num(np.asarray(store.numeric[c][start:], dtype=np.float64))
+                      for c in FEATURE_COLUMNS})
+    # Risk score formula: 70% CVSS + 30% Exploitability
+    y = 0.7 * X["cvss_score"] + 0.3 * X["exploitability_score"]
+    return X, y
 
-# ---------------------------
-# Step 2: Define Risk Score
-# ---------------------------
-# Formula: 70% CVSS + 30% Exploitability
-df["risk_score"] = 0.7 * df["cvss_score"] + 0.3 * df["exploitability_score"]
 
 # ---------------------------
-# Step 3: Train/Test Split
+# Step 2: Train
 # ---------------------------
-X = df[["cvss_score", "exploitability_score"]]
-y = df["risk_score"]
+def train_full(store):
+    X, y = load_rows(store)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    model = HistGradientBoostingRegressor(**MODEL_PARAMS).fit(X_train, y_train)
+    return model, {"mode": "full", "params": MODEL_PARAMS, "train_rows": len(X_train),
+                   "r2": round(float(model.score(X_test, y_test)), 6)}
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
 
-# ---------------------------
-# Step 4: Train Model
-# ---------------------------
-risk_model = GradientBoostingRegressor(
-    n_estimators=200,
-    max_depth=3,
-    learning_rate=0.1,
-    random_state=42
-)
+def new_rows_start(store, metadata):
+    """First store row the model in `metadata` has not seen, or None if that can't be told.
 
-risk_model.fit(X_train, y_train)
+    apply_delta keeps existing rows in place and appends new CVEs, so the rows
+    after the last trained CVE are the new ones; a rebuilt store breaks that.
+    """
+    trained = metadata.get("trained_rows")
+    if not trained or trained > store.rows or store.cve_id(trained - 1) != metadata.get("last_cve_id"):
+        return None
+    return trained
+
+
+def train_incremental(store, metadata, model):
+    """Fit a correction on the residuals of the new rows; None if a full retrain is due instead."""
+    start = new_rows_start(store, metadata)
+    if start is None:
+        print("[INFO] Store no longer matches the current model's rows, retraining from scratch")
+        return None
+    corrections = getattr(model, "stages", 1) - 1
+    new_rows = store.rows - start
+    if corrections >= MAX_CORRECTIONS or new_rows > MAX_NEW_FRACTION * start:
+        print(f"[INFO] {corrections} corrections / {new_rows} new rows, retraining from scratch")
+        return None
+    if new_rows == 0:
+        return model, {"mode": "unchanged"}
+
+    X, y = load_rows(store, start)
+    residual = y - model.predict(X)
+    if new_rows >= 10:
+        X_train, X_test, r_train, _ = train_test_split(X, residual, test_size=0.2, random_state=42)
+    else:
+        X_train, X_test, r_train = X, X, residual
+    correction = HistGradientBoostingRegressor(**CORRECTION_PARAMS).fit(X_train, r_train)
+    base = model if isinstance(model, StagedRiskModel) else StagedRiskModel(model)
+    staged = base.with_correction(correction)
+
+    # score on held-out new rows plus a sample of everything, to catch drift on old rows
+    y_test = y.loc[X_test.index]
+    X_all, y_all = load_rows(store)
+    if len(X_all) > EVAL_SAMPLE_ROWS:
+        sample = np.random.default_rng(42).choice(len(X_all), EVAL_SAMPLE_ROWS, replace=False)
+        X_all, y_all = X_all.iloc[sample], y_all.iloc[sample]
+    return staged, {"mode": "incremental", "params": CORRECTION_PARAMS, "parent": metadata["version"],
+                    "train_rows": len(X_train), "new_rows": new_rows, "stages": staged.stages,
+                    "r2": round(float(r2_score(y_test, staged.predict(X_test))), 6),
+                    "r2_all": round(float(r2_score(y_all, staged.predict(X_all))), 6)}
 
-# ---------------------------
-# Step 5: Evaluate
-# ---------------------------
-r2 = risk_model.score(X_test, y_test)
-print(f"[INFO] Risk Model R^2 Score: {r2:.2f}")
 
 # ---------------------------
-# Step 6: Save Model
+# Step 3: Save Model Version
 # ---------------------------
-joblib.dump(risk_model, MODEL_PATH)
-print(f"[INFO] ✅ Risk model saved as {MODEL_PATH}")    
\ No newline at end of file
+def train(incremental=False, activate=True):
+    """Train on the current CVE store and publish the result; returns its version (or None)."""
+    store = get_store()
+    print(f"[INFO] Training on {store.rows} CVEs from {store.path}")
+    start = time.perf_counter()
+    result = None
+    if incremental:
+        try:
+            metadata, model = model_registry.load()
+        except FileNotFoundError:
+            metadata = None
+        if metadata is None or metadata["version"] == model_registry.LEGACY_VERSION:
+            print("[INFO] No versioned model to build on, retraining from scratch")
+        else:
+            result = train_incremental(store, metadata, model)
+    if result is None:
+        result = train_full(store)
+    model, info = result
+    if info["mode"] == "unchanged":
+        print(f"[INFO] No new CVEs since version {metadata['version']}, nothing to do")
+        return None
+
+    info.update({
+        "created_at": time.time(),
+        "train_seconds": round(time.perf_counter() - start, 3),
+        "algorithm": type(model).__name__,
+        "sklearn_version": sklearn.__version__,
+        "features": FEATURE_COLUMNS,
+        "store_path": store.path,
+        "trained_rows": store.rows,
+        "last_cve_id": store.cve_id(store.rows - 1) if store.rows else None,
+    })
+    print(f"[INFO] Risk Model R^2 Score: {info['r2']:.2f} ({info['mode']}, {info['train_seconds']}s)")
+    version = model_registry.save_version(model, info, make_current=activate)
+    print(f"[INFO] ✅ Risk model saved as version {version}" + (" (now serving)" if activate else ""))
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the CVE risk model and publish a new version.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fit CVEs added since the current version (full retrain when due)")
+    parser.add_argument("--no-activate", action="store_true", help="save the version without serving it")
+    parser.add_argument("--threads", type=int, help="training threads (default: all cores)")
+    parser.add_argument("--keep", type=int, default=0, help="afterwards, delete all but this many versions")
+    args = parser.parse_args(argv)
+
+    if args.threads:
+        from threadpoolctl import threadpool_limits
+        with threadpool_limits(limits=args.threads, user_api="openmp"):
+            train(args.incremental, not args.no_activate)
+    else:
+        train(args.incremental, not args.no_activate)
+    if args.keep:
+        model_registry.prune(args.keep)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,238 +7,262 @@ Usage:
     python page_scanner.py https://example.com
 """
 
+import os
 import sys
 import re
 import json
-from urllib.parse import urlparse, urljoin
+import asyncio
+import time
+
+from services.browser_pool import PLAYWRIGHT_AVAILABLE, get_pool
+from services.metrics import PAGES_FETCHED, BYTES_DOWNLOADED, FINDINGS, record, span
+from services.scan_cache import RESULT_CACHE, ANALYSIS_CACHE, RESPONSE_CACHE, normalize_url, content_key, analysis_key
+from services.html_rules import (
+    BASE64_RE, EVAL_RE, ATOB_RE, DOCUMENT_WRITE_RE, META_REFRESH_RE,
+    SUSPICIOUS_TLDS, CRYPTO_MINER_SIGNATURES, PageContext, run_rules, domain_of,
+    partial_finding, scan_signals, split_document, ResourceContext, EXTERNAL_RULES,
+)
+from services.external_resources import extract_resource_urls, scan_resources
+from services.analysis_pool import UNKNOWN_VERDICT
+from services.blocklist import get_blocklist
+from services.scan_history import HISTORY_RULES, HistoryContext, get_history
+from services.net import DEFAULT_HEADERS, get_async_client, get_session, host_slot, registrable_domain
 
 # Optional dependency imports with graceful fallback
 try:
-    from playwright.sync_api import sync_playwright
-    PLAYWRIGHT_AVAILABLE = True
+    import httpx
+    HTTPX_AVAILABLE = True
 except Exception:
-    PLAYWRIGHT_AVAILABLE = False
+    HTTPX_AVAILABLE = False
 
-import requests
-from bs4 import BeautifulSoup
-import tldextract
 from datetime import datetime
 
 # ---------- Fetching ----------
 
+# Resource types the renderer never needs: analyze_html only looks at the DOM
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "stylesheet"}
+
+# DOM-stable wait: resolve once no mutations were seen for QUIET_MS (capped at MAX_MS)
+DOM_STABLE_QUIET_MS = 500
+DOM_STABLE_MAX_MS = 5000
+DOM_STABLE_JS = """
+([quietMs, maxMs]) => new Promise(resolve => {
+    let timer = setTimeout(done, quietMs);
+    const cap = setTimeout(done, maxMs);
+    const obs = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(done, quietMs); });
+    function done() { obs.disconnect(); clearTimeout(timer); clearTimeout(cap); resolve(true); }
+    obs.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+})
+"""
+
+# Static-HTML heuristics that suggest the real content is built by JavaScript
+MIN_STATIC_NODES = 40
+MAX_SCRIPT_TO_TEXT_RATIO = 3.0
+TAG_RE = re.compile(r"<[a-zA-Z][^>]*>")
+SCRIPT_BLOCK_RE = re.compile(r"<script\b[^>]*>(.*?)</script>", re.IGNORECASE | re.DOTALL)
+STRIP_TAGS_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+SPA_MARKERS_RE = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>'
+    r'|__NEXT_DATA__|window\.__NUXT__|ng-version=|ng-app|data-reactroot'
+    r'|<noscript>[^<]*(?:enable|requires?) javascript',
+    re.IGNORECASE,
+)
+
+def needs_rendering(html):
+    """Return a reason string if static HTML looks JS-driven, else None."""
+    if SPA_MARKERS_RE.search(html):
+        return "spa_root_marker"
+    if len(TAG_RE.findall(html)) < MIN_STATIC_NODES:
+        return "few_nodes"
+    script_bytes = sum(len(m) for m in SCRIPT_BLOCK_RE.findall(html))
+    text_bytes = len(" ".join(STRIP_TAGS_RE.sub(" ", html).split()))
+    if script_bytes > MAX_SCRIPT_TO_TEXT_RATIO * max(text_bytes, 1):
+        return "script_heavy"
+    return None
+
+async def _block_heavy_resources(page):
+    async def handle(route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    await page.route("**/*", handle)
+
+async def _wait_dom_stable(page):
+    try:
+        await page.evaluate(DOM_STABLE_JS, [DOM_STABLE_QUIET_MS, DOM_STABLE_MAX_MS])
+    except Exception:
+        # navigation mid-wait etc. - whatever is in the DOM now is good enough
+        pass
+
+RENDER_OPTIONS = {
+    "wait_until": "domcontentloaded",
+    "setup_page": _block_heavy_resources,
+    "settle_page": _wait_dom_stable,
+}
+
 def fetch_with_playwright(url, timeout=15000):
-    """Return rendered HTML using Playwright (headless)."""
+    """Return rendered HTML using the shared headless browser pool."""
     if not PLAYWRIGHT_AVAILABLE:
         raise RuntimeError("Playwright not available.")
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page(viewport={"width": 1280, "height": 800}, java_script_enabled=True)
-        try:
-            page.goto(url, timeout=timeout, wait_until="networkidle")
-        except Exception:
-            # try a less strict wait
-            try:
-                page.goto(url, timeout=timeout)
-            except Exception as e:
-                browser.close()
-                raise
-        html = page.content()
-        # capture DOM after rendering; also capture current URL (redirects)
-        final_url = page.url
-        browser.close()
-        return html, final_url
-
-def fetch_with_requests(url, timeout=10):
-    """Simple GET fetch (no JS execution)."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36"
+    # capture DOM after rendering; also capture current URL (redirects)
+    return get_pool().render(url, timeout=timeout, **RENDER_OPTIONS)
+
+REQUEST_HEADERS = DEFAULT_HEADERS
+
+def _record_response_meta(meta, headers, cookie_names):
+    # headers/cookies feed the local tech fingerprinter, so the page is only fetched once
+    if meta is not None:
+        meta["headers"] = {k.lower(): v for k, v in headers.items()}
+        meta["cookies"] = sorted(set(cookie_names))
+
+def _conditional_headers(url):
+    """Request headers plus If-None-Match/If-Modified-Since from the last response we kept."""
+    headers = dict(REQUEST_HEADERS)
+    cached = RESPONSE_CACHE.get_stale(url)
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return headers, cached
+
+def _handle_response(url, status, text, final_url, headers, cookie_names, cached, meta):
+    if status == 304 and cached:
+        # not modified: reuse the body we already have
+        RESPONSE_CACHE.touch(url)
+        _record_response_meta(meta, cached["headers"], cached["cookies"])
+        if meta is not None:
+            meta["revalidated"] = True
+        return cached["html"], cached["final_url"]
+    _record_response_meta(meta, headers, cookie_names)
+    lowered = {k.lower(): v for k, v in headers.items()}
+    if status == 200 and (lowered.get("etag") or lowered.get("last-modified")):
+        RESPONSE_CACHE.set(url, {
+            "html": text,
+            "final_url": final_url,
+            "etag": lowered.get("etag"),
+            "last_modified": lowered.get("last-modified"),
+            "headers": lowered,
+            "cookies": sorted(set(cookie_names)),
+        })
+    return text, final_url
+
+def fetch_with_requests(url, timeout=10, meta=None):
+    """Simple GET fetch (no JS execution), revalidated with ETag/Last-Modified when possible.
+
+    Fills `meta` with response headers/cookies if given.
+    """
+    headers, cached = _conditional_headers(url)
+    r = get_session().get(url, headers=headers, timeout=timeout, allow_redirects=True)
+    BYTES_DOWNLOADED.inc(len(r.content))
+    return _handle_response(url, r.status_code, r.text, r.url, r.headers, r.cookies.keys(), cached, meta)
+
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+def _fetch_result(html, final, method, reason, timings, meta):
+    for stage, ms in timings.items():
+        record("fetch_" + stage[:-len("_ms")], ms / 1000)
+    PAGES_FETCHED.inc(method=method)
+    timings["total_ms"] = round(sum(timings.values()), 1)
+    fetched_by = {"method": method, "reason": reason, **timings}
+    if meta.get("revalidated"):
+        fetched_by["revalidated"] = True
+    return {
+        "html": html,
+        "final_url": final,
+        "method": method,
+        "headers": meta.get("headers", {}),
+        "cookies": meta.get("cookies", []),
+        "fetched_by": fetched_by,
+        "fetched_at": datetime.utcnow().isoformat() + "Z",
     }
-    r = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-    return r.text, r.url
 
 def fetch_full_page(url):
-    """Try Playwright first, fallback to requests."""
+    """Cheap GET first; render with Playwright only when the static HTML looks JS-driven."""
+    timings, meta = {}, {}
+    start = time.perf_counter()
     try:
-        if PLAYWRIGHT_AVAILABLE:
-            html, final = fetch_with_playwright(url)
-            method = "playwright"
-        else:
-            raise RuntimeError("No playwright")
-    except Exception as e:
-        html, final = fetch_with_requests(url)
-        method = "requests"
-    return {"html": html, "final_url": final, "method": method, "fetched_at": datetime.utcnow().isoformat() + "Z"}
+        html, final = fetch_with_requests(url, meta=meta)
+        reason = needs_rendering(html)
+    except Exception:
+        html, final, reason = None, url, "static_fetch_failed"
+    timings["static_ms"] = _ms(start)
+    if reason is None or not PLAYWRIGHT_AVAILABLE:
+        if html is None:
+            raise RuntimeError(f"Could not fetch {url}")
+        return _fetch_result(html, final, "requests", reason or "static_ok", timings, meta)
 
-# ---------- Analysis ----------
+    start = time.perf_counter()
+    try:
+        rendered, rendered_final = fetch_with_playwright(url)
+    except Exception:
+        timings["render_ms"] = _ms(start)
+        if html is None:
+            raise
+        return _fetch_result(html, final, "requests", "render_failed", timings, meta)
+    timings["render_ms"] = _ms(start)
+    return _fetch_result(rendered, rendered_final, "playwright", reason, timings, meta)
+
+# ---------- Async fetching (used by the API so a slow site doesn't block the event loop) ----------
+
+async def fetch_with_playwright_async(url, timeout=15000):
+    """Async twin of fetch_with_playwright."""
+    if not PLAYWRIGHT_AVAILABLE:
+        raise RuntimeError("Playwright not available.")
+    return await get_pool().render_async(url, timeout=timeout, **RENDER_OPTIONS)
 
-# Helper regexes
-BASE64_RE = re.compile(r"(?:[A-Za-z0-9+/]{40,}={0,2})")
-EVAL_RE = re.compile(r"\beval\(", re.IGNORECASE)
-ATOB_RE = re.compile(r"\batob\(", re.IGNORECASE)
-DOCUMENT_WRITE_RE = re.compile(r"\bdocument\.write\(", re.IGNORECASE)
-META_REFRESH_RE = re.compile(r'<meta[^>]+http-equiv=["\']refresh["\']', re.IGNORECASE)
-SUSPICIOUS_TLDS = { "tk","cn","ru","xyz","top" }  # heuristic TLDs often abused; adjust as needed
-CRYPTO_MINER_SIGNATURES = [
-    r"WebAssembly\.instantiate",    # wasm miner clues
-    r"coinhive",                    # old miner
-    r"miner",                       # generic word
-    r"wasm", 
-    r"cryptonight", 
-    r"asmCrypto"
-]
-
-def domain_of(url):
+async def fetch_with_requests_async(url, timeout=10, meta=None):
+    """Async twin of fetch_with_requests; runs the sync client in a thread if httpx is missing."""
+    if not HTTPX_AVAILABLE:
+        return await asyncio.to_thread(fetch_with_requests, url, timeout, meta)
+    headers, cached = _conditional_headers(url)
+    async with host_slot(url):
+        r = await get_async_client().get(url, headers=headers, timeout=timeout)
+    BYTES_DOWNLOADED.inc(len(r.content))
+    return _handle_response(url, r.status_code, r.text, str(r.url), r.headers, r.cookies.keys(), cached, meta)
+
+async def fetch_full_page_async(url):
+    """Async twin of fetch_full_page."""
+    timings, meta = {}, {}
+    start = time.perf_counter()
     try:
-        parsed = urlparse(url)
-        return parsed.netloc
-    except:
-        return ""
+        html, final = await fetch_with_requests_async(url, meta=meta)
+        reason = needs_rendering(html)
+    except Exception:
+        html, final, reason = None, url, "static_fetch_failed"
+    timings["static_ms"] = _ms(start)
+    if reason is None or not PLAYWRIGHT_AVAILABLE:
+        if html is None:
+            raise RuntimeError(f"Could not fetch {url}")
+        return _fetch_result(html, final, "requests", reason or "static_ok", timings, meta)
 
-def analyze_html(html, original_url):
-    findings = []
-    score_factors = {"feed_flag": 0, "source_analysis": 0, "url_pattern": 0, "history": 0}
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Basic page metrics
-    scripts = soup.find_all("script")
-    iframes = soup.find_all("iframe")
-    forms = soup.find_all("form")
-    meta = soup.find_all("meta")
-    links = soup.find_all("a")
-
-    # 1) Check meta-refresh
-    if META_REFRESH_RE.search(str(meta)):
-        findings.append({"type":"meta_refresh", "desc":"Meta refresh / auto-redirect detected"})
-        score_factors["source_analysis"] += 15
-
-    # 2) Hidden iframe detection
-    hidden_iframes = []
-    for ifr in iframes:
-        w = (ifr.get("width") or "").strip()
-        h = (ifr.get("height") or "").strip()
-        style = (ifr.get("style") or "").lower()
-        src = ifr.get("src") or ""
-        if ("0" in (w+h)) or ("display:none" in style) or ("visibility:hidden" in style):
-            hidden_iframes.append(src)
-    if hidden_iframes:
-        findings.append({"type":"hidden_iframes", "desc":"Hidden iframes found", "count": len(hidden_iframes), "examples": hidden_iframes[:3]})
-        score_factors["source_analysis"] += 25
-
-    # 3) JS obfuscation & eval/atob/document.write
-    obf_count = 0
-    long_base64_found = []
-    eval_count = 0
-    miner_signatures = []
-    for s in scripts:
-        text = s.string or ""
-        if not text:
-            # if external script (src), record it
-            src = s.get("src")
-            if src:
-                # external script tracking could be done separately
-                pass
-            continue
-        if EVAL_RE.search(text) or DOCUMENT_WRITE_RE.search(text) or ATOB_RE.search(text):
-            eval_count += 1
-        # base64 large string detection
-        if BASE64_RE.search(text):
-            long_base64_found.append(True)
-        # check miner patterns
-        for pat in CRYPTO_MINER_SIGNATURES:
-            if re.search(pat, text, re.IGNORECASE):
-                miner_signatures.append(pat)
-    if eval_count > 0:
-        findings.append({"type":"obfuscated_js", "desc":f"Use of eval/atob/document.write found in inline scripts ({eval_count} occurrences)"})
-        score_factors["source_analysis"] += 25
-    if long_base64_found:
-        findings.append({"type":"base64_payload", "desc":"Long base64-like strings found in inline scripts (possible encoded payloads)"})
-        score_factors["source_analysis"] += 20
-    if miner_signatures:
-        findings.append({"type":"crypto_miner", "desc":"Crypto-miner-like signatures found in inline scripts", "signatures": list(set(miner_signatures))})
-        score_factors["source_analysis"] += 30
-
-    # 4) Forms posting to external domains (phishing indicator)
-    phishing_forms = []
-    orig_domain = domain_of(original_url)
-    for f in forms:
-        action = (f.get("action") or "").strip()
-        if not action:
-            # often forms without action submit to same origin - less suspicious
-            continue
-        # normalize relative action
-        action_full = urljoin(original_url, action)
-        action_domain = domain_of(action_full)
-        if action_domain and action_domain != orig_domain:
-            phishing_forms.append({"form_action": action_full})
-    if phishing_forms:
-        findings.append({"type":"phishing_forms", "desc":"Forms submit to external / mismatched domains", "examples": phishing_forms[:3]})
-        score_factors["source_analysis"] += 35
-
-    # 5) Many external script loads (could be ad/malvertising or trackers)
-    external_script_count = 0
-    external_script_examples = []
-    for s in scripts:
-        src = s.get("src")
-        if src:
-            # consider script external if domain differs from original
-            src_domain = domain_of(urljoin(original_url, src))
-            if src_domain and src_domain != orig_domain:
-                external_script_count += 1
-                if len(external_script_examples) < 5:
-                    external_script_examples.append(src)
-    if external_script_count > 10:
-        findings.append({"type":"many_external_scripts", "desc":f"Large number of external scripts ({external_script_count}) loaded; may include trackers/malvertising", "examples": external_script_examples})
-        score_factors["source_analysis"] += 15
-
-    # 6) Link / anchor analysis for suspicious patterns (typosquatting, IP in URL)
-    suspicious_links = []
-    for a in links:
-        href = a.get("href") or ""
-        if href:
-            parsed = urlparse(href)
-            # IP address usage
-            if re.match(r"^https?://\d+\.\d+\.\d+\.\d+", href):
-                suspicious_links.append({"href": href, "reason": "IP in URL"})
-            # check for bad TLD
-            ext = tldextract.extract(href)
-            if ext.suffix and ext.suffix.lower() in SUSPICIOUS_TLDS:
-                suspicious_links.append({"href": href, "reason": f"Suspicious TLD .{ext.suffix}"})
-    if suspicious_links:
-        findings.append({"type":"suspicious_links", "desc":"Suspicious links found in page", "examples": suspicious_links[:5]})
-        score_factors["url_pattern"] += 15
-
-    # 7) SSL / certificate cues - we can't inspect cert via HTML, but mention if URL is http
-    parsed_orig = urlparse(original_url)
-    if parsed_orig.scheme and parsed_orig.scheme.lower() == "http":
-        findings.append({"type":"no_tls", "desc":"URL served over HTTP (no TLS) - phishing sites often lack valid TLS"})
-        score_factors["url_pattern"] += 10
-
-    # 8) Domain age heuristic via tldextract (we can only infer length of domain string; for real domain age use WHOIS)
-    ext = tldextract.extract(original_url)
-    domain_name = ".".join(part for part in [ext.domain, ext.suffix] if part)
-    if domain_name:
-        # heuristic: short-lived-looking domains (random chars) -> increase suspicion
-        if re.search(r"[0-9]{4,}", ext.domain) or len(ext.domain) > 25 or len(ext.domain) < 3:
-            findings.append({"type":"domain_heuristic", "desc":"Domain name looks suspicious by simple heuristics (very long / numeric)"})
-            score_factors["url_pattern"] += 10
-
-    # 9) Content-brand mismatch (very naive): if page references known brand words but domain != brand
-    # simple brand keywords list (extend as required)
-    brand_keywords = ["paypal", "google", "microsoft", "amazon", "apple", "bankofamerica", "chase", "hsbc"]
-    text_lower = soup.get_text(separator=" ").lower()
-    brands_found = [b for b in brand_keywords if b in text_lower]
-    mismatched_brands = []
-    for b in brands_found:
-        if b not in orig_domain:
-            mismatched_brands.append(b)
-    if mismatched_brands:
-        findings.append({"type":"brand_mismatch", "desc":"Page contains brand keywords not matching domain (possible credential phishing)", "brands": mismatched_brands[:5]})
-        score_factors["source_analysis"] += 30
+    start = time.perf_counter()
+    try:
+        rendered, rendered_final = await fetch_with_playwright_async(url)
+    except Exception:
+        timings["render_ms"] = _ms(start)
+        if html is None:
+            raise
+        return _fetch_result(html, final, "requests", "render_failed", timings, meta)
+    timings["render_ms"] = _ms(start)
+    return _fetch_result(rendered, rendered_final, "playwright", reason, timings, meta)
 
+# ---------- Analysis ----------
+
+# Only this many characters are parsed into a tree; the rest of an oversized
+# page (e.g. a multi-megabyte inline bundle) is streamed through the script
+# signature matcher and reported in an analysis_partial finding
+MAX_DOCUMENT_CHARS = int(os.environ.get("PAGE_SCANNER_MAX_CHARS", 2 * 1024 * 1024))
+
+def _score(score_factors):
+    """Cap the factors in place and turn them into (score, verdict)."""
     # 10) Final scoring: combine factors into a 0-100 score
     # weighted aggregation (tunable)
     # weights:
-    weights = {"feed_flag": 0.0, "source_analysis": 0.5, "url_pattern": 0.3, "history": 0.2}
+    # feed_flag is on top of the others: a blocklisted page URL alone (100) makes a page Malicious
+    weights = {"feed_flag": 0.7, "source_analysis": 0.5, "url_pattern": 0.3, "history": 0.2}
     # normalize factors roughly to max potentials observed
     # For simplicity, cap each factor to 100 then compute weighted sum
     for k in score_factors:
@@ -256,6 +280,29 @@ def analyze_html(html, original_url):
         verdict = "Suspicious"
     else:
         verdict = "Safe"
+    return score, verdict
+
+def analyze_html(html, original_url, parser=None, max_chars=None):
+    score_factors = {"feed_flag": 0, "source_analysis": 0, "url_pattern": 0, "history": 0}
+    html, tail = split_document(html, MAX_DOCUMENT_CHARS if max_chars is None else max_chars)
+
+    # one parse + one tree walk; the heuristics themselves live in html_rules.RULES
+    with span("html_parse"):
+        ctx = PageContext(html, original_url, parser=parser)
+    with span("html_rules"):
+        findings = run_rules(ctx, score_factors)
+    if tail:
+        with span("html_tail_scan"):
+            signals = sorted(scan_signals(tail))
+        findings.append(partial_finding(
+            "size_limit",
+            f"Page is {len(html) + len(tail)} characters; only the first {len(html)} were parsed",
+            parsed_chars=len(html), document_chars=len(html) + len(tail), tail_signals=signals,
+        ))
+    for finding in findings:
+        FINDINGS.inc(type=finding["type"])
+
+    score, verdict = _score(score_factors)
 
     result = {
         "verdict": verdict,
@@ -264,32 +311,122 @@ def analyze_html(html, original_url):
         "raw_findings_count": len(findings),
         "findings": findings,
         "page_metrics": {
-            "num_scripts": len(scripts),
-            "num_iframes": len(iframes),
-            "num_forms": len(forms),
-            "num_links": len(links)
+            "num_scripts": len(ctx.scripts),
+            "num_iframes": len(ctx.iframes),
+            "num_forms": len(ctx.forms),
+            "num_links": len(ctx.links)
         }
     }
     return result
 
-# ---------- CLI ----------
+def add_resource_findings(analysis, report):
+    """Copy of `analysis` with the external script/iframe findings of `report` scored in."""
+    score_factors = dict(analysis["score_factors"])
+    findings = run_rules(ResourceContext(report["resources"]), score_factors, rules=EXTERNAL_RULES)
+    for finding in findings:
+        FINDINGS.inc(type=finding["type"])
+    result = dict(analysis, findings=analysis["findings"] + findings,
+                  raw_findings_count=analysis["raw_findings_count"] + len(findings),
+                  external_resources={k: v for k, v in report.items() if k != "resources"})
+    if analysis["verdict"] != UNKNOWN_VERDICT:
+        result["score"], result["verdict"] = _score(score_factors)
+        result["score_factors"] = score_factors
+    return result
 
-def scan_page(url: str):
-    fetched = fetch_full_page(url)
-    html = fetched['html']
-    analysis = analyze_html(html, fetched['final_url'])
-    print(json.dumps({
-        "url_submitted": url,
-        "final_url": fetched['final_url'],
-        "fetched_by": fetched['method'],
-        "fetched_at": fetched['fetched_at'],
-        "analysis": analysis
-    }, indent=2))
-    return {
-        "url_submitted": url,
-        "final_url": fetched['final_url'],
-        "fetched_by": fetched['method'],
-        "fetched_at": fetched['fetched_at'],
-        "analysis": analysis
-    }
+def add_feed_findings(analysis, urls):
+    """Copy of `analysis` with the page's own URLs checked against the blocklist.
+
+    Runs on every scan, cached analysis or not, so a feed update applies at once.
+    """
+    hits = get_blocklist().check(dict.fromkeys(u for u in urls if u))
+    if not hits:
+        return analysis
+    score_factors = dict(analysis["score_factors"])
+    score_factors["feed_flag"] += 100
+    finding = {"type": "blocklisted_url", "desc": "URL is listed in a threat feed", "examples": hits}
+    FINDINGS.inc(type=finding["type"])
+    # a feed hit is conclusive even when the analysis itself hit a limit
+    score, verdict = _score(score_factors)
+    return dict(analysis, score=score, verdict=verdict, score_factors=score_factors,
+                findings=analysis["findings"] + [finding], raw_findings_count=analysis["raw_findings_count"] + 1)
+
+def add_history_findings(analysis, final_url, content_hash):
+    """Copy of `analysis` with the history factor (first seen, score jump, new findings, sudden change)."""
+    history = get_history()
+    if history is None:
+        return analysis
+    ctx = HistoryContext(history, final_url, registrable_domain(final_url), content_hash, analysis)
+    score_factors = dict(analysis["score_factors"])
+    findings = run_rules(ctx, score_factors, rules=HISTORY_RULES)
+    if not findings:
+        return analysis
+    for finding in findings:
+        FINDINGS.inc(type=finding["type"])
+    result = dict(analysis, findings=analysis["findings"] + findings,
+                  raw_findings_count=analysis["raw_findings_count"] + len(findings))
+    if analysis["verdict"] != UNKNOWN_VERDICT:
+        result["score"], result["verdict"] = _score(score_factors)
+        result["score_factors"] = score_factors
+    return result
+
+def finish_analysis(analysis, url, final_url, content_hash, key):
+    """Per-scan scoring on top of the reusable page analysis, then the scan is recorded in the history.
+
+    Blocklist and history checks run on every scan, cached analysis or not, since
+    both change over time. (Blocking: does SQLite I/O.)
+    """
+    with span("history"):
+        scored = add_feed_findings(analysis, [url, final_url])
+        history = get_history()
+        if history is None:
+            return scored
+        result = add_history_findings(scored, final_url, content_hash)
+        # recorded without the history factor, so history never feeds on itself
+        history.record(final_url, registrable_domain(final_url), content_hash, key, analysis, scored)
+    return result
 
+def stored_analysis(final_url, key):
+    """The analysis saved with this URL's latest scan, if it saw the same content. (Blocking.)"""
+    history = get_history()
+    if history is None:
+        return None
+    with span("history_lookup"):
+        return history.stored_analysis(final_url, key)
+
+def analyze_cached(html, final_url, key=None):
+    """analyze_html plus external resources, skipped when this exact content was analyzed before
+    (still in the analysis cache, or the latest scan of this URL in the scan history)."""
+    key = key or analysis_key(content_key(final_url, html), get_blocklist().version)
+    analysis = ANALYSIS_CACHE.get(key)
+    if analysis is None:
+        analysis = stored_analysis(final_url, key)
+        if analysis is None:
+            analysis = analyze_html(html, final_url)
+            with span("resource_scan"):
+                report = scan_resources(extract_resource_urls(html, final_url))
+            analysis = add_resource_findings(analysis, report)
+        ANALYSIS_CACHE.set(key, analysis)
+    return analysis
+
+# ---------- CLI ----------
+
+def scan_page(url: str, use_cache=True):
+    key = "scan:" + normalize_url(url)
+    result = RESULT_CACHE.get(key) if use_cache else None
+    if result is None:
+        fetched = fetch_full_page(url)
+        html = fetched['html']
+        content_hash = content_key(fetched['final_url'], html)
+        akey = analysis_key(content_hash, get_blocklist().version)
+        analysis = analyze_cached(html, fetched['final_url'], akey)
+        analysis = finish_analysis(analysis, url, fetched['final_url'], content_hash, akey)
+        result = {
+            "url_submitted": url,
+            "final_url": fetched['final_url'],
+            "fetched_by": fetched['fetched_by'],
+            "fetched_at": fetched['fetched_at'],
+            "analysis": analysis
+        }
+        RESULT_CACHE.set(key, result)
+    print(json.dumps(result, indent=2))
+    return result
@@ -0,0 +1,238 @@
+"""
+analysis_pool.py
+
+Runs analyze_html in a pool of worker processes with per-task limits.
+
+BeautifulSoup parsing is CPU-bound and holds the GIL, and a huge or
+pathological page can take seconds and hundreds of MB. In worker processes
+it can neither stall the API's event loop nor take the API down with it:
+
+    PAGE_SCANNER_WORKERS           worker processes (0 = parse in-process
+                                   threads, no CPU/memory limits)
+    PAGE_SCANNER_TASK_CPU_SECONDS  CPU seconds one analysis may use (RLIMIT_CPU)
+    PAGE_SCANNER_TASK_MEMORY_MB    address-space cap per worker (RLIMIT_AS)
+
+When a task hits a limit (or its worker dies) the caller still gets an
+analysis: verdict "Unknown" with an analysis_partial finding listing the
+script signatures a plain streaming scan of the page's first
+LIMITED_SCAN_CHARS characters found. The size cap
+(PAGE_SCANNER_MAX_CHARS) is applied inside analyze_html itself.
+"""
+
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows: no rlimits, workers run unlimited
+    RESOURCE_AVAILABLE = False
+
+ANALYSIS_WORKERS = int(os.environ.get("PAGE_SCANNER_WORKERS", min(4, os.cpu_count() or 1)))
+TASK_CPU_SECONDS = int(os.environ.get("PAGE_SCANNER_TASK_CPU_SECONDS", 10))
+TASK_MEMORY_MB = int(os.environ.get("PAGE_SCANNER_TASK_MEMORY_MB", 1024))
+
+UNKNOWN_VERDICT = "Unknown"
+LIMITED_SCAN_CHARS = 256 * 1024  # the fallback scan may run in a worker that just ran out of memory
+
+
+class CPULimitExceeded(Exception):
+    pass
+
+
+def empty_page_metrics():
+    return {"num_scripts": 0, "num_iframes": 0, "num_forms": 0, "num_links": 0}
+
+
+def limited_result(reason, desc, html):
+    """What a task that hit a limit returns: no verdict, plus whatever a cheap scan of the page's start finds."""
+    from services.html_rules import partial_finding, scan_signals
+
+    try:
+        signals = sorted(scan_signals(html[:LIMITED_SCAN_CHARS]))
+    except MemoryError:
+        signals = []
+    return {
+        "verdict": UNKNOWN_VERDICT,
+        "score": 0,
+        "score_factors": {"feed_flag": 0, "source_analysis": 0, "url_pattern": 0, "history": 0},
+        "raw_findings_count": 1,
+        "findings": [partial_finding(reason, desc, signals=signals)],
+        "page_metrics": empty_page_metrics(),
+    }
+
+
+# ---------- Worker side ----------
+
+def _on_sigxcpu(signum, frame):
+    raise CPULimitExceeded()
+
+
+def _init_worker(memory_mb):
+    # the parent handles Ctrl+C / shutdown; workers just get terminated
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if not RESOURCE_AVAILABLE:
+        return
+    signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    # pay the import cost once per worker, not on its first task
+    import services.Page_Source_Analyser  # noqa: F401
+
+
+def _cpu_used():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_cpu_budget(seconds):
+    # RLIMIT_CPU counts the whole process, so move the soft limit to "now + budget"
+    # before each task. The hard limit is never lowered, so it can be lifted again.
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = resource.RLIM_INFINITY if seconds is None else int(_cpu_used() + seconds) + 1
+    if hard != resource.RLIM_INFINITY and soft != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _run_task(html, url, cpu_seconds, blocklist_version=None):
+    """analyze_html under the CPU budget; returns (analysis, stage timings in ms, blocklist version used)."""
+    from services.blocklist import get_blocklist, sync_blocklist
+    from services.Page_Source_Analyser import analyze_html
+    from services.metrics import start_timings
+
+    # this process reloads the blocklist on its own schedule; catch up with the parent first
+    blocklist = get_blocklist() if blocklist_version is None else sync_blocklist(blocklist_version)
+    timings = start_timings()
+    limited = RESOURCE_AVAILABLE and cpu_seconds
+    try:
+        if limited:
+            _set_cpu_budget(cpu_seconds)
+        try:
+            analysis = analyze_html(html, url)
+        finally:
+            if limited:
+                _set_cpu_budget(None)
+    except CPULimitExceeded:
+        analysis = limited_result("cpu_limit", f"Analysis stopped after {cpu_seconds}s of CPU time", html)
+    except MemoryError:
+        analysis = limited_result("memory_limit", "Analysis ran out of its memory allowance", html)
+    return analysis, timings, blocklist.version
+
+
+def _ping():
+    return os.getpid()
+
+
+def _replay_metrics(analysis, timings):
+    # metrics recorded inside a worker stay in that process; count them here
+    from services.metrics import FINDINGS, record
+
+    for stage, ms in timings.items():
+        record(stage, ms / 1000)
+    for finding in analysis["findings"]:
+        FINDINGS.inc(type=finding["type"])
+
+
+# ---------- Parent side ----------
+
+class AnalysisPool:
+    """Process pool for analyze_html; recreated transparently if a worker dies."""
+
+    def __init__(self, workers=ANALYSIS_WORKERS, cpu_seconds=TASK_CPU_SECONDS, memory_mb=TASK_MEMORY_MB):
+        self.workers = workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the API process has running threads (event loop, browser pool)
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.memory_mb,),
+                )
+            return self._executor
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Spawn the workers now instead of on the first analysis."""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def analyze(self, html, url, blocklist_version=None):
+        """analyze_html(html, url) in a worker process (blocking).
+
+        Returns (analysis, blocklist version the worker used); pass the version
+        the result will be cached under and the worker reopens its store to match.
+        """
+        executor = self._get_executor()
+        try:
+            analysis, timings, used_version = executor.submit(
+                _run_task, html, url, self.cpu_seconds, blocklist_version).result()
+        except BrokenProcessPool:
+            return self._crashed(executor, html, blocklist_version)
+        _replay_metrics(analysis, timings)
+        return analysis, used_version
+
+    async def analyze_async(self, html, url, blocklist_version=None):
+        """analyze() for the event loop: awaits the worker without tying up a thread."""
+        executor = self._get_executor()
+        try:
+            analysis, timings, used_version = await asyncio.wrap_future(
+                executor.submit(_run_task, html, url, self.cpu_seconds, blocklist_version))
+        except BrokenProcessPool:
+            return self._crashed(executor, html, blocklist_version)
+        _replay_metrics(analysis, timings)
+        return analysis, used_version
+
+    def _crashed(self, executor, html, blocklist_version):
+        # a worker was killed (OOM killer, segfault in a parser); start a fresh pool
+        self._discard(executor)
+        return limited_result("worker_crashed", "Analysis worker died while parsing this page", html), blocklist_version
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_analysis_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AnalysisPool()
+    return _pool
+
+
+def shutdown_analysis_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
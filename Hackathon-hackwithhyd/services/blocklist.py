@@ -0,0 +1,444 @@
+"""
+blocklist.py
+
+Local threat-feed blocklist: known-bad domains, URLs and IP ranges, checked in
+microseconds per URL.
+
+Feeds are plain files in BLOCKLIST_FEED_DIR, one entry per line:
+
+    evil.example            domain (also blocks every subdomain)
+    *.evil.example          same
+    0.0.0.0 evil.example    hosts-file line
+    ||evil.example^         adblock-style domain rule
+    http://x.example/a.php  exact URL (normalized like the scan caches)
+    203.0.113.7             IP address
+    198.51.100.0/24         CIDR range (IPv4 or IPv6)
+    # ...                   comment
+
+They are compiled into a memory-mapped store (like the CVE store) so every
+uvicorn worker and analysis process shares one copy of the data:
+
+    meta.json               counts, feed names, Bloom filter parameters
+    bloom.bin               Bloom filter over all domain and URL keys
+    domains.u8, urls.u8     sorted 64-bit key hashes (the exact set)
+    domains.feed, urls.feed uint8 feed id per hash
+    ipv4.start / ipv4.end   merged, sorted uint32 ranges (+ ipv4.feed)
+    ipv6.txt                IPv6 ranges, "start end feed" per line
+
+A lookup tests the Bloom filter first; only the rare possible hit goes on to
+a binary search of the hash array. Two different keys sharing a 64-bit hash
+is negligible at feed sizes.
+
+Hot reload: a background thread rebuilds the store when a feed file changes
+and swaps it in by replacing the module-level reference. Readers never take a
+lock; they keep whatever Blocklist object they picked up. The store path is a
+symlink swapped atomically to each new version (see store_dir.py); other
+processes notice the new store through its meta.json and reopen it, and only
+one of them rebuilds.
+
+Build or query by hand with:
+    python -m services.blocklist build [feed_dir] [store_dir]
+    python -m services.blocklist check <url> [<url> ...]
+"""
+
+import bisect
+import hashlib
+import ipaddress
+import json
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+
+from services import store_dir
+from services.net import hostname_of
+from services.scan_cache import normalize_url
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FEED_DIR = os.environ.get("BLOCKLIST_FEED_DIR", os.path.join(BASE_DIR, "data", "feeds"))
+STORE_PATH = os.environ.get("BLOCKLIST_STORE_PATH", os.path.join(BASE_DIR, "data", "blocklist_store"))
+RELOAD_SECONDS = float(os.environ.get("BLOCKLIST_RELOAD_SECONDS", 60))
+
+FORMAT_VERSION = 1
+BLOOM_BITS_PER_KEY = 10
+BLOOM_HASHES = 7  # ~1% false positives at 10 bits per key
+HOSTS_FILE_ADDRESSES = {"0.0.0.0", "127.0.0.1", "::", "::1"}
+
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _map_array(path, dtype):
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def _map_blob(path):
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Blocklist:
+    """A compiled blocklist store, memory-mapped from `path` (or empty if path is None)."""
+
+    def __init__(self, path=None):
+        self.path = path
+        if path is None:
+            self.meta = {"version": FORMAT_VERSION, "feeds": [], "domains": 0, "urls": 0, "ipv4": 0,
+                         "ipv6": 0, "bloom_bits": 0, "built_at": 0}
+            self._bloom, self._ipv6 = b"", []
+            self._sets = {kind: (np.empty(0, np.uint64), np.empty(0, np.uint8)) for kind in ("domains", "urls")}
+            self._ipv4 = (np.empty(0, np.uint32), np.empty(0, np.uint32), np.empty(0, np.uint8))
+            self._bloom_bits = 0
+            return
+        # resolve the link once so every file comes from the same version
+        real_path = os.path.realpath(path)
+        with open(os.path.join(real_path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported blocklist store version in {path}: {self.meta.get('version')}")
+        p = lambda name: os.path.join(real_path, name)
+        self._bloom = _map_blob(p("bloom.bin"))
+        self._sets = {kind: (_map_array(p(f"{kind}.u8"), np.uint64), _map_array(p(f"{kind}.feed"), np.uint8))
+                      for kind in ("domains", "urls")}
+        self._ipv4 = (_map_array(p("ipv4.start"), np.uint32), _map_array(p("ipv4.end"), np.uint32),
+                      _map_array(p("ipv4.feed"), np.uint8))
+        with open(p("ipv6.txt")) as f:
+            self._ipv6 = [tuple(int(v) for v in line.split()) for line in f if line.strip()]
+        self._bloom_bits = self.meta["bloom_bits"]
+
+    @property
+    def version(self):
+        """Changes whenever a different store is loaded (part of the analysis cache key)."""
+        return f"{self.meta['built_at']}:{self.meta['domains']}:{self.meta['urls']}"
+
+    def __len__(self):
+        return self.meta["domains"] + self.meta["urls"] + self.meta["ipv4"] + self.meta["ipv6"]
+
+    def _lookup(self, kind, key):
+        if not self._bloom:
+            return None
+        h = _key_hash(key)
+        # Bloom filter first, stopping at the first clear bit: most misses cost one or two probes
+        bloom, m = self._bloom, self._bloom_bits
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(BLOOM_HASHES):
+            pos = (h1 + i * h2) % m
+            if not bloom[pos >> 3] & (1 << (pos & 7)):
+                return None
+        hashes, feeds = self._sets[kind]
+        i = int(np.searchsorted(hashes, np.uint64(h)))
+        if i < len(hashes) and int(hashes[i]) == h:
+            return self.meta["feeds"][feeds[i]]
+        return None
+
+    def match_ip(self, address):
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return None
+        if ip.version == 4:
+            starts, ends, feeds = self._ipv4
+            i = int(np.searchsorted(starts, np.uint32(int(ip)), side="right")) - 1
+            if i >= 0 and int(ends[i]) >= int(ip):
+                return self.meta["feeds"][feeds[i]]
+            return None
+        i = bisect.bisect_right(self._ipv6, (int(ip), float("inf"))) - 1
+        if i >= 0 and self._ipv6[i][1] >= int(ip):
+            return self.meta["feeds"][self._ipv6[i][2]]
+        return None
+
+    def match_host(self, host):
+        """Feed that lists `host`, one of its parent domains or its IP range; else None."""
+        host = (host or "").lower().rstrip(".")
+        if not host:
+            return None
+        if host[0].isdigit() or ":" in host:
+            feed = self.match_ip(host.strip("[]"))
+            if feed is not None:
+                return feed
+        labels = host.split(".")
+        # a.b.evil.example -> a.b.evil.example, b.evil.example, evil.example (not the bare TLD)
+        for i in range(max(1, len(labels) - 1)):
+            feed = self._lookup("domains", ".".join(labels[i:]))
+            if feed is not None:
+                return feed
+        return None
+
+    def match_url(self, url, host_results=None):
+        """(feed, matched on "url" or "host") for a blocklisted URL, else None."""
+        try:
+            if self.meta["urls"]:
+                url = normalize_url(url)
+                for key in (url, url.split("?", 1)[0]) if "?" in url else (url,):
+                    feed = self._lookup("urls", key)
+                    if feed is not None:
+                        return feed, "url"
+            host = hostname_of(url)
+        except ValueError:
+            return None
+        if host_results is None:
+            feed = self.match_host(host)
+        else:
+            if host not in host_results:
+                host_results[host] = self.match_host(host)
+            feed = host_results[host]
+        return (feed, "host") if feed is not None else None
+
+    def check(self, urls):
+        """[{"url", "feed", "match"}] for each blocklisted URL in `urls`; each host is looked up once."""
+        hits, host_results = [], {}
+        for url in urls:
+            match = self.match_url(url, host_results)
+            if match is not None:
+                hits.append({"url": url, "feed": match[0], "match": match[1]})
+        return hits
+
+
+# ---------- Building ----------
+
+def parse_feed_line(line):
+    """("domain"|"url"|"ip", value) for one feed line, or None for comments/junk."""
+    line = line.split("#", 1)[0].strip()
+    if not line or line.startswith("!"):
+        return None
+    parts = line.split()
+    if len(parts) >= 2 and parts[0] in HOSTS_FILE_ADDRESSES:
+        line = parts[1]
+    elif len(parts) > 1:
+        line = parts[0]
+    if "://" in line:
+        try:
+            return "url", normalize_url(line)
+        except ValueError:
+            return None
+    if line.startswith("||"):
+        line = line[2:].split("^", 1)[0]
+        if not line:
+            return None
+    if line[0].isdigit() or ":" in line:
+        try:
+            return "ip", ipaddress.ip_network(line, strict=False)
+        except ValueError:
+            pass
+    domain = line.lower().lstrip("*.").rstrip(".")
+    if "." not in domain or "/" in domain:
+        return None
+    return "domain", domain
+
+
+def feed_files(feed_dir):
+    if not os.path.isdir(feed_dir):
+        return []
+    return sorted(os.path.join(feed_dir, name) for name in os.listdir(feed_dir)
+                  if not name.startswith(".") and os.path.isfile(os.path.join(feed_dir, name)))
+
+
+def _merge_ranges(ranges):
+    # ranges: [(start, end, feed)] -> sorted, non-overlapping (first feed wins on overlap)
+    merged = []
+    for start, end, feed in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end, merged[-1][2])
+        else:
+            merged.append((start, end, feed))
+    return merged
+
+
+def _sorted_unique(hashes, feeds):
+    order = np.argsort(hashes, kind="stable")
+    hashes, feeds = hashes[order], feeds[order]
+    keep = np.ones(len(hashes), dtype=bool)
+    keep[1:] = hashes[1:] != hashes[:-1]
+    return hashes[keep], feeds[keep]
+
+
+def build_store(feed_dir=FEED_DIR, store_path=STORE_PATH):
+    """Compile every feed file in feed_dir into a store. Written to a temp dir, then published as a new version."""
+    files = feed_files(feed_dir)
+    feeds = [os.path.basename(f) for f in files][:256]  # feed ids are uint8
+    keys = {"domains": ([], []), "urls": ([], [])}
+    ipv4, ipv6 = [], []
+    for feed_id, path in enumerate(files[:256]):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                entry = parse_feed_line(line)
+                if entry is None:
+                    continue
+                kind, value = entry
+                if kind == "ip":
+                    target = ipv4 if value.version == 4 else ipv6
+                    target.append((int(value.network_address), int(value.broadcast_address), feed_id))
+                else:
+                    hashes, ids = keys["domains" if kind == "domain" else "urls"]
+                    hashes.append(_key_hash(value))
+                    ids.append(feed_id)
+
+    tmp_path = f"{store_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    p = lambda name: os.path.join(tmp_path, name)
+
+    counts, all_hashes = {}, []
+    for kind, (hashes, ids) in keys.items():
+        hashes, ids = _sorted_unique(np.asarray(hashes, dtype=np.uint64), np.asarray(ids, dtype=np.uint8))
+        hashes.tofile(p(f"{kind}.u8"))
+        ids.tofile(p(f"{kind}.feed"))
+        counts[kind] = len(hashes)
+        all_hashes.append(hashes)
+
+    all_hashes = np.concatenate(all_hashes)
+    bloom_bits = max(64, len(all_hashes) * BLOOM_BITS_PER_KEY)
+    bloom = np.zeros((bloom_bits + 7) // 8, dtype=np.uint8)
+    h1 = all_hashes & np.uint64(0xFFFFFFFF)
+    h2 = (all_hashes >> np.uint64(32)) | np.uint64(1)
+    for i in range(BLOOM_HASHES):
+        pos = (h1 + np.uint64(i) * h2) % np.uint64(bloom_bits)
+        np.bitwise_or.at(bloom, (pos >> np.uint64(3)).astype(np.int64), (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+    bloom.tofile(p("bloom.bin"))
+
+    ipv4 = _merge_ranges(ipv4)
+    np.asarray([r[0] for r in ipv4], dtype=np.uint32).tofile(p("ipv4.start"))
+    np.asarray([r[1] for r in ipv4], dtype=np.uint32).tofile(p("ipv4.end"))
+    np.asarray([r[2] for r in ipv4], dtype=np.uint8).tofile(p("ipv4.feed"))
+    ipv6 = _merge_ranges(ipv6)
+    with open(p("ipv6.txt"), "w") as f:
+        f.writelines(f"{start} {end} {feed}\n" for start, end, feed in ipv6)
+
+    with open(p("meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "feeds": feeds, "domains": counts["domains"], "urls": counts["urls"],
+                   "ipv4": len(ipv4), "ipv6": len(ipv6), "bloom_bits": bloom_bits, "built_at": time.time()}, f)
+
+    # swap the link; processes with the old files mapped keep reading them until they reopen
+    version_path = store_dir.new_version_path(store_path)
+    os.rename(tmp_path, version_path)
+    store_dir.publish(version_path, store_path)
+    print(f"[INFO] Wrote blocklist with {counts['domains']} domains, {counts['urls']} URLs, "
+          f"{len(ipv4) + len(ipv6)} IP ranges from {len(feeds)} feeds to {store_path}")
+    return store_path
+
+
+def is_stale(store_path=STORE_PATH, feed_dir=FEED_DIR):
+    """True if the store is missing, or a feed file was added, removed or changed since it was built."""
+    meta_path = os.path.join(store_path, "meta.json")
+    files = feed_files(feed_dir)
+    if not os.path.exists(meta_path):
+        return bool(files)
+    with open(meta_path) as f:
+        built = json.load(f)
+    if built.get("feeds") != [os.path.basename(f) for f in files][:256]:
+        return True
+    return any(os.path.getmtime(f) > os.path.getmtime(meta_path) for f in files)
+
+
+# ---------- Current blocklist + hot reload ----------
+
+_current = None
+_current_mtime = None
+_next_check = 0.0
+_refresh_lock = threading.Lock()
+_reloader = None
+
+
+def _store_mtime():
+    try:
+        return os.path.getmtime(os.path.join(STORE_PATH, "meta.json"))
+    except OSError:
+        return None
+
+
+def _open_current():
+    global _current, _current_mtime
+    mtime = _store_mtime()
+    if mtime is None and _current is not None and _current.path is not None:
+        # the store vanished (e.g. a pre-versioning directory being moved aside); keep serving the one we have
+        return
+    if mtime != _current_mtime or _current is None:
+        # one reference assignment: readers see either the old or the new store
+        _current = Blocklist(STORE_PATH) if mtime is not None else Blocklist()
+        _current_mtime = mtime
+
+
+def get_blocklist():
+    """The current Blocklist; reopened (at most every few seconds) if another process rebuilt it."""
+    global _current, _next_check
+    if _current is None or time.monotonic() >= _next_check:
+        # whoever gets the lock refreshes; everyone else keeps using the current store
+        if _refresh_lock.acquire(blocking=_current is None):
+            try:
+                _next_check = time.monotonic() + min(RELOAD_SECONDS, 5)
+                _open_current()
+            except Exception as e:
+                print(f"[WARN] Could not open blocklist store: {str(e)}")
+                if _current is None:
+                    _current = Blocklist()
+            finally:
+                _refresh_lock.release()
+    return _current
+
+
+def sync_blocklist(version):
+    """get_blocklist(), but reopened right away if it isn't at `version` (the one the caller keyed on);
+    a worker process otherwise keeps its old store until its own next check."""
+    global _next_check
+    current = get_blocklist()
+    if current.version != version:
+        with _refresh_lock:
+            _next_check = time.monotonic() + min(RELOAD_SECONDS, 5)
+            _open_current()
+            current = _current
+    return current
+
+
+def reload():
+    """Rebuild the store if the feeds changed, then swap it in."""
+    if is_stale():
+        # every worker's reloader notices the change; the first one rebuilds, the rest find it fresh
+        with store_dir.lock(STORE_PATH):
+            if is_stale():
+                build_store()
+    with _refresh_lock:
+        _open_current()
+    return _current
+
+
+def _reload_loop():
+    while True:
+        time.sleep(RELOAD_SECONDS)
+        try:
+            reload()
+        except Exception as e:
+            print(f"[WARN] Blocklist reload failed: {str(e)}")
+
+
+def start_reloader():
+    """Load the blocklist now and keep it in sync with the feed directory from a daemon thread."""
+    global _reloader
+    reload()
+    if _reloader is None and RELOAD_SECONDS > 0:
+        _reloader = threading.Thread(target=_reload_loop, name="blocklist-reload", daemon=True)
+        _reloader.start()
+    return _current
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "build":
+        with store_dir.lock(sys.argv[3] if len(sys.argv) >= 4 else STORE_PATH):
+            build_store(*sys.argv[2:4])
+    elif len(sys.argv) >= 3 and sys.argv[1] == "check":
+        blocklist = reload()
+        for url in sys.argv[2:]:
+            print(url, blocklist.match_url(url))
+    else:
+        print("Usage: python -m services.blocklist build [feed_dir] [store_dir]\n"
+              "       python -m services.blocklist check <url> [<url> ...]")
+        sys.exit(1)
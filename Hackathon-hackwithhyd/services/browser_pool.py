@@ -0,0 +1,249 @@
+"""
+browser_pool.py
+
+Long-lived headless Chromium shared by every scan in the process.
+
+Launching a browser costs hundreds of milliseconds and a lot of RSS, so the
+pool keeps one running and gives each render its own fresh browser context
+(isolated cookies/storage), with at most `max_contexts` renders at a time.
+The browser is replaced after `pages_per_browser` renders, when the Chromium
+processes grow past `max_rss_mb`, or when it crashes/disconnects.
+
+Playwright objects are bound to the event loop that created them, so the pool
+runs its own loop in a background thread. Sync callers (CLI `scan_page`) use
+`render()`, async callers (FastAPI) use `render_async()`; both end up on the
+same browser.
+"""
+
+import asyncio
+import atexit
+import importlib.util
+import threading
+
+# Only check that Playwright is installed; it is imported when the first browser launches
+PLAYWRIGHT_AVAILABLE = importlib.util.find_spec("playwright") is not None
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+VIEWPORT = {"width": 1280, "height": 800}
+CHROMIUM_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def _is_chromium(proc):
+    return proc is not None and any(n in proc.name().lower() for n in CHROMIUM_PROCESS_NAMES)
+
+
+def _chromium_roots():
+    """PIDs of the top process of every Chromium tree below this process."""
+    if psutil is None:
+        return set()
+    roots = set()
+    try:
+        children = psutil.Process().children(recursive=True)
+    except Exception:
+        return roots
+    for proc in children:
+        try:
+            if _is_chromium(proc) and not _is_chromium(proc.parent()):
+                roots.add(proc.pid)
+        except Exception:
+            continue
+    return roots
+
+
+class BrowserPool:
+    def __init__(self, max_contexts=4, pages_per_browser=200, max_rss_mb=1500, headless=True):
+        if not PLAYWRIGHT_AVAILABLE:
+            raise RuntimeError("Playwright not available.")
+        self.max_contexts = max_contexts
+        self.pages_per_browser = pages_per_browser
+        self.max_rss_mb = max_rss_mb
+        self.headless = headless
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+
+        # everything below is only touched from the pool's loop
+        self._playwright = None
+        self._browser = None
+        self._pages_served = 0
+        self._active = {}  # browser -> renders in flight
+        self._browser_pid = None  # root of the current browser's process tree, if known
+        self._semaphore = None
+        self._launch_lock = None
+        self._closed = False
+
+    # ---------- public API ----------
+
+    def start(self):
+        """Launch the browser now instead of on the first render."""
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    def render(self, url, timeout=15000, wait_until="networkidle", setup_page=None, settle_page=None):
+        """Render `url` and return (html, final_url). Blocks the calling thread.
+
+        `setup_page(page)` runs before navigation (e.g. request routing) and
+        `settle_page(page)` after it (e.g. waiting for the DOM to stop changing).
+        """
+        return self._submit(url, timeout, wait_until, setup_page, settle_page).result()
+
+    async def render_async(self, url, timeout=15000, wait_until="networkidle", setup_page=None, settle_page=None):
+        """Awaitable render() for callers on another event loop."""
+        return await asyncio.wrap_future(self._submit(url, timeout, wait_until, setup_page, settle_page))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=10)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def stats(self):
+        return {
+            "pages_served": self._pages_served,
+            "browser_connected": bool(self._browser and self._browser.is_connected()),
+            "renders_in_flight": sum(self._active.values()),
+        }
+
+    # ---------- internals (run on the pool loop) ----------
+
+    def _submit(self, url, timeout, wait_until, setup_page, settle_page):
+        if self._closed:
+            raise RuntimeError("Browser pool is closed.")
+        coro = self._render(url, timeout, wait_until, setup_page, settle_page)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _ensure_primitives(self):
+        # asyncio primitives must be created on the loop that uses them
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_contexts)
+            self._launch_lock = asyncio.Lock()
+
+    async def _start(self):
+        self._ensure_primitives()
+        await self._get_browser()
+
+    async def _render(self, url, timeout, wait_until, setup_page, settle_page):
+        self._ensure_primitives()
+        async with self._semaphore:
+            browser = await self._get_browser()
+            self._active[browser] = self._active.get(browser, 0) + 1
+            context = None
+            try:
+                context = await browser.new_context(viewport=VIEWPORT, java_script_enabled=True)
+                page = await context.new_page()
+                if setup_page is not None:
+                    await setup_page(page)
+                try:
+                    await page.goto(url, timeout=timeout, wait_until=wait_until)
+                except Exception:
+                    if not browser.is_connected():
+                        raise
+                    # try a less strict wait
+                    await page.goto(url, timeout=timeout)
+                if settle_page is not None:
+                    await settle_page(page)
+                return await page.content(), page.url
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                self._active[browser] -= 1
+                # renders that were in flight on a replaced browser don't count against the new one
+                if browser is self._browser:
+                    self._pages_served += 1
+                await self._maybe_recycle(browser)
+
+    async def _get_browser(self):
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+            # crashed or never started: launch a fresh one
+            crashed = self._browser
+            if crashed is not None and not self._active.get(crashed):
+                self._active.pop(crashed, None)
+            before = _chromium_roots()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            # Playwright doesn't expose the browser PID; it is the one new Chromium tree
+            new_roots = _chromium_roots() - before
+            self._browser_pid = new_roots.pop() if len(new_roots) == 1 else None
+            self._active[self._browser] = 0
+            self._pages_served = 0
+            return self._browser
+
+    async def _maybe_recycle(self, browser):
+        if browser is self._browser and self._should_recycle():
+            # new renders will launch a replacement; the old one closes once idle
+            self._browser = None
+        if browser is not self._browser and self._active.get(browser) == 0:
+            del self._active[browser]
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+    def _should_recycle(self):
+        if self._pages_served >= self.pages_per_browser:
+            return True
+        return self.max_rss_mb is not None and self._browser_rss_mb() > self.max_rss_mb
+
+    def _browser_rss_mb(self):
+        """RSS of the current browser's process tree, or 0 if psutil or the PID is unavailable.
+
+        Only that tree counts: other children of this process (analysis
+        workers, a browser still draining) must not trigger a recycle.
+        """
+        if psutil is None or self._browser_pid is None:
+            return 0
+        try:
+            root = psutil.Process(self._browser_pid)
+            return sum(p.memory_info().rss for p in [root] + root.children(recursive=True)) / (1024 * 1024)
+        except Exception:
+            return 0
+
+    async def _shutdown(self):
+        for browser in list(self._active):
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._active.clear()
+        self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool():
+    """Process-wide pool, started on first use."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = BrowserPool()
+            atexit.register(_POOL.close)
+        return _POOL
+
+
+def shutdown_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
+            _POOL = None
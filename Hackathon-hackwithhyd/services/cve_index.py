@@ -0,0 +1,129 @@
+"""
+cve_index.py
+
+Inverted index over CVE descriptions so technology lookups don't have to
+scan every description with a substring search.
+
+Descriptions are split into lowercase alphanumeric tokens; each token keeps a
+posting list of the row ids it appears in. A second, much smaller trigram index
+over the token vocabulary lets a query fragment like "query" find "jquery" or
+"jquery-ui" without walking the whole vocabulary.
+
+A lookup intersects the posting lists of the query's tokens to get a small
+candidate set and then verifies each candidate with a plain case-insensitive
+substring check, so results are the same rows `str.contains(..., case=False)`
+returned, in dataset order. With whole_word=True a match must also not touch a
+letter or digit on either side ("java" then skips "javascript").
+"""
+
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+GRAM_SIZE = 3
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def _grams(token):
+    return {token[i:i + GRAM_SIZE] for i in range(len(token) - GRAM_SIZE + 1)}
+
+
+class CVEIndex:
+    """Token -> posting list index built once over a sequence of descriptions."""
+
+    def __init__(self, descriptions):
+        lowered = [d.lower() if isinstance(d, str) else "" for d in descriptions]
+
+        postings = defaultdict(list)
+        for row_id, text in enumerate(lowered):
+            for token in set(TOKEN_RE.findall(text)):
+                postings[token].append(row_id)
+        # row ids are appended in order, so every posting list is already sorted
+        self._setup(
+            {tok: np.asarray(rows, dtype=np.int32) for tok, rows in postings.items()},
+            lowered.__getitem__,
+            len(lowered),
+        )
+
+    @classmethod
+    def from_store(cls, store):
+        """Index over a CVEStore using its precomputed postings; descriptions are read on demand."""
+        index = cls.__new__(cls)
+        index._setup(store.postings(), lambda row: store.description(row).lower(), len(store))
+        return index
+
+    def _setup(self, postings, text_of, size):
+        self._postings = postings
+        self._text_of = text_of
+        self._size = size
+
+        vocab_grams = defaultdict(set)
+        for token in self._postings:
+            for gram in _grams(token):
+                vocab_grams[gram].add(token)
+        self._vocab_grams = dict(vocab_grams)
+
+        # cache per-instance so a rebuilt index never serves stale rows
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    def __len__(self):
+        return self._size
+
+    def _tokens_containing(self, fragment):
+        """Vocabulary tokens that contain `fragment` as a substring."""
+        if len(fragment) < GRAM_SIZE:
+            # short fragments can't use the gram index; fall back to a vocab scan
+            return [t for t in self._postings if fragment in t]
+        candidates = None
+        for gram in _grams(fragment):
+            tokens = self._vocab_grams.get(gram)
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates & tokens
+        return [t for t in candidates if fragment in t]
+
+    def _rows_for_fragment(self, fragment):
+        tokens = self._tokens_containing(fragment)
+        if not tokens:
+            return np.empty(0, dtype=np.int32)
+        if len(tokens) == 1:
+            return self._postings[tokens[0]]
+        return np.unique(np.concatenate([self._postings[t] for t in tokens]))
+
+    def _lookup(self, query, whole_word=False):
+        needle = query.lower()
+        if not needle:
+            return tuple(range(self._size))
+
+        fragments = sorted(set(tokenize(needle)), key=len, reverse=True)
+        if not fragments:
+            # query is all punctuation - nothing to index on, verify every row
+            candidates = range(self._size)
+        else:
+            # longest fragments first: they have the shortest posting lists
+            candidates = None
+            for fragment in fragments:
+                rows = self._rows_for_fragment(fragment)
+                candidates = rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+                if len(candidates) == 0:
+                    return ()
+            candidates = candidates.tolist()
+
+        text_of = self._text_of
+        if whole_word:
+            pattern = re.compile(r"(?<![a-z0-9])" + re.escape(needle) + r"(?![a-z0-9])")
+            return tuple(i for i in candidates if pattern.search(text_of(i)))
+        return tuple(i for i in candidates if needle in text_of(i))
+
+    def lookup_many(self, queries, whole_words=frozenset()):
+        """Return {query: row ids} for several queries in one pass over the index.
+
+        Queries whose lowercase form is in `whole_words` only match whole words.
+        """
+        return {q: self.lookup(q, q.lower() in whole_words) for q in dict.fromkeys(queries)}
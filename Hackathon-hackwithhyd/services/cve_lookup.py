@@ -1,13 +1,220 @@
-import pandas as pd
+import heapq
 import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-# Load CVE dataset once
+import numpy as np
+
+from services import store_dir
+from services.cve_index import CVEIndex
+from services.cve_store import CVEStore, convert_csv, is_stale
+from services.metrics import CVES_MATCHED, span
+from services.tech_signatures import CVE_WHOLE_WORD
+
+# CVE data lives in a memory-mapped columnar store (see cve_store.py) that is
+# opened on the first lookup; it is (re)built from the CSV if missing or stale.
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_PATH = os.path.join(BASE_DIR, "data", "cve_2025_dataset.csv")
+DATA_PATH = os.environ.get("CVE_DATA_PATH", os.path.join(BASE_DIR, "data", "cve_2025_dataset.csv"))
+STORE_PATH = os.environ.get("CVE_STORE_PATH", os.path.join(BASE_DIR, "data", "cve_store"))
 MODEL_PATH = os.path.join(BASE_DIR, "models", "risk_model.joblib")
 
-CVE_DF = pd.read_csv(DATA_PATH)
+RESULT_COLUMNS = ["cve_id", "cvss_score", "exploitability_score", "severity", "description"]
+# generic names ("Java", "Bootstrap") would match unrelated CVEs as substrings
+WHOLE_WORD_TECHS = frozenset(name.lower() for name in CVE_WHOLE_WORD)
+
+_lock = threading.Lock()
+_store = None
+_index = None
+_risk_scorer = None
+_predicted_risk = None
+
+
+def get_store() -> CVEStore:
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                if is_stale(STORE_PATH, DATA_PATH):
+                    # one worker converts; the others wait for it and then find the store fresh
+                    with store_dir.lock(STORE_PATH):
+                        if is_stale(STORE_PATH, DATA_PATH):
+                            with span("cve_store_convert"):
+                                convert_csv(DATA_PATH, STORE_PATH)
+                with span("cve_store_open"):
+                    _store = CVEStore(STORE_PATH)
+    return _store
+
+
+def use_store(store_path: str):
+    """Serve lookups from the store at `store_path` (e.g. a rebuilt or benchmark dataset)."""
+    global _store, _index, _predicted_risk
+    store = CVEStore(store_path)
+    with _lock:
+        _store, _index, _predicted_risk = store, None, None
+    return store
+
+
+def get_index() -> CVEIndex:
+    global _index
+    if _index is None:
+        store = get_store()
+        with _lock:
+            if _index is None:
+                with span("cve_index_build"):
+                    _index = CVEIndex.from_store(store)
+    return _index
+
+
+def register_risk_scorer(scorer: Callable[[CVEStore], np.ndarray]):
+    """Set how predicted_risk is computed for the whole store; runs on first use."""
+    global _risk_scorer, _predicted_risk
+    with _lock:
+        _risk_scorer = scorer
+        _predicted_risk = None
+
+
+def swap_risk_scorer(scorer: Callable[[CVEStore], np.ndarray]):
+    """Score the store with `scorer` first, then switch scorer and scores in one step.
+
+    Unlike register_risk_scorer, lookups never wait for the rescoring: they keep
+    reading the old column until the new one is complete.
+    """
+    global _risk_scorer, _predicted_risk
+    store = get_store()
+    with span("risk_scoring"):
+        risk = np.asarray(scorer(store), dtype=np.float64)
+    with _lock:
+        _risk_scorer = scorer
+        _predicted_risk = risk if _store is store else None
+
+
+def get_predicted_risk():
+    global _predicted_risk
+    if _predicted_risk is None and _risk_scorer is not None:
+        store = get_store()
+        with _lock:
+            if _predicted_risk is None:
+                with span("risk_scoring"):
+                    _predicted_risk = np.asarray(_risk_scorer(store), dtype=np.float64)
+    return _predicted_risk
+
+
+def _score(value):
+    # NVD rows without CVSS v3 metrics have no scores; report null rather than NaN
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _records(row_ids):
+    store = get_store()
+    cvss = store.numeric["cvss_score"]
+    exploitability = store.numeric["exploitability_score"]
+    # once the risk model has scored the dataset, hand back its column too
+    risk = get_predicted_risk()
+    records = []
+    for i in row_ids:
+        record = {
+            "cve_id": store.cve_id(i),
+            "cvss_score": _score(cvss[i]),
+            "exploitability_score": _score(exploitability[i]),
+            "severity": store.severity(i),
+            "description": store.description(i),
+        }
+        if risk is not None:
+            record["predicted_risk"] = _score(risk[i])
+        records.append(record)
+    return records
+
 
 def find_cves_for_tech(tech_name: str):
-    results = CVE_DF[CVE_DF["description"].str.contains(tech_name, case=False, na=False)]
-    return results[["cve_id", "cvss_score", "exploitability_score", "severity", "description"]].to_dict(orient="records")
\ No newline at end of file
+    index = get_index()
+    with span("cve_index_lookup"):
+        rows = index.lookup(tech_name, tech_name.lower() in WHOLE_WORD_TECHS)
+    with span("cve_records"):
+        records = _records(rows)
+    CVES_MATCHED.inc(len(records))
+    return records
+
+
+def find_cves_for_techs(tech_names: Iterable[str]) -> Dict[str, List[dict]]:
+    """Look up several technologies at once, grouped by tech name."""
+    index = get_index()
+    with span("cve_index_lookup"):
+        matches = index.lookup_many(tech_names, WHOLE_WORD_TECHS)
+    with span("cve_records"):
+        records = {tech: _records(rows) for tech, rows in matches.items()}
+    CVES_MATCHED.inc(sum(len(r) for r in records.values()))
+    return records
+
+
+# ---------- Ranked lookups ----------
+# Generic tech names match thousands of CVEs. These work on row ids and the
+# score column, and only build records for the rows that are returned.
+
+def match_rows(tech_names: Iterable[str]) -> Dict[str, np.ndarray]:
+    """Matching row ids (ascending) per tech name."""
+    index = get_index()
+    with span("cve_index_lookup"):
+        matches = index.lookup_many(tech_names, WHOLE_WORD_TECHS)
+    rows_by_tech = {tech: np.asarray(rows, dtype=np.int64) for tech, rows in matches.items()}
+    CVES_MATCHED.inc(sum(len(rows) for rows in rows_by_tech.values()))
+    return rows_by_tech
+
+
+def risk_summary(rows_by_tech: Dict[str, np.ndarray]) -> Tuple[float, int]:
+    """(total predicted risk, number of matches); a CVE matched by two techs counts twice."""
+    risk = get_predicted_risk()
+    count = sum(len(rows) for rows in rows_by_tech.values())
+    if risk is None:
+        return 0.0, count
+    return sum(float(np.nansum(risk[rows])) for rows in rows_by_tech.values()), count
+
+
+def _rank_scores():
+    risk = get_predicted_risk()
+    if risk is None:
+        # no risk model registered: rank by CVSS
+        risk = get_store().numeric["cvss_score"]
+    # unscored CVEs last; NaN would also break the partition in _best and the cursor comparisons
+    return np.nan_to_num(risk, nan=-np.inf)
+
+
+def _best(rows, scores, k):
+    """Positions of the k highest scores, ties going to the lowest row ids (rows are ascending)."""
+    if len(rows) <= k:
+        return np.arange(len(rows))
+    kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+    better = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - len(better)]
+    return np.concatenate([better, ties])
+
+
+def top_cves(rows_by_tech: Dict[str, np.ndarray], k: int, after: Optional[tuple] = None):
+    """The k highest-risk matches over all techs, as records with a "tech" key.
+
+    Order is (risk desc, row id, tech). `after` is the (risk, row, tech) key of
+    the last record of a previous page, so pages can be walked with a cursor.
+    Returns (records, key of the last record or None, matches left from `after` on).
+    """
+    scores = _rank_scores()
+    candidates = []
+    remaining = 0
+    with span("cve_top_k"):
+        for tech, rows in rows_by_tech.items():
+            tech_scores = scores[rows]
+            if after is not None:
+                a_score, a_row, a_tech = after
+                keep = (tech_scores < a_score) | (
+                    (tech_scores == a_score) & ((rows > a_row) | ((rows == a_row) & (tech > a_tech))))
+                rows, tech_scores = rows[keep], tech_scores[keep]
+            remaining += len(rows)
+            # at most k per tech survive, so the merge below never sees every match
+            for i in _best(rows, tech_scores, k):
+                candidates.append((-float(tech_scores[i]), int(rows[i]), tech))
+        best = heapq.nsmallest(k, candidates)
+    with span("cve_records"):
+        records = _records([row for _, row, _ in best])
+    for record, (_, _, tech) in zip(records, best):
+        record["tech"] = tech
+    last = (-best[-1][0], best[-1][1], best[-1][2]) if best else None
+    return records, last, remaining
@@ -0,0 +1,198 @@
+"""
+cve_store.py
+
+Read-only, memory-mapped columnar CVE store.
+
+Parsing the CSV in every uvicorn worker costs seconds of startup and a
+private copy of every description string per process. The store keeps each
+column in its own flat file and maps them on first use, so the OS page cache
+is shared by all workers and only the pages a lookup touches get read.
+
+Layout of a store directory:
+
+    meta.json                      row count, severity levels, format version
+    cvss_score.f8                  float64 per row (NaN = missing)
+    exploitability_score.f8        float64 per row (NaN = missing)
+    severity.i1                    int8 code into meta["severity_levels"], -1 = missing
+    cve_id.off / cve_id.bin        int64 offsets (rows + 1) into a UTF-8 blob
+    description.off / .bin         same, for descriptions
+    tokens.txt                     sorted description-token vocabulary, one per line
+    postings.off / postings.i4     int64 offsets (tokens + 1) into int32 row ids
+
+The token postings are the cve_index inverted index, precomputed at convert
+time so workers don't have to tokenize every description on startup.
+
+The store path is a symlink to a versioned directory that convert_csv
+swaps atomically (see store_dir.py), so a worker opening it never finds it
+missing.
+
+Convert an existing CSV with:
+    python -m services.cve_store data/cve_2025_dataset.csv data/cve_store
+"""
+
+import json
+import mmap
+import os
+import shutil
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+from services import store_dir
+from services.cve_index import tokenize
+
+FORMAT_VERSION = 1
+NUMERIC_COLUMNS = ["cvss_score", "exploitability_score"]
+TEXT_COLUMNS = ["cve_id", "description"]
+CSV_CHUNK_ROWS = 50000
+
+
+def _map_array(path, dtype):
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def _map_blob(path):
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        # the mapping stays valid after the file object is closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class CVEStore:
+    """Columns of a converted CVE dataset, memory-mapped from `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        # resolve the link once so every file comes from the same version, even if it is swapped meanwhile
+        self.dir = os.path.realpath(path)
+        with open(os.path.join(self.dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported CVE store version in {path}: {self.meta.get('version')}")
+        self.rows = self.meta["rows"]
+        self.severity_levels = self.meta["severity_levels"]
+
+        p = lambda name: os.path.join(self.dir, name)
+        self.numeric = {c: _map_array(p(f"{c}.f8"), np.float64) for c in NUMERIC_COLUMNS}
+        self.severity_codes = _map_array(p("severity.i1"), np.int8)
+        self._text = {c: (_map_array(p(f"{c}.off"), np.int64), _map_blob(p(f"{c}.bin"))) for c in TEXT_COLUMNS}
+        # everything is mapped now: store_dir may prune this version while the store is still in use
+        self._tokens = _map_blob(p("tokens.txt"))
+        self._postings = (_map_array(p("postings.off"), np.int64), _map_array(p("postings.i4"), np.int32))
+
+    def __len__(self):
+        return self.rows
+
+    def text(self, column, row):
+        offsets, blob = self._text[column]
+        return blob[offsets[row]:offsets[row + 1]].decode("utf-8")
+
+    def cve_id(self, row):
+        return self.text("cve_id", row)
+
+    def description(self, row):
+        return self.text("description", row)
+
+    def severity(self, row):
+        code = self.severity_codes[row]
+        return self.severity_levels[code] if code >= 0 else None
+
+    def postings(self):
+        """{token: int32 row ids} backed by the mapped postings file (no copies)."""
+        tokens = self._tokens[:].decode("utf-8").split("\n") if self.meta["tokens"] else []
+        offsets, rows = self._postings
+        return {tok: rows[offsets[i]:offsets[i + 1]] for i, tok in enumerate(tokens)}
+
+
+# ---------- Conversion ----------
+
+def convert_csv(csv_path, store_path, chunk_rows=CSV_CHUNK_ROWS):
+    """Build a store from a dataset CSV. Written to a temp dir, then published as a new version.
+
+    Callers that may race (several workers finding the store stale) should
+    hold store_dir.lock(store_path) and re-check is_stale first.
+    """
+    import pandas as pd
+
+    tmp_path = f"{store_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    p = lambda name: os.path.join(tmp_path, name)
+
+    severity_levels = []
+    postings = defaultdict(list)
+    text_offsets = {c: [0] for c in TEXT_COLUMNS}
+    rows = 0
+    files = {name: open(p(name), "wb") for name in
+             [f"{c}.f8" for c in NUMERIC_COLUMNS] + ["severity.i1"] + [f"{c}.bin" for c in TEXT_COLUMNS]}
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            for c in NUMERIC_COLUMNS:
+                files[f"{c}.f8"].write(chunk[c].astype(np.float64).to_numpy().tobytes())
+
+            codes = np.full(len(chunk), -1, dtype=np.int8)
+            for i, sev in enumerate(chunk["severity"].tolist()):
+                if isinstance(sev, str):
+                    if sev not in severity_levels:
+                        severity_levels.append(sev)
+                    codes[i] = severity_levels.index(sev)
+            files["severity.i1"].write(codes.tobytes())
+
+            for c in TEXT_COLUMNS:
+                out, offsets = files[f"{c}.bin"], text_offsets[c]
+                for value in chunk[c].tolist():
+                    data = value.encode("utf-8") if isinstance(value, str) else b""
+                    out.write(data)
+                    offsets.append(offsets[-1] + len(data))
+
+            for i, desc in enumerate(chunk["description"].tolist()):
+                if isinstance(desc, str):
+                    for token in set(tokenize(desc)):
+                        postings[token].append(rows + i)
+            rows += len(chunk)
+    finally:
+        for f in files.values():
+            f.close()
+
+    for c in TEXT_COLUMNS:
+        np.asarray(text_offsets[c], dtype=np.int64).tofile(p(f"{c}.off"))
+
+    tokens = sorted(postings)
+    with open(p("tokens.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(tokens))
+    lengths = np.fromiter((len(postings[t]) for t in tokens), dtype=np.int64, count=len(tokens))
+    np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64).tofile(p("postings.off"))
+    with open(p("postings.i4"), "wb") as f:
+        for t in tokens:
+            f.write(np.asarray(postings[t], dtype=np.int32).tobytes())
+
+    with open(p("meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "rows": rows, "severity_levels": severity_levels,
+                   "tokens": len(tokens), "source": os.path.basename(csv_path)}, f)
+
+    # swap the link so concurrent workers see the old or the new store, never a missing one
+    version_path = store_dir.new_version_path(store_path)
+    os.rename(tmp_path, version_path)
+    store_dir.publish(version_path, store_path)
+    print(f"[INFO] Wrote CVE store with {rows} rows and {len(tokens)} tokens to {store_path}")
+    return store_path
+
+
+def is_stale(store_path, csv_path):
+    """True if the store is missing or older than the CSV it was built from."""
+    meta = os.path.join(store_path, "meta.json")
+    if not os.path.exists(meta):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(meta)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m services.cve_store <dataset.csv> <store_dir>")
+        sys.exit(1)
+    with store_dir.lock(sys.argv[2]):
+        convert_csv(sys.argv[1], sys.argv[2])
@@ -0,0 +1,296 @@
+"""
+external_resources.py
+
+Fetch and check the external scripts and iframes a page loads.
+
+Most miners and obfuscated droppers are not inline; they sit behind a
+<script src> or an iframe. For each page, up to PAGE_SCANNER_MAX_RESOURCES of
+those URLs are downloaded concurrently through the shared HTTP pools
+(services/net.py) and run
+through the same eval/atob/base64/miner checks as inline scripts:
+
+    PAGE_SCANNER_MAX_RESOURCES         scripts+iframes checked per page (0 = off)
+    PAGE_SCANNER_RESOURCE_CONCURRENCY  downloads in flight per page
+    PAGE_SCANNER_RESOURCE_TIMEOUT      seconds per download
+    PAGE_SCANNER_RESOURCE_BUDGET       seconds for all of a page's resources
+    PAGE_SCANNER_RESOURCE_MAX_KB       bytes read per resource (the rest is ignored)
+
+Resource URLs are chosen by the page, so hosts that resolve to loopback,
+private, link-local or otherwise non-public addresses are refused before
+anything is sent, and redirects are followed by hand so every hop gets the
+same check.
+
+Results are cached twice: by URL (RESOURCE_CACHE, so a CDN copy of jQuery is
+fetched once a day, not once per page) and by content hash (SIGNALS_CACHE, so
+the same bundle served from many URLs is only scanned once). Concurrent
+requests for one URL share a single download.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import ipaddress
+import os
+import re
+import socket
+from urllib.parse import urljoin, urlsplit
+
+from services.html_rules import document_signals, script_signals
+from services.metrics import BYTES_DOWNLOADED, EXTERNAL_RESOURCES
+from services.net import DEFAULT_HEADERS, get_async_client, get_session, host_slot, hostname_of
+from services.scan_cache import RESOURCE_CACHE, SIGNALS_CACHE
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except Exception:
+    HTTPX_AVAILABLE = False
+
+MAX_RESOURCES = int(os.environ.get("PAGE_SCANNER_MAX_RESOURCES", 20))
+RESOURCE_CONCURRENCY = int(os.environ.get("PAGE_SCANNER_RESOURCE_CONCURRENCY", 8))
+RESOURCE_TIMEOUT = float(os.environ.get("PAGE_SCANNER_RESOURCE_TIMEOUT", 5))
+RESOURCE_BUDGET = float(os.environ.get("PAGE_SCANNER_RESOURCE_BUDGET", 8))
+MAX_RESOURCE_BYTES = int(os.environ.get("PAGE_SCANNER_RESOURCE_MAX_KB", 2048)) * 1024
+MAX_RESOURCE_REDIRECTS = 5
+
+RESOURCE_HEADERS = {**DEFAULT_HEADERS, "Accept": "*/*"}
+
+RESOURCE_SRC_RE = re.compile(
+    r"""<(script|iframe)\b[^>]*?\ssrc\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""",
+    re.IGNORECASE,
+)
+
+
+def extract_resource_urls(html, base_url, limit=None):
+    """[(kind, absolute url)] of external scripts and iframes, in page order, deduplicated."""
+    limit = MAX_RESOURCES if limit is None else limit
+    seen, resources = set(), []
+    if not limit:
+        return resources
+    for m in RESOURCE_SRC_RE.finditer(html):
+        src = (m.group(2) or m.group(3) or m.group(4) or "").strip()
+        url = urljoin(base_url, src).split("#", 1)[0]
+        if urlsplit(url).scheme not in ("http", "https") or url in seen:
+            continue
+        seen.add(url)
+        resources.append((m.group(1).lower(), url))
+        if len(resources) >= limit:
+            break
+    return resources
+
+
+class BlockedHost(Exception):
+    pass
+
+
+class TooManyRedirects(Exception):
+    pass
+
+
+def _is_public(address):
+    ip = ipaddress.ip_address(address.split("%", 1)[0])  # drop an IPv6 zone id
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def _literal_ip(host):
+    try:
+        return ipaddress.ip_address(host)
+    except ValueError:
+        return None
+
+
+def _check_host(url):
+    """Raise BlockedHost unless every address url's host resolves to is public."""
+    host = hostname_of(url)
+    if not host:
+        raise BlockedHost(url)
+    if _literal_ip(host) is not None:
+        addresses = [host]
+    else:
+        try:
+            addresses = [info[4][0] for info in socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)]
+        except socket.gaierror:
+            raise BlockedHost(host)
+    if not addresses or not all(_is_public(a) for a in addresses):
+        raise BlockedHost(host)
+
+
+async def _check_host_async(url):
+    # literal IPs need no lookup; names are resolved off the event loop
+    host = hostname_of(url)
+    if host and _literal_ip(host) is not None:
+        _check_host(url)
+    else:
+        await asyncio.to_thread(_check_host, url)
+
+
+def _signals(kind, body):
+    """Signals for a downloaded body, scanned only if this exact content is new."""
+    digest = hashlib.sha256(body).hexdigest()
+    key = f"{kind}:{digest}"
+    signals = SIGNALS_CACHE.get(key)
+    if signals is None:
+        text = body.decode("utf-8", "replace")
+        signals = document_signals(text) if kind == "iframe" else script_signals(text)
+        SIGNALS_CACHE.set(key, signals)
+        EXTERNAL_RESOURCES.inc(result="scanned")
+    else:
+        EXTERNAL_RESOURCES.inc(result="content_cached")
+    return {"sha256": digest, "bytes": len(body), "truncated": len(body) >= MAX_RESOURCE_BYTES, **signals}
+
+
+def _cached(kind, url):
+    entry = RESOURCE_CACHE.get(url)
+    if entry is not None and entry["kind"] == kind:
+        EXTERNAL_RESOURCES.inc(result="url_cached")
+        return {**entry, "cached": True}
+    return None
+
+
+def _checked(kind, url, body):
+    entry = {"kind": kind, "url": url, **_signals(kind, body)}
+    RESOURCE_CACHE.set(url, entry)
+    return entry
+
+
+def _failed(kind, url, error):
+    # failures aren't cached: the CDN may just have been slow this time
+    EXTERNAL_RESOURCES.inc(result="failed")
+    return {"kind": kind, "url": url, "error": error}
+
+
+def summarize(resources, skipped=0):
+    return {
+        "resources": resources,
+        "checked": sum(1 for r in resources if "error" not in r),
+        "cached": sum(1 for r in resources if r.get("cached")),
+        "failed": sum(1 for r in resources if "error" in r),
+        "skipped": skipped,
+    }
+
+
+# ---------- Sync fetching (CLI / scan_page) ----------
+
+RESOURCE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=RESOURCE_CONCURRENCY,
+                                                          thread_name_prefix="resource-fetch")
+
+
+def _download(url):
+    """First MAX_RESOURCE_BYTES of the body at url."""
+    body = bytearray()
+    for _ in range(MAX_RESOURCE_REDIRECTS + 1):
+        _check_host(url)
+        with get_session().get(url, headers=RESOURCE_HEADERS, timeout=RESOURCE_TIMEOUT, stream=True,
+                               allow_redirects=False) as r:
+            if r.is_redirect:
+                url = urljoin(url, r.headers["location"])
+                continue
+            r.raise_for_status()
+            for chunk in r.iter_content(64 * 1024):
+                body += chunk
+                if len(body) >= MAX_RESOURCE_BYTES:
+                    break
+        BYTES_DOWNLOADED.inc(len(body))
+        return bytes(body[:MAX_RESOURCE_BYTES])
+    raise TooManyRedirects(url)
+
+
+def check_resource(kind, url):
+    cached = _cached(kind, url)
+    if cached is not None:
+        return cached
+    try:
+        return _checked(kind, url, _download(url))
+    except Exception as e:
+        return _failed(kind, url, type(e).__name__)
+
+
+def scan_resources(resources, budget=RESOURCE_BUDGET):
+    """Check [(kind, url)] concurrently in threads; returns the summarize() report."""
+    futures = [RESOURCE_EXECUTOR.submit(check_resource, kind, url) for kind, url in resources]
+    done, pending = concurrent.futures.wait(futures, timeout=budget)
+    for future in pending:
+        future.cancel()
+    return summarize([f.result() for f in futures if f in done], skipped=len(pending))
+
+
+# ---------- Async fetching (API) ----------
+
+_inflight = {}  # url -> task downloading it, shared by concurrent scans
+_inflight_loop = None
+
+
+def _inflight_tasks():
+    # tasks belong to the event loop that created them
+    global _inflight_loop
+    loop = asyncio.get_running_loop()
+    if _inflight_loop is not loop:
+        _inflight.clear()
+        _inflight_loop = loop
+    return _inflight
+
+
+async def _download_async(url):
+    if not HTTPX_AVAILABLE:
+        return await asyncio.to_thread(_download, url)
+    body = bytearray()
+    for _ in range(MAX_RESOURCE_REDIRECTS + 1):
+        await _check_host_async(url)
+        async with host_slot(url):
+            async with get_async_client().stream("GET", url, headers=RESOURCE_HEADERS, timeout=RESOURCE_TIMEOUT,
+                                                 follow_redirects=False) as r:
+                if r.is_redirect:
+                    url = urljoin(url, r.headers["location"])
+                    continue
+                r.raise_for_status()
+                async for chunk in r.aiter_bytes():
+                    body += chunk
+                    if len(body) >= MAX_RESOURCE_BYTES:
+                        break
+        BYTES_DOWNLOADED.inc(len(body))
+        return bytes(body[:MAX_RESOURCE_BYTES])
+    raise TooManyRedirects(url)
+
+
+async def _fetch_and_check(kind, url):
+    try:
+        body = await _download_async(url)
+    except Exception as e:
+        return _failed(kind, url, type(e).__name__)
+    return _checked(kind, url, body)
+
+
+async def check_resource_async(kind, url, semaphore=None):
+    cached = _cached(kind, url)
+    if cached is not None:
+        return cached
+    key = (kind, url)
+    inflight = _inflight_tasks()
+    task = inflight.get(key)
+    if task is None:
+        async def run():
+            if semaphore is None:
+                return await _fetch_and_check(kind, url)
+            async with semaphore:
+                return await _fetch_and_check(kind, url)
+
+        task = asyncio.ensure_future(run())
+        inflight[key] = task
+        task.add_done_callback(lambda t: inflight.pop(key, None) if inflight.get(key) is t else None)
+    # shield: one scan giving up on its budget must not cancel another's download
+    return await asyncio.shield(task)
+
+
+async def scan_resources_async(resources, budget=RESOURCE_BUDGET):
+    """Async twin of scan_resources: concurrent downloads on the shared client, bounded by `budget`."""
+    if not resources:
+        return summarize([])
+    semaphore = asyncio.Semaphore(RESOURCE_CONCURRENCY)
+    tasks = [asyncio.ensure_future(check_resource_async(kind, url, semaphore)) for kind, url in resources]
+    done, pending = await asyncio.wait(tasks, timeout=budget)
+    for task in pending:
+        task.cancel()
+    return summarize([t.result() for t in tasks if t in done], skipped=len(pending))
+
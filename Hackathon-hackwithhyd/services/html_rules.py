@@ -0,0 +1,417 @@
+"""
+html_rules.py
+
+The page-source heuristics used by analyze_html, written as declarative rules
+over a PageContext.
+
+PageContext parses the document once and collects everything the rules need
+in a single walk of the tree: script/iframe/form/meta/anchor tags plus the
+visible text. Inline scripts and page text are each scanned once with a
+combined multi-pattern matcher, and rules only read those precomputed facts.
+
+Each rule is a dict with the finding `type`, the score `factor` it feeds, the
+`points` it adds, and a `check(ctx)` that returns the finding body (desc
+first, then any extra fields) or None.
+"""
+
+import os
+import re
+from functools import cached_property
+from urllib.parse import urlparse, urljoin
+
+from bs4 import BeautifulSoup, Tag
+
+from services.blocklist import get_blocklist
+from services.net import host_of, public_suffix, registrable_domain, split_domain
+
+# Helper regexes
+BASE64_RE = re.compile(r"(?:[A-Za-z0-9+/]{40,}={0,2})")
+EVAL_RE = re.compile(r"\beval\(", re.IGNORECASE)
+ATOB_RE = re.compile(r"\batob\(", re.IGNORECASE)
+DOCUMENT_WRITE_RE = re.compile(r"\bdocument\.write\(", re.IGNORECASE)
+META_REFRESH_RE = re.compile(r'<meta[^>]+http-equiv=["\']refresh["\']', re.IGNORECASE)
+IP_URL_RE = re.compile(r"^https?://\d+\.\d+\.\d+\.\d+")
+DOMAIN_DIGITS_RE = re.compile(r"[0-9]{4,}")
+SUSPICIOUS_TLDS = { "tk","cn","ru","xyz","top" }  # heuristic TLDs often abused; adjust as needed
+CRYPTO_MINER_SIGNATURES = [
+    r"WebAssembly\.instantiate",    # wasm miner clues
+    r"coinhive",                    # old miner
+    r"miner",                       # generic word
+    r"wasm",
+    r"cryptonight",
+    r"asmCrypto"
+]
+# simple brand keywords list (extend as required)
+BRAND_KEYWORDS = ["paypal", "google", "microsoft", "amazon", "apple", "bankofamerica", "chase", "hsbc"]
+
+# Parser backend: "html.parser" (default, pure Python) or "lxml" if installed.
+# lxml is several times faster but repairs broken markup differently, so
+# findings on malformed pages can differ slightly from html.parser.
+HTML_PARSER = os.environ.get("PAGE_SCANNER_PARSER", "html.parser")
+
+COLLECTED_TAGS = ("script", "iframe", "form", "meta", "a")
+
+
+class MultiMatcher:
+    """Find which of many patterns occur in a text with one regex scan.
+
+    Every pattern sits in a lookahead, so matches may overlap ("wasmCrypto"
+    reports both `wasm` and `asmCrypto`). Two patterns that match at the very
+    same offset only report the first, which is fine for literal-ish signatures
+    with distinct prefixes.
+    """
+
+    def __init__(self, patterns, flags=re.IGNORECASE):
+        self.keys = list(patterns)
+        body = "|".join(f"(?P<p{i}>{pat})" for i, pat in enumerate(patterns.values()))
+        self.regex = re.compile(f"(?=(?:{body}))", flags)
+
+    def found(self, text):
+        """Set of keys whose pattern occurs in `text`."""
+        hits = set()
+        for m in self.regex.finditer(text):
+            hits.add(self.keys[int(m.lastgroup[1:])])
+            if len(hits) == len(self.keys):
+                break
+        return hits
+
+
+SCRIPT_MATCHER = MultiMatcher({
+    "eval": EVAL_RE.pattern,
+    "document.write": DOCUMENT_WRITE_RE.pattern,
+    "atob": ATOB_RE.pattern,
+    **{f"miner:{sig}": sig for sig in CRYPTO_MINER_SIGNATURES},
+})
+EVAL_KEYS = {"eval", "document.write", "atob"}
+TEXT_MATCHER = MultiMatcher({b: re.escape(b) for b in BRAND_KEYWORDS})
+
+
+# memoized in services.net: the same script/CDN hosts come up on every page
+domain_of = host_of
+
+
+SUSPICIOUS_TLD_HINT_RE = re.compile("|".join(sorted(SUSPICIOUS_TLDS)), re.IGNORECASE)
+
+def suspicious_suffix(href):
+    """Public suffix of `href` if it is in SUSPICIOUS_TLDS, else None."""
+    # the suffix is a substring of the href, so most links skip tldextract entirely
+    if not SUSPICIOUS_TLD_HINT_RE.search(href):
+        return None
+    suffix = public_suffix(href)
+    if suffix and suffix.lower() in SUSPICIOUS_TLDS:
+        return suffix
+    return None
+
+
+class PageContext:
+    """Everything the rules look at, gathered in one pass over the parsed page."""
+
+    def __init__(self, html, original_url, parser=None):
+        self.original_url = original_url
+        self.orig_domain = domain_of(original_url)
+        soup = _parse(html, parser or HTML_PARSER)
+
+        tags = {name: [] for name in COLLECTED_TAGS}
+        text_parts = []
+        # same string types soup.get_text() would join (no script/style/comments)
+        text_types = soup.interesting_string_types
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                bucket = tags.get(node.name)
+                if bucket is not None:
+                    bucket.append(node)
+            elif type(node) in text_types:
+                text_parts.append(node)
+
+        self.scripts = tags["script"]
+        self.iframes = tags["iframe"]
+        self.forms = tags["form"]
+        self.meta = tags["meta"]
+        self.links = tags["a"]
+        self.text_lower = " ".join(text_parts).lower()
+
+    @cached_property
+    def inline_script_stats(self):
+        eval_count = 0
+        base64_found = False
+        miner_hits = set()
+        for s in self.scripts:
+            text = s.string or ""
+            if not text:
+                # external scripts (src) are fetched and checked by external_resources
+                continue
+            hits = SCRIPT_MATCHER.found(text)
+            if hits & EVAL_KEYS:
+                eval_count += 1
+            if not base64_found and BASE64_RE.search(text):
+                base64_found = True
+            miner_hits.update(h for h in hits if h.startswith("miner:"))
+        miners = [sig for sig in CRYPTO_MINER_SIGNATURES if f"miner:{sig}" in miner_hits]
+        return {"eval_count": eval_count, "base64": base64_found, "miners": miners}
+
+    @cached_property
+    def brands_found(self):
+        hits = TEXT_MATCHER.found(self.text_lower)
+        return [b for b in BRAND_KEYWORDS if b in hits]
+
+
+def _parse(html, parser):
+    try:
+        return BeautifulSoup(html, parser)
+    except Exception:
+        # requested backend not installed
+        return BeautifulSoup(html, "html.parser")
+
+
+# ---------- Rules ----------
+
+def _meta_refresh(ctx):
+    for m in ctx.meta:
+        if (m.get("http-equiv") or "").lower() == "refresh":
+            return {"desc": "Meta refresh / auto-redirect detected"}
+    return None
+
+def _hidden_iframes(ctx):
+    hidden = []
+    for ifr in ctx.iframes:
+        w = (ifr.get("width") or "").strip()
+        h = (ifr.get("height") or "").strip()
+        style = (ifr.get("style") or "").lower()
+        src = ifr.get("src") or ""
+        if ("0" in (w+h)) or ("display:none" in style) or ("visibility:hidden" in style):
+            hidden.append(src)
+    if hidden:
+        return {"desc": "Hidden iframes found", "count": len(hidden), "examples": hidden[:3]}
+    return None
+
+def _obfuscated_js(ctx):
+    eval_count = ctx.inline_script_stats["eval_count"]
+    if eval_count > 0:
+        return {"desc": f"Use of eval/atob/document.write found in inline scripts ({eval_count} occurrences)"}
+    return None
+
+def _base64_payload(ctx):
+    if ctx.inline_script_stats["base64"]:
+        return {"desc": "Long base64-like strings found in inline scripts (possible encoded payloads)"}
+    return None
+
+def _crypto_miner(ctx):
+    miners = ctx.inline_script_stats["miners"]
+    if miners:
+        return {"desc": "Crypto-miner-like signatures found in inline scripts", "signatures": miners}
+    return None
+
+def _phishing_forms(ctx):
+    phishing = []
+    for f in ctx.forms:
+        action = (f.get("action") or "").strip()
+        if not action:
+            # often forms without action submit to same origin - less suspicious
+            continue
+        action_full = urljoin(ctx.original_url, action)
+        action_domain = domain_of(action_full)
+        if action_domain and action_domain != ctx.orig_domain:
+            phishing.append({"form_action": action_full})
+    if phishing:
+        return {"desc": "Forms submit to external / mismatched domains", "examples": phishing[:3]}
+    return None
+
+def _many_external_scripts(ctx):
+    count = 0
+    examples = []
+    for s in ctx.scripts:
+        src = s.get("src")
+        if src:
+            # consider script external if domain differs from original
+            src_domain = domain_of(urljoin(ctx.original_url, src))
+            if src_domain and src_domain != ctx.orig_domain:
+                count += 1
+                if len(examples) < 5:
+                    examples.append(src)
+    if count > 10:
+        return {"desc": f"Large number of external scripts ({count}) loaded; may include trackers/malvertising", "examples": examples}
+    return None
+
+def _suspicious_links(ctx):
+    suspicious = []
+    for a in ctx.links:
+        href = a.get("href") or ""
+        if href:
+            if IP_URL_RE.match(href):
+                suspicious.append({"href": href, "reason": "IP in URL"})
+            suffix = suspicious_suffix(href)
+            if suffix:
+                suspicious.append({"href": href, "reason": f"Suspicious TLD .{suffix}"})
+    if suspicious:
+        return {"desc": "Suspicious links found in page", "examples": suspicious[:5]}
+    return None
+
+def _no_tls(ctx):
+    # we can't inspect the cert via HTML, but flag plain http
+    scheme = urlparse(ctx.original_url).scheme
+    if scheme and scheme.lower() == "http":
+        return {"desc": "URL served over HTTP (no TLS) - phishing sites often lack valid TLS"}
+    return None
+
+def _domain_heuristic(ctx):
+    # for real domain age use WHOIS; this only looks at the name itself
+    ext = split_domain(ctx.original_url)
+    domain_name = ".".join(part for part in [ext.domain, ext.suffix] if part)
+    if domain_name:
+        if DOMAIN_DIGITS_RE.search(ext.domain) or len(ext.domain) > 25 or len(ext.domain) < 3:
+            return {"desc": "Domain name looks suspicious by simple heuristics (very long / numeric)"}
+    return None
+
+def _brand_mismatch(ctx):
+    mismatched = [b for b in ctx.brands_found if b not in ctx.orig_domain]
+    if mismatched:
+        return {"desc": "Page contains brand keywords not matching domain (possible credential phishing)", "brands": mismatched[:5]}
+    return None
+
+
+def _blocklist_hits(ctx, urls):
+    absolute = (urljoin(ctx.original_url, u.strip()) for u in urls if u and u.strip())
+    return get_blocklist().check(u for u in absolute if u.startswith(("http://", "https://")))
+
+def _blocklisted_resources(ctx):
+    urls = [s.get("src") for s in ctx.scripts] + [i.get("src") for i in ctx.iframes] + [f.get("action") for f in ctx.forms]
+    hits = _blocklist_hits(ctx, urls)
+    if hits:
+        return {"desc": "Scripts, iframes or form targets on blocklisted hosts", "count": len(hits), "examples": hits[:5]}
+    return None
+
+def _blocklisted_links(ctx):
+    hits = _blocklist_hits(ctx, [a.get("href") for a in ctx.links])
+    if hits:
+        return {"desc": "Links to blocklisted hosts", "count": len(hits), "examples": hits[:5]}
+    return None
+
+
+RULES = [
+    {"type": "meta_refresh", "factor": "source_analysis", "points": 15, "check": _meta_refresh},
+    {"type": "hidden_iframes", "factor": "source_analysis", "points": 25, "check": _hidden_iframes},
+    {"type": "obfuscated_js", "factor": "source_analysis", "points": 25, "check": _obfuscated_js},
+    {"type": "base64_payload", "factor": "source_analysis", "points": 20, "check": _base64_payload},
+    {"type": "crypto_miner", "factor": "source_analysis", "points": 30, "check": _crypto_miner},
+    {"type": "phishing_forms", "factor": "source_analysis", "points": 35, "check": _phishing_forms},
+    {"type": "many_external_scripts", "factor": "source_analysis", "points": 15, "check": _many_external_scripts},
+    {"type": "suspicious_links", "factor": "url_pattern", "points": 15, "check": _suspicious_links},
+    {"type": "no_tls", "factor": "url_pattern", "points": 10, "check": _no_tls},
+    {"type": "domain_heuristic", "factor": "url_pattern", "points": 10, "check": _domain_heuristic},
+    {"type": "brand_mismatch", "factor": "source_analysis", "points": 30, "check": _brand_mismatch},
+    {"type": "blocklisted_resources", "factor": "feed_flag", "points": 60, "check": _blocklisted_resources},
+    {"type": "blocklisted_links", "factor": "feed_flag", "points": 25, "check": _blocklisted_links},
+]
+
+
+# ---------- External scripts and iframes ----------
+
+SCRIPT_BLOCK_RE = re.compile(r"<script\b[^>]*>(.*?)</script>", re.IGNORECASE | re.DOTALL)
+
+
+def script_signals(text):
+    """The inline-script checks (eval/atob/base64/miners) applied to one script body."""
+    hits = SCRIPT_MATCHER.found(text)
+    return {
+        "eval": bool(hits & EVAL_KEYS),
+        "base64": BASE64_RE.search(text) is not None,
+        "miners": [sig for sig in CRYPTO_MINER_SIGNATURES if f"miner:{sig}" in hits],
+    }
+
+
+def document_signals(html):
+    """script_signals over the inline scripts of a framed document."""
+    return script_signals("\n".join(SCRIPT_BLOCK_RE.findall(html)))
+
+
+class ResourceContext:
+    """What the external-resource rules look at: one signals dict per fetched script/iframe."""
+
+    def __init__(self, resources):
+        self.resources = [r for r in resources if "error" not in r]
+
+    def flagged(self, key):
+        return [r["url"] for r in self.resources if r.get(key)]
+
+
+def _external_obfuscated_js(ctx):
+    urls = ctx.flagged("eval")
+    if urls:
+        return {"desc": f"Use of eval/atob/document.write found in external scripts/iframes ({len(urls)})",
+                "examples": urls[:5]}
+    return None
+
+def _external_base64_payload(ctx):
+    urls = ctx.flagged("base64")
+    if urls:
+        return {"desc": "Long base64-like strings found in external scripts/iframes", "examples": urls[:5]}
+    return None
+
+def _external_crypto_miner(ctx):
+    urls = ctx.flagged("miners")
+    if urls:
+        found = {sig for r in ctx.resources for sig in r.get("miners", [])}
+        return {"desc": "Crypto-miner-like signatures found in external scripts/iframes",
+                "signatures": [sig for sig in CRYPTO_MINER_SIGNATURES if sig in found], "examples": urls[:5]}
+    return None
+
+
+# Big libraries legitimately use eval and base64 blobs, so these weigh a bit
+# less than the same thing inline
+EXTERNAL_RULES = [
+    {"type": "external_obfuscated_js", "factor": "source_analysis", "points": 15, "check": _external_obfuscated_js},
+    {"type": "external_base64_payload", "factor": "source_analysis", "points": 10, "check": _external_base64_payload},
+    {"type": "external_crypto_miner", "factor": "source_analysis", "points": 30, "check": _external_crypto_miner},
+]
+
+
+# ---------- Oversized documents ----------
+
+PARTIAL_FINDING = "analysis_partial"
+TAIL_SCAN_CHUNK = 1 << 18
+TAIL_SCAN_OVERLAP = 64  # longer than any SCRIPT_MATCHER signature
+
+
+def split_document(html, max_chars):
+    """(head, tail): head is at most max_chars long and ends before a tag starts."""
+    if not max_chars or len(html) <= max_chars:
+        return html, ""
+    cut = html.rfind("<", 0, max_chars)
+    if cut <= 0:
+        cut = max_chars
+    return html[:cut], html[cut:]
+
+
+# Lowercase literal core of every SCRIPT_MATCHER pattern; chunks containing none of
+# them can't match, and a substring test is far cheaper than the lookahead regex
+SIGNAL_HINTS = ["eval(", "document.write(", "atob("] + [
+    re.sub(r"\\(.)", r"\1", sig).lower() for sig in CRYPTO_MINER_SIGNATURES
+]
+
+
+def scan_signals(text):
+    """SCRIPT_MATCHER keys found anywhere in `text`, scanned in chunks without parsing."""
+    hits = set()
+    step = TAIL_SCAN_CHUNK
+    for start in range(0, len(text), step):
+        chunk = text[start:start + step + TAIL_SCAN_OVERLAP]
+        lowered = chunk.lower()
+        if any(hint in lowered for hint in SIGNAL_HINTS):
+            hits |= SCRIPT_MATCHER.found(chunk)
+    return hits
+
+
+def partial_finding(reason, desc, **extra):
+    """Finding that marks an analysis as incomplete (size, CPU or memory limit)."""
+    return {"type": PARTIAL_FINDING, "desc": desc, "reason": reason, **extra}
+
+
+def run_rules(ctx, score_factors, rules=RULES):
+    """Apply `rules` to `ctx`; returns findings and adds points to `score_factors`."""
+    findings = []
+    for rule in rules:
+        body = rule["check"](ctx)
+        if body is not None:
+            findings.append({"type": rule["type"], **body})
+            score_factors[rule["factor"]] += rule["points"]
+    return findings
@@ -0,0 +1,212 @@
+"""
+metrics.py
+
+In-process latency spans, counters and a Prometheus text exposition.
+
+    with span("cve_lookup"):            # time a stage
+        ...
+    record("fetch_static", seconds)     # or report a duration measured elsewhere
+    PAGES_FETCHED.inc(method="requests")
+
+Every span is observed into the `risk_api_stage_seconds` histogram. If the
+current request called `start_timings()`, it is also added to that request's
+timings dict (milliseconds). The dict lives in a ContextVar, so spans in child
+tasks and `asyncio.to_thread` calls land in the right request.
+
+SamplingProfiler is a tiny wall-clock sampler over sys._current_frames() that
+can be switched on and off at runtime. It writes collapsed stacks, the input
+format for flamegraph.pl and speedscope.
+"""
+
+import contextvars
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+# Seconds; covers sub-ms index lookups up to slow Playwright renders
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = []
+
+
+def _label_key(label_names, labels):
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+def _format_labels(label_names, key, extra=None):
+    pairs = list(zip(label_names, key)) + list(extra or [])
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.label_names, labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # key -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(self.label_names, key, [("le", repr(float(bound)))])
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.label_names, key, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {series[-2]}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_count{labels} {series[-2]}")
+                lines.append(f"{self.name}_sum{labels} {series[-1]:.6f}")
+        return lines
+
+
+def render_prometheus():
+    """All registered metrics in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------- Metrics ----------
+
+STAGE_SECONDS = Histogram("risk_api_stage_seconds", "Time spent in each scan pipeline stage.", ["stage"])
+STAGE_TIMEOUTS = Counter("risk_api_stage_timeouts_total", "Stages that hit their timeout.", ["stage"])
+PAGES_FETCHED = Counter("risk_api_pages_fetched_total", "Pages fetched, by the method that produced the HTML.", ["method"])
+BYTES_DOWNLOADED = Counter("risk_api_bytes_downloaded_total", "Response body bytes downloaded by the static fetcher.")
+CACHE_LOOKUPS = Counter("risk_api_cache_lookups_total", "Scan cache lookups.", ["cache", "result"])
+CVES_MATCHED = Counter("risk_api_cves_matched_total", "CVE records returned by tech lookups.")
+FINDINGS = Counter("risk_api_findings_total", "Page scanner findings, by type.", ["type"])
+EXTERNAL_RESOURCES = Counter("risk_api_external_resources_total",
+                             "External scripts/iframes checked, by where the result came from.", ["result"])
+
+
+# ---------- Spans ----------
+
+_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+def start_timings():
+    """Collect this request's stage timings (ms) into the returned dict."""
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def record(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 1)
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+# ---------- Sampling profiler ----------
+
+class SamplingProfiler:
+    """Samples every thread's stack every `interval` seconds while running."""
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+        self._stacks = _Tally()
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.interval = None
+        self.samples = 0
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=0.01):
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stacks.clear()
+            self._stop.clear()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling and return the collapsed stacks ("a;b;c count" per line)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+PROFILER = SamplingProfiler()
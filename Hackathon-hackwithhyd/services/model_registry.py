@@ -0,0 +1,148 @@
+"""
+model_registry.py
+
+Versioned risk-model artifacts on local disk (RISK_MODEL_DIR, default models/):
+
+    versions/<version>/model.joblib    the fitted model
+    versions/<version>/metadata.json   how it was trained and how it scored
+    current.json                       {"version": ...}, the version the API serves
+
+models/risk_scoring_model.py writes a complete version directory, renames it
+into place, then points current.json at it with another atomic rename, so a
+reader never sees a half-written model. Each API process watches current.json
+and swaps in whatever it names (see reload_model in api/risk_api.py); rolling
+back is just pointing current.json at an older version:
+
+    python -m services.model_registry list
+    python -m services.model_registry activate <version>
+
+Until a version has been published, the legacy models/risk_model.joblib is
+served as version "legacy".
+
+joblib (and scikit-learn with the model) is imported only when a model is
+loaded or saved.
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.environ.get("RISK_MODEL_DIR", os.path.join(BASE_DIR, "models"))
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+CURRENT_PATH = os.path.join(MODELS_DIR, "current.json")
+LEGACY_MODEL_PATH = os.path.join(BASE_DIR, "models", "risk_model.joblib")
+LEGACY_VERSION = "legacy"
+
+
+def _version_dir(version):
+    return os.path.join(VERSIONS_DIR, version)
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def new_version():
+    """Sortable, unique version name: UTC time plus a random suffix."""
+    return time.strftime("%Y%m%d-%H%M%S", time.gmtime()) + "-" + os.urandom(3).hex()
+
+
+def list_versions():
+    if not os.path.isdir(VERSIONS_DIR):
+        return []
+    return sorted(v for v in os.listdir(VERSIONS_DIR)
+                  if os.path.exists(os.path.join(_version_dir(v), "metadata.json")))
+
+
+def read_metadata(version):
+    if version == LEGACY_VERSION:
+        return {"version": LEGACY_VERSION, "path": LEGACY_MODEL_PATH}
+    with open(os.path.join(_version_dir(version), "metadata.json")) as f:
+        return json.load(f)
+
+
+def current_version():
+    """The version current.json points at, or None before the first publish."""
+    try:
+        with open(CURRENT_PATH) as f:
+            return json.load(f)["version"]
+    except FileNotFoundError:
+        return None
+
+
+def current_stamp():
+    """Changes whenever current.json is replaced; cheap enough to poll."""
+    try:
+        st = os.stat(CURRENT_PATH)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_ino
+
+
+def activate(version):
+    if version != LEGACY_VERSION and version not in list_versions():
+        raise ValueError(f"Unknown model version: {version}")
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    _write_json(CURRENT_PATH, {"version": version, "activated_at": time.time()})
+
+
+def save_version(model, metadata, make_current=True):
+    """Write model + metadata as a new version (and serve it); returns the version name."""
+    import joblib
+
+    version = metadata.get("version") or new_version()
+    metadata = {**metadata, "version": version}
+    tmp_dir = _version_dir(version) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    joblib.dump(model, os.path.join(tmp_dir, "model.joblib"))
+    _write_json(os.path.join(tmp_dir, "metadata.json"), metadata)
+    os.replace(tmp_dir, _version_dir(version))
+    if make_current:
+        activate(version)
+    return version
+
+
+def load(version=None):
+    """(metadata, model) for `version`, by default the current one (or the legacy file)."""
+    import joblib
+
+    version = version or current_version() or LEGACY_VERSION
+    metadata = read_metadata(version)
+    if version == LEGACY_VERSION:
+        return metadata, joblib.load(LEGACY_MODEL_PATH)
+    return metadata, joblib.load(os.path.join(_version_dir(version), "model.joblib"))
+
+
+def prune(keep=5):
+    """Delete all but the newest `keep` versions; the current version is always kept."""
+    current = current_version()
+    old = [v for v in list_versions()[:-keep] if v != current] if keep > 0 else []
+    for version in old:
+        shutil.rmtree(_version_dir(version), ignore_errors=True)
+    return old
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "list":
+        current = current_version()
+        for version in list_versions():
+            meta = read_metadata(version)
+            print(f"{'*' if version == current else ' '} {version}  {meta.get('mode', '?'):<11}"
+                  f" rows={meta.get('trained_rows')}  r2={meta.get('r2')}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "activate":
+        activate(sys.argv[2])
+        print(f"[INFO] Serving model version {sys.argv[2]}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "prune":
+        print(f"[INFO] Deleted {prune(int(sys.argv[2]))}")
+    else:
+        print("Usage: python -m services.model_registry list\n"
+              "       python -m services.model_registry activate <version>\n"
+              "       python -m services.model_registry prune <keep>")
+        sys.exit(1)
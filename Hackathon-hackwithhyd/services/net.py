@@ -0,0 +1,201 @@
+"""
+net.py
+
+Shared URL parsing and HTTP connection pools for all services.
+
+URL helpers are memoized with bounded LRU caches: a page scan asks for the
+host or registrable domain of the same few script/CDN/anchor URLs over and
+over, and tldextract in particular is not cheap per call.
+
+    host_of(url)             "sub.example.co.uk:8080" (netloc), "" if unparsable
+    hostname_of(url)         "sub.example.co.uk" (lowercase, no port)
+    split_domain(url)        tldextract result (subdomain, domain, suffix)
+    registrable_domain(url)  "example.co.uk"
+    public_suffix(url)       "co.uk"
+
+tldextract never touches the network: it reads PUBLIC_SUFFIX_LIST (a local
+copy of public_suffix_list.dat) if set, else the snapshot bundled with the
+package.
+
+HTTP goes through one pooled client per process instead of a new connection
+(TCP + TLS handshake) per request:
+
+    get_session()            requests.Session, keep-alive, pool_maxsize
+                             connections per host
+    get_async_client()       httpx.AsyncClient (HTTP/2 if the h2 package is
+                             installed), one per event loop
+    host_slot(url)           async per-host concurrency limit for the above
+
+Neither client keeps cookies between requests: scans must not carry one
+site's session into the next scan, and a server only sends Set-Cookie (which
+the tech fingerprinter reads from each response) to a client without one.
+
+    HTTP_MAX_CONNECTIONS      total connections of the async client
+    HTTP_PER_HOST_CONNECTIONS connections to any one host (both clients)
+
+requests, httpx and tldextract are imported on first use.
+"""
+
+import asyncio
+import http.cookiejar
+import importlib.util
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlsplit
+
+URL_CACHE_SIZE = 65536
+
+PUBLIC_SUFFIX_LIST = os.environ.get("PUBLIC_SUFFIX_LIST")
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 200))
+HTTP_PER_HOST_CONNECTIONS = int(os.environ.get("HTTP_PER_HOST_CONNECTIONS", 10))
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36"
+DEFAULT_HEADERS = {"User-Agent": USER_AGENT}
+
+
+# ---------- URLs ----------
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor():
+    """tldextract.TLDExtract that only uses a local suffix list (no fetch, no cache dir)."""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                import tldextract
+                urls = (Path(PUBLIC_SUFFIX_LIST).resolve().as_uri(),) if PUBLIC_SUFFIX_LIST else ()
+                _extractor = tldextract.TLDExtract(suffix_list_urls=urls, cache_dir=None, fallback_to_snapshot=True)
+    return _extractor
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def host_of(url):
+    try:
+        return urlsplit(url).netloc
+    except ValueError:
+        return ""
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def hostname_of(url):
+    try:
+        return urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def split_domain(url):
+    return get_extractor()(url)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def registrable_domain(url):
+    """example.co.uk for https://a.b.example.co.uk/x (the host itself for IPs and intranet names)."""
+    ext = split_domain(url)
+    return ".".join(part for part in [ext.domain, ext.suffix] if part).lower()
+
+
+def public_suffix(url):
+    return split_domain(url).suffix
+
+
+# ---------- HTTP ----------
+
+# rejects every cookie, so the shared jars stay empty; responses still list theirs in r.cookies
+NO_COOKIES = http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests.Session with keep-alive connection pools (thread-safe for GETs)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                # pool_block: wait for a free connection rather than open more than the per-host cap
+                adapter = HTTPAdapter(pool_connections=256, pool_maxsize=HTTP_PER_HOST_CONNECTIONS, pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                session.cookies.set_policy(NO_COOKIES)
+                _session = session
+    return _session
+
+
+# event loop -> (AsyncClient, {host: [semaphore, tasks using or waiting for it]}); an AsyncClient
+# and its semaphores are bound to one loop, and each loop keeps its own until it goes away
+_loop_clients = weakref.WeakKeyDictionary()
+
+
+def _new_async_client():
+    import httpx
+
+    client = httpx.AsyncClient(
+        headers=DEFAULT_HEADERS, follow_redirects=True, http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=HTTP_MAX_CONNECTIONS // 2),
+    )
+    client.cookies.jar.set_policy(NO_COOKIES)
+    return client
+
+
+def _loop_state():
+    loop = asyncio.get_running_loop()
+    state = _loop_clients.get(loop)
+    if state is None:
+        # a closed loop's client can't be aclose()d any more; drop it so its sockets are collected
+        for closed in [l for l in list(_loop_clients) if l.is_closed()]:
+            _loop_clients.pop(closed, None)
+        state = _loop_clients[loop] = (_new_async_client(), {})
+    return state
+
+
+def get_async_client():
+    """Shared httpx.AsyncClient for the running event loop (an AsyncClient is bound to one loop)."""
+    return _loop_state()[0]
+
+
+@asynccontextmanager
+async def host_slot(url):
+    """Hold one of HTTP_PER_HOST_CONNECTIONS slots for url's host (httpx has no per-host limit)."""
+    host = hostname_of(url)
+    host_slots = _loop_state()[1]
+    entry = host_slots.get(host)
+    if entry is None:
+        entry = host_slots[host] = [asyncio.Semaphore(HTTP_PER_HOST_CONNECTIONS), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        # forget idle hosts so the table stays as small as the set of hosts in use
+        entry[1] -= 1
+        if entry[1] == 0 and host_slots.get(host) is entry:
+            del host_slots[host]
+
+
+async def close_async_client():
+    """Close the running loop's client (the next get_async_client() on this loop opens a new one)."""
+    state = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state[0].aclose()
+
+
+def warm_up():
+    """Load the suffix list now rather than during the first scan."""
+    get_extractor()("http://example.com")
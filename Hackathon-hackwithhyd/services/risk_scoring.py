@@ -0,0 +1,76 @@
+"""
+risk_scoring.py
+
+Bulk risk scoring for the CVE dataset.
+
+The model's only inputs are a CVE's CVSS and exploitability scores, which never
+change per CVE, so the whole dataset is scored in one vectorized predict() when
+the model loads. Requests then just read the `predicted_risk` column.
+
+pandas is imported inside the functions so importing this module is cheap.
+"""
+
+import numpy as np
+
+FEATURE_COLUMNS = ["cvss_score", "exploitability_score"]
+RISK_COLUMN = "predicted_risk"
+
+
+def feature_frame(df):
+    """Model inputs for each row; missing scores count as 0 like at training time."""
+    return df[FEATURE_COLUMNS].astype(float).fillna(0.0)
+
+
+def predict_risk(model, rows):
+    """Batch-predict risk for ad-hoc (cvss_score, exploitability_score) pairs."""
+    import pandas as pd
+    rows = pd.DataFrame(list(rows), columns=FEATURE_COLUMNS, dtype=float)
+    if rows.empty:
+        return []
+    return [float(r) for r in model.predict(rows)]
+
+
+def score_cve_dataset(model, df):
+    """Add a `predicted_risk` column to `df` in a single predict() call."""
+    import pandas as pd
+    if len(df):
+        df[RISK_COLUMN] = model.predict(feature_frame(df)).astype(float)
+    else:
+        df[RISK_COLUMN] = pd.Series(dtype=float)
+    return df
+
+
+def score_cve_store(model, store):
+    """predicted_risk for every row of a CVEStore, in a single predict() call."""
+    import pandas as pd
+    features = pd.DataFrame({c: np.asarray(store.numeric[c]) for c in FEATURE_COLUMNS})
+    if features.empty:
+        return np.empty(0, dtype=float)
+    return model.predict(feature_frame(features)).astype(float)
+
+
+class StagedRiskModel:
+    """A base model plus correction models, each fitted to the residuals of rows added later.
+
+    Incremental retraining appends a small correction fitted on the newly
+    ingested CVEs only, instead of refitting everything (warm-starting a
+    histogram booster on different rows re-bins the features under the old
+    trees, so that is not an option).
+    """
+
+    def __init__(self, base, corrections=()):
+        self.base = base
+        self.corrections = list(corrections)
+
+    @property
+    def stages(self):
+        return 1 + len(self.corrections)
+
+    def predict(self, X):
+        risk = np.asarray(self.base.predict(X), dtype=float)
+        for correction in self.corrections:
+            risk = risk + correction.predict(X)
+        return risk
+
+    def with_correction(self, correction):
+        return StagedRiskModel(self.base, self.corrections + [correction])
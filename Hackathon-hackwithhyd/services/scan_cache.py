@@ -0,0 +1,217 @@
+"""
+scan_cache.py
+
+Caches for repeated scans of the same URLs.
+
+Five layers, all ScanCache instances:
+
+    RESULT_CACHE     normalized URL -> finished /analyze or scan_page result
+                     (short TTL: a popular URL re-submitted by a dashboard is
+                     answered without touching the network)
+    ANALYSIS_CACHE   hash(final URL + fetched HTML) + blocklist version ->
+                     analyze_html result
+                     (content-addressed: if the page hasn't changed, parsing
+                     and the heuristics are skipped)
+    RESPONSE_CACHE   URL -> last plain-GET response + its ETag/Last-Modified,
+                     used by fetch_with_requests for conditional revalidation
+    RESOURCE_CACHE   external script/iframe URL -> its content hash and signals
+                     (a CDN copy of jQuery is downloaded once, not per page)
+    SIGNALS_CACHE    hash(resource body) -> signals found in it (the same
+                     bundle served from many URLs is only scanned once)
+
+Each cache is an in-process LRU with TTL and a byte-size cap. Set
+SCAN_CACHE_DIR to also persist entries in a local SQLite file so they survive
+restarts; the file is held to the same entry, byte and TTL limits (expired
+rows are dropped when read, and every DISK_PRUNE_EVERY writes the oldest rows
+go until the caps hold again).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+from services.metrics import CACHE_LOOKUPS
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+DISK_PRUNE_EVERY = 100
+
+
+def normalize_url(url):
+    """Canonical cache key for a URL: lowercase scheme/host, no default port or fragment."""
+    if not url.startswith(("http://", "https://")):
+        url = "http://" + url
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def content_key(final_url, html):
+    """Content address of a fetched page (the analysis also depends on its URL)."""
+    h = hashlib.sha256()
+    h.update(final_url.encode("utf-8", "replace"))
+    h.update(b"\0")
+    h.update(html.encode("utf-8", "replace"))
+    return h.hexdigest()
+
+
+def analysis_key(content_hash, version=""):
+    """ANALYSIS_CACHE key: the content address plus the blocklist version the analysis was checked against."""
+    return f"{content_hash}:{version}" if version else content_hash
+
+
+class ScanCache:
+    """Thread-safe LRU + TTL cache of JSON-serializable values, capped by entry count and bytes."""
+
+    def __init__(self, name, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300, disk_dir=None, clock=time.time):
+        self.name = name
+        self._clock = clock  # seconds since the epoch; injectable for tests
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._disk_writes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(disk_dir, f"{name}.sqlite3"), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, stored_at REAL, value TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at)")
+            self._prune_disk()
+
+    def get(self, key, max_age=None):
+        """Return the cached value, or None if missing/expired."""
+        ttl = self.ttl if max_age is None else max_age
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, _, value = entry
+                if now - stored_at <= ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+                    return value
+                self._evict(key)
+            if self._db is not None:
+                row = self._db.execute("SELECT stored_at, value FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[0] <= ttl:
+                    value = json.loads(row[1])
+                    self._store(key, value, row[0], len(row[1]))
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+                    return value
+                if row is not None and now - row[0] > self.ttl:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._db.commit()
+            self.misses += 1
+            CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+            return None
+
+    def get_stale(self, key):
+        """Return a value regardless of age (used for revalidation), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[2]
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    return json.loads(row[0])
+        return None
+
+    def set(self, key, value):
+        encoded = json.dumps(value, default=str)
+        stored_at = self._clock()
+        with self._lock:
+            self._store(key, value, stored_at, len(encoded))
+            if self._db is not None:
+                if len(encoded) > self.max_bytes:
+                    # too big to keep; don't leave an older copy behind either
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                else:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO entries (key, stored_at, value) VALUES (?, ?, ?)",
+                        (key, stored_at, encoded),
+                    )
+                    self._disk_writes += 1
+                    if self._disk_writes % DISK_PRUNE_EVERY == 0:
+                        self._prune_disk()
+                self._db.commit()
+
+    def touch(self, key):
+        """Mark an entry fresh again (e.g. after a 304 Not Modified)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (self._clock(), entry[1], entry[2])
+                self._entries.move_to_end(key)
+            if self._db is not None:
+                self._db.execute("UPDATE entries SET stored_at = ? WHERE key = ?", (self._clock(), key))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    # caller holds the lock
+    def _store(self, key, value, stored_at, size):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (stored_at, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _prune_disk(self):
+        """Drop expired rows, then the oldest ones until the entry and byte caps hold."""
+        self._db.execute("DELETE FROM entries WHERE stored_at < ?", (self._clock() - self.ttl,))
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(length(value)), 0) FROM entries").fetchone()
+        if count > self.max_entries or total > self.max_bytes:
+            kept = kept_bytes = 0
+            rows = self._db.execute("SELECT stored_at, length(value) FROM entries ORDER BY stored_at DESC")
+            for stored_at, size in rows:
+                kept += 1
+                kept_bytes += size
+                if kept > self.max_entries or kept_bytes > self.max_bytes:
+                    self._db.execute("DELETE FROM entries WHERE stored_at <= ?", (stored_at,))
+                    break
+        self._db.commit()
+
+
+CACHE_DIR = os.environ.get("SCAN_CACHE_DIR") or None
+
+RESULT_CACHE = ScanCache("results", max_entries=2048, max_bytes=64 * 1024 * 1024, ttl=300, disk_dir=CACHE_DIR)
+ANALYSIS_CACHE = ScanCache("analysis", max_entries=8192, max_bytes=64 * 1024 * 1024, ttl=24 * 3600, disk_dir=CACHE_DIR)
+RESPONSE_CACHE = ScanCache("responses", max_entries=1024, max_bytes=128 * 1024 * 1024, ttl=24 * 3600, disk_dir=CACHE_DIR)
+RESOURCE_CACHE = ScanCache("resources", max_entries=16384, max_bytes=16 * 1024 * 1024, ttl=24 * 3600, disk_dir=CACHE_DIR)
+SIGNALS_CACHE = ScanCache("signals", max_entries=16384, max_bytes=8 * 1024 * 1024, ttl=7 * 24 * 3600, disk_dir=CACHE_DIR)
@@ -0,0 +1,239 @@
+"""
+scan_history.py
+
+Persistent history of page scans, in a local SQLite file (SCAN_HISTORY_PATH;
+set it to an empty string to turn history off).
+
+Every finished scan is recorded per URL and per registered domain with its
+content hash, score, verdict and finding types:
+
+    scans     one row per scan; indexed by (url, scanned_at) and
+              (domain, scanned_at) for "what did this look like last week"
+    analyses  analysis JSON by analysis key (content hash + blocklist version),
+              shared by every scan that saw the same content
+
+It serves two purposes:
+
+  * the `history` score factor (HISTORY_RULES): a domain we have never seen,
+    a score well above the domain's recent average, new kinds of findings on
+    a known URL, or a long-stable page suddenly changing;
+  * incremental rescans: when a URL's latest scan saw the same content, its
+    stored analysis is reused and parsing is skipped entirely.
+
+Recorded scores are the score before the history factor, so history never
+feeds on itself. WAL mode lets several uvicorn workers share the file.
+
+Scans older than SCAN_HISTORY_RETENTION_DAYS (default 90; 0 keeps everything)
+are deleted when the file is opened and every PRUNE_EVERY recorded scans.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from services.analysis_pool import UNKNOWN_VERDICT
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_PATH = os.environ.get("SCAN_HISTORY_PATH", os.path.join(BASE_DIR, "data", "scan_history.sqlite3"))
+RETENTION_DAYS = float(os.environ.get("SCAN_HISTORY_RETENTION_DAYS", "90"))
+PRUNE_EVERY = 1000              # recorded scans between retention prunes
+
+TREND_WINDOW = 30 * 24 * 3600   # seconds of domain history the score trend looks at
+TREND_MIN_SCANS = 3
+TREND_JUMP = 20                 # score points above the domain's average that count as a jump
+STABLE_SCANS = 3                # identical-content scans before a change counts as sudden
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    scanned_at REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    analysis_key TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    verdict TEXT NOT NULL,
+    findings TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_url_time ON scans (url, scanned_at);
+CREATE INDEX IF NOT EXISTS scans_domain_time ON scans (domain, scanned_at);
+CREATE TABLE IF NOT EXISTS analyses (
+    analysis_key TEXT PRIMARY KEY,
+    stored_at REAL NOT NULL,
+    analysis TEXT NOT NULL
+);
+"""
+
+SCAN_COLUMNS = ["url", "domain", "scanned_at", "content_hash", "score", "verdict", "findings"]
+
+
+def _scan_row(row):
+    scan = dict(zip(SCAN_COLUMNS, row))
+    scan["findings"] = json.loads(scan["findings"])
+    return scan
+
+
+class ScanHistory:
+    """Scan records in the SQLite file at `path`; one connection per thread."""
+
+    def __init__(self, path, retention_days=RETENTION_DAYS, clock=time.time):
+        self.path = path
+        self.retention_days = retention_days
+        self._clock = clock
+        self._local = threading.local()
+        self._records = 0
+        self._records_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db.executescript(SCHEMA)
+        self.prune_expired()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def record(self, url, domain, content_hash, analysis_key, analysis, scored, scanned_at=None):
+        """Store one scan: `scored` is what the caller got, `analysis` the reusable page analysis."""
+        scanned_at = self._clock() if scanned_at is None else scanned_at
+        findings = sorted({f["type"] for f in scored["findings"]})
+        with self._db as db:
+            db.execute(
+                "INSERT INTO scans (url, domain, scanned_at, content_hash, analysis_key, score, verdict, findings)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, domain, scanned_at, content_hash, analysis_key, scored["score"], scored["verdict"],
+                 json.dumps(findings)),
+            )
+            if analysis["verdict"] != UNKNOWN_VERDICT:
+                db.execute("INSERT OR IGNORE INTO analyses (analysis_key, stored_at, analysis) VALUES (?, ?, ?)",
+                           (analysis_key, scanned_at, json.dumps(analysis, default=str)))
+        with self._records_lock:
+            self._records += 1
+            due = self._records % PRUNE_EVERY == 0
+        if due:
+            self.prune_expired()
+
+    def stored_analysis(self, url, analysis_key):
+        """The analysis of `url`'s latest scan if that scan saw the same content, else None."""
+        row = self._db.execute(
+            "SELECT s.analysis_key, a.analysis FROM scans s LEFT JOIN analyses a USING (analysis_key)"
+            " WHERE s.url = ? ORDER BY s.scanned_at DESC LIMIT 1",
+            (url,),
+        ).fetchone()
+        if row is None or row[0] != analysis_key or row[1] is None:
+            return None
+        return json.loads(row[1])
+
+    def url_scans(self, url, limit=20):
+        """Latest scans of `url`, newest first."""
+        rows = self._db.execute(
+            f"SELECT {', '.join(SCAN_COLUMNS)} FROM scans WHERE url = ? ORDER BY scanned_at DESC LIMIT ?",
+            (url, limit),
+        ).fetchall()
+        return [_scan_row(r) for r in rows]
+
+    def domain_scans(self, domain, since=None, until=None, limit=100):
+        """Scans of any URL on `domain` with since <= scanned_at < until, newest first."""
+        rows = self._db.execute(
+            f"SELECT {', '.join(SCAN_COLUMNS)} FROM scans WHERE domain = ? AND scanned_at >= ? AND scanned_at < ?"
+            " ORDER BY scanned_at DESC LIMIT ?",
+            (domain, since or 0, until or float("inf"), limit),
+        ).fetchall()
+        return [_scan_row(r) for r in rows]
+
+    def first_seen(self, domain):
+        row = self._db.execute("SELECT MIN(scanned_at) FROM scans WHERE domain = ?", (domain,)).fetchone()
+        return row[0]
+
+    def prune(self, older_than):
+        """Delete scans before `older_than` (epoch seconds) and analyses no scan refers to."""
+        with self._db as db:
+            deleted = db.execute("DELETE FROM scans WHERE scanned_at < ?", (older_than,)).rowcount
+            db.execute("DELETE FROM analyses WHERE analysis_key NOT IN (SELECT analysis_key FROM scans)")
+        return deleted
+
+    def prune_expired(self):
+        """prune() everything older than the retention period; returns the number of scans deleted."""
+        if not self.retention_days:
+            return 0
+        return self.prune(self._clock() - self.retention_days * 24 * 3600)
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    """The shared ScanHistory, or None if SCAN_HISTORY_PATH is empty or unusable."""
+    global _history
+    if _history is None and HISTORY_PATH:
+        with _history_lock:
+            if _history is None:
+                try:
+                    _history = ScanHistory(HISTORY_PATH)
+                except sqlite3.Error as e:
+                    print(f"[WARN] Scan history disabled, could not open {HISTORY_PATH}: {str(e)}")
+                    return None
+    return _history
+
+
+# ---------- History factor ----------
+
+class HistoryContext:
+    """What the history rules look at: this scan and the earlier ones of its URL and domain."""
+
+    def __init__(self, history, url, domain, content_hash, analysis, now=None):
+        now = time.time() if now is None else now
+        self.score = analysis["score"]
+        self.findings = {f["type"] for f in analysis["findings"]}
+        self.content_hash = content_hash
+        self.url_scans = history.url_scans(url, limit=STABLE_SCANS + 1)
+        self.domain_scans = history.domain_scans(domain, since=now - TREND_WINDOW)
+        self.first_seen = history.first_seen(domain)
+
+
+def _first_seen(ctx):
+    if ctx.first_seen is None:
+        return {"desc": "First scan of this domain (no history)"}
+    return None
+
+def _score_jump(ctx):
+    if len(ctx.domain_scans) < TREND_MIN_SCANS:
+        return None
+    average = sum(s["score"] for s in ctx.domain_scans) / len(ctx.domain_scans)
+    if ctx.score - average >= TREND_JUMP:
+        return {"desc": f"Score jumped to {ctx.score} from a recent domain average of {average:.0f}",
+                "average_score": round(average, 1), "scans": len(ctx.domain_scans)}
+    return None
+
+def _new_findings(ctx):
+    if not ctx.url_scans:
+        return None
+    seen = set().union(*(s["findings"] for s in ctx.url_scans))
+    new = sorted(ctx.findings - seen)
+    if new:
+        return {"desc": "Findings not present in earlier scans of this URL", "types": new}
+    return None
+
+def _sudden_change(ctx):
+    recent = ctx.url_scans[:STABLE_SCANS]
+    if len(recent) < STABLE_SCANS or len({s["content_hash"] for s in recent}) != 1:
+        return None
+    if recent[0]["content_hash"] != ctx.content_hash:
+        return {"desc": f"Content changed after {STABLE_SCANS}+ identical scans",
+                "stable_since": min(s["scanned_at"] for s in recent)}
+    return None
+
+
+HISTORY_RULES = [
+    {"type": "history_first_seen", "factor": "history", "points": 20, "check": _first_seen},
+    {"type": "history_score_jump", "factor": "history", "points": 40, "check": _score_jump},
+    {"type": "history_new_findings", "factor": "history", "points": 40, "check": _new_findings},
+    {"type": "history_content_change", "factor": "history", "points": 20, "check": _sudden_change},
+]
@@ -0,0 +1,194 @@
+"""
+scan_jobs.py
+
+In-process scan job queue for POST /scans.
+
+A full scan with rendering can outlast an upstream gateway timeout, so job
+mode answers at once with a job id; a pool of asyncio workers runs the scan
+and clients poll GET /scans/{id} (optionally long-polling with ?wait=) or
+subscribe to /scans/{id}/events (Server-Sent Events).
+
+    - priorities: "high" jobs are picked before "normal" before "low";
+      FIFO within a priority
+    - coalescing: submitting a URL whose job (same normalized URL) is still
+      queued or running attaches to that job instead of scanning it again;
+      a higher-priority resubmission moves the queued job up
+    - finished jobs are kept for JOB_TTL seconds (at most MAX_FINISHED_JOBS)
+
+Jobs live in the memory of the process that accepted them: behind several
+uvicorn workers, route /scans/{id} back to the same worker (or run one).
+"""
+
+import asyncio
+import itertools
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from services.scan_cache import normalize_url
+
+JOB_WORKERS = int(os.environ.get("RISK_API_JOB_WORKERS", 8))
+MAX_QUEUED_JOBS = int(os.environ.get("RISK_API_MAX_QUEUED_JOBS", 10000))
+JOB_TTL = 600
+MAX_FINISHED_JOBS = 10000
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ScanJob:
+    def __init__(self, url, key, priority):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.key = key
+        self.priority = priority
+        self.status = QUEUED
+        self.submissions = 1
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self):
+        job = {
+            "job_id": self.id,
+            "url": self.url,
+            "status": self.status,
+            "priority": self.priority,
+            "submissions": self.submissions,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == DONE:
+            job["result"] = self.result
+        elif self.status == FAILED:
+            job["error"] = self.error
+        return job
+
+    async def _set(self, **changes):
+        for name, value in changes.items():
+            setattr(self, name, value)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def wait(self, timeout):
+        """Wait up to `timeout` seconds for the job to finish."""
+        try:
+            async with self._changed:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.finished), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def events(self, keepalive=15):
+        """Yield the job's dict now and after every status change, until it finishes; None = keepalive."""
+        last = None
+        while True:
+            if self.status != last:
+                last = self.status
+                yield self.to_dict()
+                if self.finished:
+                    return
+            try:
+                async with self._changed:
+                    await asyncio.wait_for(self._changed.wait_for(lambda: self.status != last), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class JobQueue:
+    """Priority queue of ScanJobs run by `workers` asyncio tasks calling `run(url)`."""
+
+    def __init__(self, run, workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS):
+        self.run = run
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue = None
+        self._tasks = []
+        self._seq = itertools.count()
+        self._jobs = {}               # id -> job
+        self._active = {}             # normalized URL -> queued/running job
+        self._finished = OrderedDict()  # id -> finish time, oldest first
+
+    def start(self):
+        if not self._tasks:
+            self._queue = asyncio.PriorityQueue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, url, priority="normal"):
+        """(job, attached): a new queued job, or the live job for the same URL."""
+        self.start()
+        self._prune()
+        key = normalize_url(url)
+        job = self._active.get(key)
+        if job is not None:
+            job.submissions += 1
+            if job.status == QUEUED and PRIORITIES[priority] < PRIORITIES[job.priority]:
+                # re-queue at the better priority; the stale entry is skipped when popped
+                job.priority = priority
+                self._queue.put_nowait((PRIORITIES[priority], next(self._seq), job))
+            return job, True
+        if self.queued() >= self.max_queued:
+            raise QueueFull(f"{self.max_queued} jobs already queued")
+        job = ScanJob(url, key, priority)
+        self._jobs[job.id] = job
+        self._active[key] = job
+        self._queue.put_nowait((PRIORITIES[priority], next(self._seq), job))
+        return job, False
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def queued(self):
+        return sum(1 for job in self._active.values() if job.status == QUEUED)
+
+    def stats(self):
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    async def _worker(self):
+        while True:
+            priority, _, job = await self._queue.get()
+            if job.status != QUEUED or PRIORITIES[job.priority] != priority:
+                continue  # already picked up through a re-prioritized entry
+            await job._set(status=RUNNING, started_at=time.time())
+            try:
+                result = await self.run(job.url)
+                await job._set(status=DONE, result=result, finished_at=time.time())
+            except asyncio.CancelledError:
+                await job._set(status=FAILED, error="Server shutting down", finished_at=time.time())
+                raise
+            except Exception as e:
+                await job._set(status=FAILED, error=str(e) or type(e).__name__, finished_at=time.time())
+            finally:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                self._finished[job.id] = time.time()
+
+    def _prune(self):
+        now = time.time()
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if now - finished_at <= JOB_TTL and len(self._finished) <= MAX_FINISHED_JOBS:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
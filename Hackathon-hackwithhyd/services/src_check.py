@@ -1,17 +1,126 @@
 # services/page_source_analyser.py
 
-from .Page_Source_Analyser import fetch_full_page, analyze_html
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
-def scan_page(url: str):
-    """Wrapper for FastAPI usage. Returns analysis JSON."""
-    fetched = fetch_full_page(url)
-    html = fetched['html']
-    analysis = analyze_html(html, fetched['final_url'])
+from .scan_cache import RESULT_CACHE, ANALYSIS_CACHE, normalize_url, content_key, analysis_key
+from .analysis_pool import ANALYSIS_WORKERS, UNKNOWN_VERDICT, get_analysis_pool
+from .metrics import span
+from .blocklist import get_blocklist, sync_blocklist
+from . import net
+
+# Per-stage timeouts (seconds) for the async path
+FETCH_TIMEOUT = 30
+ANALYZE_TIMEOUT = 15
+
+# Page_Source_Analyser (BeautifulSoup, requests) is imported on first
+# use so importing this module stays cheap; see warm_up()
+
+# BeautifulSoup parsing is CPU-bound; keep it off the event loop. It normally runs
+# in the analysis process pool; these threads are the PAGE_SCANNER_WORKERS=0 fallback.
+PARSE_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="html-parse")
 
+def _scan_result(url, fetched, analysis):
     return {
         "url_submitted": url,
         "final_url": fetched['final_url'],
-        "fetched_by": fetched['method'],
+        "fetched_by": fetched['fetched_by'],
         "fetched_at": fetched['fetched_at'],
         "analysis": analysis
     }
+
+def scan_page(url: str, use_cache=True):
+    """Wrapper for FastAPI usage. Returns analysis JSON."""
+    key = "scan:" + normalize_url(url)
+    result = RESULT_CACHE.get(key) if use_cache else None
+    if result is None:
+        from .Page_Source_Analyser import fetch_full_page, analyze_cached, finish_analysis
+        fetched = fetch_full_page(url)
+        html = fetched['html']
+        content_hash = content_key(fetched['final_url'], html)
+        akey = analysis_key(content_hash, get_blocklist().version)
+        analysis = analyze_cached(html, fetched['final_url'], akey)
+        analysis = finish_analysis(analysis, url, fetched['final_url'], content_hash, akey)
+        result = _scan_result(url, fetched, analysis)
+        RESULT_CACHE.set(key, result)
+    return result
+
+async def fetch_page_async(url: str, fetch_timeout=FETCH_TIMEOUT):
+    """Fetch once; the result feeds both tech fingerprinting and page analysis."""
+    from .Page_Source_Analyser import fetch_full_page_async
+    return await asyncio.wait_for(fetch_full_page_async(url), fetch_timeout)
+
+def _analyze_html(html, final_url, blocklist_version):
+    from .Page_Source_Analyser import analyze_html
+    blocklist = sync_blocklist(blocklist_version)
+    return analyze_html(html, final_url), blocklist.version
+
+async def _analyze_html_async(html, final_url, blocklist_version):
+    """(analysis, blocklist version it was made with); ideally `blocklist_version`, but a reload can land in between."""
+    if ANALYSIS_WORKERS:
+        return await get_analysis_pool().analyze_async(html, final_url, blocklist_version)
+    loop = asyncio.get_running_loop()
+    # copy the context so analyze_html's spans count towards this request's timings
+    return await loop.run_in_executor(PARSE_EXECUTOR, contextvars.copy_context().run,
+                                      _analyze_html, html, final_url, blocklist_version)
+
+async def _scan_resources_async(html, final_url):
+    from .external_resources import extract_resource_urls, scan_resources_async
+    with span("resource_scan"):
+        return await scan_resources_async(extract_resource_urls(html, final_url))
+
+async def analyze_fetched_async(url: str, fetched: dict, analyze_timeout=ANALYZE_TIMEOUT):
+    """Analyze an already-fetched page and its external scripts.
+
+    Skipped if the content is cached, or is what the scan history saw last time
+    for this URL; blocklist and history scoring run either way.
+    """
+    from .Page_Source_Analyser import add_resource_findings, finish_analysis, stored_analysis
+    content_hash = content_key(fetched['final_url'], fetched['html'])
+    version = get_blocklist().version
+    key = analysis_key(content_hash, version)
+    analysis = ANALYSIS_CACHE.get(key)
+    if analysis is None:
+        analysis = await asyncio.to_thread(stored_analysis, fetched['final_url'], key)
+        if analysis is not None:
+            ANALYSIS_CACHE.set(key, analysis)
+    if analysis is None:
+        # parsing (CPU, in the pool) and downloading scripts (network) overlap
+        (analysis, used_version), report = await asyncio.wait_for(
+            asyncio.gather(
+                _analyze_html_async(fetched['html'], fetched['final_url'], version),
+                _scan_resources_async(fetched['html'], fetched['final_url']),
+            ),
+            analyze_timeout,
+        )
+        if used_version != version:
+            # the worker already had a newer store; file the result under the one it actually used
+            key = analysis_key(content_hash, used_version)
+        analysis = add_resource_findings(analysis, report)
+        # a page that hit a CPU/memory limit may fare better next time; don't pin that
+        if analysis["verdict"] != UNKNOWN_VERDICT:
+            ANALYSIS_CACHE.set(key, analysis)
+    analysis = await asyncio.to_thread(finish_analysis, analysis, url, fetched['final_url'], content_hash, key)
+    return _scan_result(url, fetched, analysis)
+
+async def scan_page_async(url: str, fetch_timeout=FETCH_TIMEOUT, analyze_timeout=ANALYZE_TIMEOUT, use_cache=True):
+    """Non-blocking scan_page: async fetch, then parse in the analysis pool."""
+    key = "scan:" + normalize_url(url)
+    result = RESULT_CACHE.get(key) if use_cache else None
+    if result is None:
+        fetched = await fetch_page_async(url, fetch_timeout)
+        result = await analyze_fetched_async(url, fetched, analyze_timeout)
+        RESULT_CACHE.set(key, result)
+    return result
+
+def warm_up():
+    """Import the page analyser and start the analysis workers ahead of the first scan."""
+    from . import Page_Source_Analyser  # noqa: F401
+    net.warm_up()
+    if ANALYSIS_WORKERS:
+        get_analysis_pool().start()
+
+async def close_http_clients():
+    """Close the pooled async HTTP client, if any scan created it."""
+    await net.close_async_client()
@@ -0,0 +1,85 @@
+"""
+store_dir.py
+
+Atomic publishing for the memory-mapped stores (cve_store, blocklist).
+
+A store path is a symlink to a versioned sibling directory:
+
+    data/cve_store -> cve_store.v-<time_ns>-<pid>
+
+A new version is written completely under a temp name, renamed to its
+version name, and then the symlink is swapped with os.replace. A reader
+opening the path sees either the old or the new version, never a missing or
+half-written one. Readers resolve the link once (os.path.realpath) and open
+every file from that directory. The version before the current one is kept
+for processes that opened it just before the swap; older ones are deleted.
+
+Stores built before this layout are plain directories. The first publish
+moves such a directory aside, which is the only time the path is briefly
+missing.
+"""
+
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; conversions there are simply not serialized
+    fcntl = None
+
+KEEP_VERSIONS = 2  # current + previous
+
+
+def new_version_path(store_path):
+    """Sortable, unique directory name for the next version of store_path."""
+    return f"{store_path}.v-{time.time_ns()}-{os.getpid()}"
+
+
+def versions(store_path):
+    """Published version directories of store_path, oldest first."""
+    parent, base = os.path.split(os.path.abspath(store_path))
+    prefix = base + ".v-"
+    if not os.path.isdir(parent):
+        return []
+    return sorted(os.path.join(parent, name) for name in os.listdir(parent) if name.startswith(prefix))
+
+
+def publish(version_path, store_path, keep=KEEP_VERSIONS):
+    """Point store_path at the complete directory version_path, atomically."""
+    link_tmp = f"{store_path}.link-{os.getpid()}"
+    try:
+        os.remove(link_tmp)
+    except FileNotFoundError:
+        pass
+    os.symlink(os.path.basename(version_path), link_tmp)
+    if os.path.isdir(store_path) and not os.path.islink(store_path):
+        # a plain directory from before versioned stores; "0" sorts it before every real version
+        os.rename(store_path, f"{store_path}.v-0-legacy")
+    os.replace(link_tmp, store_path)
+    prune(store_path, keep)
+    return store_path
+
+
+def prune(store_path, keep=KEEP_VERSIONS):
+    """Delete all but the current version and the newest keep - 1 others."""
+    current = os.path.realpath(store_path)
+    old = [v for v in versions(store_path) if os.path.realpath(v) != current]
+    for path in old[:max(0, len(old) - (keep - 1))]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def lock(store_path):
+    """Exclusive lock across processes (e.g. uvicorn workers) for rebuilding store_path."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    with open(f"{store_path}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -1,23 +1,132 @@
-import builtwith
-import requests
-from typing import List
+import re
+from typing import Dict, Iterable, List, Optional
+
+from services.tech_signatures import SIGNATURES
+
+# Fingerprint technologies from a page we already fetched (HTML, response
+# headers, cookies) instead of letting builtwith fetch the URL a second time.
+#
+# Signatures are compiled once into one combined alternation per channel (and
+# per header / meta name), so the HTML, each script src, each header value and
+# the cookie names are each scanned in a single pass no matter how many
+# signatures there are (plus one anchored check at each offset that matched).
+
+SCRIPT_SRC_RE = re.compile(r"<script\b[^>]*?\bsrc\s*=\s*[\"']?([^\"'\s>]+)", re.IGNORECASE)
+META_TAG_RE = re.compile(r"<meta\b[^>]*>", re.IGNORECASE)
+ATTR_RE = re.compile(r"([a-zA-Z_:-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))")
+
+
+class _Matcher:
+    """One combined regex for many (tech, pattern) pairs.
+
+    `regex` finds every offset where some signature matches (inside a
+    lookahead, so matches may overlap). An alternation only reports its first
+    matching branch, so at each of those offsets `at_offset` (one optional
+    lookahead per signature) reports all of them: /wp-content/ must not hide
+    /wp-content/plugins/woocommerce/.
+    """
+
+    def __init__(self, pairs, anchored=False):
+        self.groups = {}
+        parts, lookaheads = [], []
+        # anchored: whole-line matches, one candidate per line
+        end = "$" if anchored else ""
+        for tech, pattern in pairs:
+            group = f"g{len(self.groups)}"
+            self.groups[group] = tech
+            parts.append(f"(?:{pattern}){end}")
+            lookaheads.append(f"(?:(?=(?P<{group}>{pattern}){end}))?")
+        flags = re.IGNORECASE | (re.MULTILINE if anchored else 0)
+        self.regex = re.compile(f"{'^' if anchored else ''}(?=(?:{'|'.join(parts)}))", flags)
+        self.at_offset = re.compile("".join(lookaheads), flags)
+
+    def techs(self, text):
+        found = set()
+        for m in self.regex.finditer(text):
+            hit = self.at_offset.match(text, m.start())
+            found.update(self.groups[g] for g, value in hit.groupdict().items() if value is not None)
+        return found
+
+
+def _compile_signatures(signatures):
+    channels = {"html": [], "scripts": [], "cookies": []}
+    keyed = {"meta": {}, "headers": {}}
+    presence = {}  # header -> techs it proves just by being present
+    for tech, sig in signatures.items():
+        for channel in channels:
+            channels[channel].extend((tech, pat) for pat in sig.get(channel, []))
+        for channel in keyed:
+            for name, pat in sig.get(channel, {}).items():
+                if channel == "headers" and not pat:
+                    presence.setdefault(name, set()).add(tech)
+                else:
+                    keyed[channel].setdefault(name, []).append((tech, pat))
+
+    compiled = {
+        "html": _Matcher(channels["html"]),
+        "scripts": _Matcher(channels["scripts"]),
+        "cookies": _Matcher(channels["cookies"], anchored=True),
+        "meta": {name: _Matcher(pairs) for name, pairs in keyed["meta"].items()},
+        "headers": {name: _Matcher(pairs) for name, pairs in keyed["headers"].items()},
+    }
+    return compiled, presence
+
+
+COMPILED, HEADER_PRESENCE = _compile_signatures(SIGNATURES)
+
+
+def _meta_tags(html: str):
+    for tag in META_TAG_RE.findall(html):
+        attrs = {k.lower(): a or b or c for k, a, b, c in ATTR_RE.findall(tag)}
+        name = attrs.get("name") or attrs.get("property") or attrs.get("http-equiv")
+        if name:
+            yield name.lower(), attrs.get("content", "")
+
+
+def _with_implied(found):
+    pending = list(found)
+    while pending:
+        for implied in SIGNATURES.get(pending.pop(), {}).get("implies", []):
+            if implied not in found:
+                found.add(implied)
+                pending.append(implied)
+    return found
+
+
+def detect_technologies_from_page(html: str, headers: Optional[Dict[str, str]] = None,
+                                  cookies: Optional[Iterable[str]] = None) -> List[str]:
+    """Return technologies seen in an already-fetched page."""
+    html = html or ""
+    found = COMPILED["html"].techs(html)
+    for src in SCRIPT_SRC_RE.findall(html):
+        found |= COMPILED["scripts"].techs(src)
+    for name, content in _meta_tags(html):
+        if name in COMPILED["meta"]:
+            found |= COMPILED["meta"][name].techs(content)
+    for name, value in (headers or {}).items():
+        name = name.lower()
+        found |= HEADER_PRESENCE.get(name, set())
+        if name in COMPILED["headers"]:
+            found |= COMPILED["headers"][name].techs(value)
+    if cookies:
+        found |= COMPILED["cookies"].techs("\n".join(cookies))
+    return sorted(_with_implied(found))
+
+
+def detect_technologies_from_fetched(fetched: dict) -> List[str]:
+    """detect_technologies_from_page for a fetch_full_page() result."""
+    return detect_technologies_from_page(fetched.get("html", ""), fetched.get("headers"), fetched.get("cookies"))
+
 
 def detect_technologies(url: str) -> List[str]:
     try:
         # Add http:// if not present
         if not url.startswith(('http://', 'https://')):
             url = 'http://' + url
-            
-        # Get technology info
-        tech_info = builtwith.parse(url)
-        
-        # Extract technology names
-        technologies = []
-        for category, techs in tech_info.items():
-            technologies.extend(techs)
-            
-        return list(set(technologies))  # Remove duplicates
-        
+
+        from services.Page_Source_Analyser import fetch_full_page
+        return detect_technologies_from_fetched(fetch_full_page(url))
+
     except Exception as e:
         print(f"Error detecting technologies: {str(e)}")
         return []
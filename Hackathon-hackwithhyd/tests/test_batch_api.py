@@ -0,0 +1,28 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from api.risk_api import app
+
+# no `with`: lifespan (warm-up, browser pool, job workers) isn't needed to reject a request
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("body, status", [
+    (b"{not json", 400),
+    (b'{"urls": "http://a.example/"}', 422),
+    (b'{"urls": []}', 400),
+])
+def test_bad_json_bodies(body, status):
+    r = client.post("/analyze/batch", content=body, headers={"content-type": "application/json"})
+    assert r.status_code == status
+
+
+def test_unparsable_url_is_rejected_before_streaming():
+    r = client.post("/analyze/batch", json={"urls": ["http://ok.example/", "http://a.example:99999/"]})
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"] == ["urls", 1]
+
+
+def test_unparsable_url_in_plain_text_list():
+    r = client.post("/analyze/batch", content=b"ok.example\nhttp://[::1\n", headers={"content-type": "text/plain"})
+    assert r.status_code == 422
@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import pytest
+
+from services import blocklist
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("||evil.example^", ("domain", "evil.example")),
+    ("0.0.0.0 evil.example", ("domain", "evil.example")),
+    ("*.evil.example  # comment", ("domain", "evil.example")),
+    ("||^", None),
+    ("||", None),
+    ("! adblock comment", None),
+    ("localhost", None),
+])
+def test_parse_feed_line(line, expected):
+    assert blocklist.parse_feed_line(line) == expected
+
+
+def _build(tmp_path, entries):
+    feeds = tmp_path / "feeds"
+    feeds.mkdir(exist_ok=True)
+    (feeds / "feed.txt").write_text("\n".join(entries) + "\n")
+    return blocklist.build_store(str(feeds), str(tmp_path / "store"))
+
+
+def test_rebuild_swaps_store_without_a_gap(tmp_path):
+    store = _build(tmp_path, ["evil.example"])
+    first = blocklist.Blocklist(store)
+    assert first.match_url("http://a.evil.example/") is not None
+
+    store = _build(tmp_path, ["evil.example", "worse.example"])
+    assert os.path.islink(store)
+    second = blocklist.Blocklist(store)
+    assert second.match_url("http://worse.example/") is not None
+    # the old version stays readable for whoever still has it open
+    assert first.match_url("http://worse.example/") is None
+    assert first.match_url("http://evil.example/") is not None
+
+
+def test_missing_store_keeps_the_current_blocklist(tmp_path, monkeypatch):
+    store = _build(tmp_path, ["evil.example"])
+    monkeypatch.setattr(blocklist, "STORE_PATH", store)
+    monkeypatch.setattr(blocklist, "_current", None)
+    monkeypatch.setattr(blocklist, "_current_mtime", None)
+    blocklist._open_current()
+    version = blocklist._current.version
+
+    moved = str(tmp_path / "moved")
+    shutil.move(os.path.realpath(store), moved)
+    os.remove(store)
+    blocklist._open_current()
+    assert blocklist._current.version == version
+    assert blocklist._current.match_url("http://evil.example/") is not None
+
+
+def test_worker_catches_up_with_the_parents_version(tmp_path, monkeypatch):
+    from services.analysis_pool import _run_task
+
+    store = _build(tmp_path, ["evil.example"])
+    monkeypatch.setattr(blocklist, "STORE_PATH", store)
+    monkeypatch.setattr(blocklist, "_current", None)
+    monkeypatch.setattr(blocklist, "_current_mtime", None)
+    monkeypatch.setattr(blocklist, "_next_check", 0.0)
+    stale = blocklist.get_blocklist()
+
+    # the parent has reopened the rebuilt store; this process isn't due to check for a while
+    _build(tmp_path, ["evil.example", "worse.example"])
+    parent_version = blocklist.Blocklist(store).version
+    assert parent_version != stale.version and blocklist.get_blocklist() is stale
+
+    html = "<a href='http://worse.example/x'>x</a>"
+    analysis, _, used_version = _run_task(html, "https://example.com/", None, parent_version)
+    assert used_version == parent_version
+    assert "worse.example" in str(analysis["findings"])
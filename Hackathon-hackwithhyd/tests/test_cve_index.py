@@ -0,0 +1,49 @@
+import re
+
+import pandas as pd
+import pytest
+
+from services.cve_index import CVEIndex
+from services.cve_lookup import WHOLE_WORD_TECHS, find_cves_for_tech, find_cves_for_techs
+
+TECH_NAMES = ["WordPress", "jQuery", "PHP", "Node.js", "Microsoft IIS", "C++", "ASP.NET", "js", "my",
+              "e", ".js", "sql injection", "Bootstrap", "Java", "nonexistent-tech", ""]
+
+
+@pytest.fixture
+def descriptions(cve_store):
+    return pd.read_csv(cve_store[0])
+
+
+def _contains(df, name):
+    # the lookup this index replaced; generic names only count as whole words
+    if name.lower() in WHOLE_WORD_TECHS:
+        pattern = r"(?<![a-z0-9])" + re.escape(name.lower()) + r"(?![a-z0-9])"
+        matched = df["description"].str.lower().str.contains(pattern, regex=True, na=False)
+    else:
+        matched = df["description"].str.contains(name, case=False, regex=False, na=False)
+    return set(df.loc[matched, "cve_id"])
+
+
+@pytest.mark.parametrize("name", TECH_NAMES)
+def test_same_rows_as_substring_scan(descriptions, name):
+    assert {r["cve_id"] for r in find_cves_for_tech(name)} == _contains(descriptions, name)
+
+
+def test_batch_lookup_matches_single_lookups(descriptions):
+    batch = find_cves_for_techs(TECH_NAMES)
+    for name in TECH_NAMES:
+        assert {r["cve_id"] for r in batch[name]} == _contains(descriptions, name)
+
+
+def test_whole_word_lookup_skips_longer_words():
+    index = CVEIndex([
+        "Oracle Java SE allows remote code execution",
+        "JavaScript engine type confusion",
+        "bootstrapping the installer writes world-readable files",
+        "XSS in Bootstrap before 3.4.1 via data-target",
+        "Java/Bootstrap combined advisory",
+    ])
+    assert index.lookup("java") == (0, 1, 4)
+    assert index.lookup("java", True) == (0, 4)
+    assert index.lookup_many(["Bootstrap"], WHOLE_WORD_TECHS) == {"Bootstrap": (3, 4)}
@@ -0,0 +1,31 @@
+import csv
+import os
+
+from services.cve_store import CVEStore, convert_csv
+
+
+def _write_csv(path, n):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["cve_id", "description", "cvss_score", "severity", "exploitability_score", "last_modified"])
+        for i in range(n):
+            writer.writerow([f"CVE-2025-{i:04d}", f"jQuery issue number {i}", 5.0, "MEDIUM", 1.0, ""])
+
+
+def test_open_store_outlives_pruned_versions(tmp_path):
+    csv_path, store_path = str(tmp_path / "cves.csv"), str(tmp_path / "store")
+    _write_csv(csv_path, 3)
+    convert_csv(csv_path, store_path)
+    store = CVEStore(store_path)
+    first_version = store.dir
+
+    # two republishes: the version `store` was opened from gets pruned
+    _write_csv(csv_path, 5)
+    convert_csv(csv_path, store_path)
+    convert_csv(csv_path, store_path)
+    assert not os.path.exists(first_version)
+    assert CVEStore(store_path).rows == 5
+
+    postings = store.postings()
+    assert list(postings["jquery"]) == [0, 1, 2]
+    assert store.description(2) == "jQuery issue number 2"
@@ -0,0 +1,26 @@
+import pytest
+
+from bench.import_time import IMPORT_BUDGET_MS, LAZY_MODULES, TARGET_MODULE, check, measure
+
+
+@pytest.fixture(scope="module")
+def rows():
+    # `python -X importtime -c "import api.risk_api"` in a fresh interpreter
+    return measure()
+
+
+def test_import_within_budget(rows):
+    total_ms = next(cum for name, _, cum in reversed(rows) if name == TARGET_MODULE) / 1000
+    assert total_ms <= IMPORT_BUDGET_MS, f"import {TARGET_MODULE} took {total_ms:.0f} ms"
+
+
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_heavy_module_not_imported_eagerly(rows, module):
+    assert module not in {name.split(".")[0] for name, _, _ in rows}
+
+
+def test_check_reports_budget_and_eager_imports():
+    fake = [("sklearn.base", 10, 300000), ("pandas", 10, 400000), (TARGET_MODULE, 10, 1500000)]
+    failures = check(fake, budget_ms=1000)
+    assert any("1500 ms" in f for f in failures)
+    assert {"sklearn is imported eagerly", "pandas is imported eagerly"} <= set(failures)
@@ -0,0 +1,48 @@
+import asyncio
+
+from services import net
+
+
+def _on(loop, coro_fn):
+    return loop.run_until_complete(coro_fn())
+
+
+async def _client():
+    return net.get_async_client()
+
+
+def test_each_loop_keeps_its_own_client():
+    first, second = asyncio.new_event_loop(), asyncio.new_event_loop()
+    try:
+        client = _on(first, _client)
+        other = _on(second, _client)
+        assert other is not client
+        # switching loops no longer replaces (and leaks) the first loop's client
+        assert _on(first, _client) is client and not client.is_closed
+
+        _on(first, net.close_async_client)
+        assert client.is_closed and not other.is_closed
+        assert _on(first, _client) is not client
+        _on(first, net.close_async_client)
+        _on(second, net.close_async_client)
+    finally:
+        first.close()
+        second.close()
+
+
+def test_closed_loops_are_dropped():
+    loop = asyncio.new_event_loop()
+    _on(loop, _client)
+    loop.close()
+    assert loop in net._loop_clients
+    asyncio.run(_client())
+    assert loop not in net._loop_clients
+
+
+def test_host_slots_are_per_loop():
+    async def semaphore():
+        async with net.host_slot("http://example.com/a"):
+            return net._loop_state()[1]["example.com"][0]
+
+    # an asyncio.Semaphore binds to the loop that first waits on it
+    assert asyncio.run(semaphore()) is not asyncio.run(semaphore())
@@ -0,0 +1,80 @@
+import csv
+import json
+import zipfile
+
+import pytest
+
+from data import prepare_cve_data
+
+
+def _item(cve_id, score, modified, description="test"):
+    return {"cve": {
+        "id": cve_id,
+        "lastModified": modified,
+        "descriptions": [{"lang": "en", "value": description}],
+        "metrics": {"cvssMetricV31": [{
+            "cvssData": {"baseScore": score, "baseSeverity": "HIGH" if score >= 7 else "MEDIUM"},
+            "exploitabilityScore": 3.9,
+        }]},
+    }}
+
+
+def _write_feed(path, items, zipped=False):
+    body = json.dumps({"resultsPerPage": len(items), "format": "NVD_CVE", "vulnerabilities": items})
+    if zipped:
+        with zipfile.ZipFile(path, "w") as z:
+            z.writestr("nvdcve-2.0-test.json", body)
+    else:
+        path.write_text(body, encoding="utf-8")
+    return str(path)
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["cve_id"]: row for row in csv.DictReader(f)}
+
+
+def test_streaming_parse_across_chunk_boundaries(tmp_path):
+    items = [_item(f"CVE-2025-{i:04d}", 5.0, "2025-01-01T00:00:00", "x" * i) for i in range(50)]
+    feed = _write_feed(tmp_path / "feed.json.zip", items, zipped=True)
+    with prepare_cve_data.open_feed(feed) as fp:
+        # tiny reads so most items are split over several chunks
+        parsed = list(prepare_cve_data.iter_array_items(fp, read_size=7))
+    assert parsed == items
+
+
+def test_build_then_apply_delta(tmp_path):
+    older = _write_feed(tmp_path / "2024.json", [
+        _item("CVE-2024-0001", 5.0, "2024-01-01T00:00:00"),
+        _item("CVE-2024-0002", 6.0, "2024-01-01T00:00:00", "old copy"),
+    ])
+    newer = _write_feed(tmp_path / "2025.json.zip", [
+        _item("CVE-2024-0002", 6.5, "2025-01-01T00:00:00", "new copy"),
+        _item("CVE-2025-0001", 9.8, "2025-01-01T00:00:00"),
+    ], zipped=True)
+    out = str(tmp_path / "dataset.csv")
+
+    assert prepare_cve_data.build_dataset([older, newer], out) == 3
+    rows = _read(out)
+    assert rows["CVE-2024-0002"]["description"] == "new copy"
+    assert rows["CVE-2025-0001"]["severity"] == "HIGH"
+
+    delta = _write_feed(tmp_path / "modified.json", [
+        _item("CVE-2024-0001", 7.5, "2025-06-01T00:00:00"),   # newer: replaces the row
+        _item("CVE-2025-0001", 1.0, "2024-06-01T00:00:00"),   # older than the dataset: ignored
+        _item("CVE-2025-0002", 4.0, "2025-06-01T00:00:00"),   # new CVE: appended
+    ])
+    stats = prepare_cve_data.apply_delta(delta, out)
+    assert stats == {"updated": 1, "unchanged": 2, "added": 1}
+    rows = _read(out)
+    assert rows["CVE-2024-0001"]["cvss_score"] == "7.5"
+    assert rows["CVE-2025-0001"]["cvss_score"] == "9.8"
+    assert list(rows)[-1] == "CVE-2025-0002"
+
+
+def test_offline_missing_feed_exits_with_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        prepare_cve_data.main(["--offline", "--feeds", str(tmp_path / "missing.json.zip"),
+                               "--out", str(tmp_path / "out.csv")])
+    assert exc.value.code == 1
+    assert "[ERROR] File not found" in capsys.readouterr().out
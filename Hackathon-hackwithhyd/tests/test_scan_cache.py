@@ -0,0 +1,105 @@
+import json
+import sqlite3
+
+import pytest
+
+from services import scan_cache
+from services.scan_cache import ScanCache, normalize_url
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _size(value):
+    return len(json.dumps(value))
+
+
+def _rows(tmp_path, name):
+    with sqlite3.connect(str(tmp_path / f"{name}.sqlite3")) as db:
+        return {key: stored_at for key, stored_at in db.execute("SELECT key, stored_at FROM entries")}
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = ScanCache("t", ttl=10, clock=clock)
+    cache.set("a", 1)
+    clock.now += 10
+    assert cache.get("a") == 1
+    assert cache.get("a", max_age=5) is None
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ScanCache("t", max_entries=2, clock=Clock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_byte_cap():
+    value = "x" * 100
+    cache = ScanCache("t", max_bytes=2 * _size(value) + 1, clock=Clock())
+    cache.set("a", value)
+    cache.set("b", value)
+    cache.set("c", value)
+    assert cache.stats() == {"entries": 2, "bytes": 2 * _size(value), "hits": 0, "misses": 0}
+    assert cache.get("a") is None
+    cache.set("big", "y" * 1000)
+    assert cache.get("big") is None
+    assert cache.get("c") == value
+
+
+def test_disk_survives_restart_and_drops_expired_rows(tmp_path):
+    clock = Clock()
+    ScanCache("t", ttl=10, disk_dir=str(tmp_path), clock=clock).set("a", {"v": 1})
+    reopened = ScanCache("t", ttl=10, disk_dir=str(tmp_path), clock=clock)
+    assert reopened.get("a") == {"v": 1}
+
+    clock.now += 11
+    assert ScanCache("t", ttl=10, disk_dir=str(tmp_path), clock=clock).get("a") is None
+    assert _rows(tmp_path, "t") == {}
+
+
+def test_oversized_values_are_not_written_to_disk(tmp_path):
+    cache = ScanCache("t", max_bytes=50, disk_dir=str(tmp_path), clock=Clock())
+    cache.set("a", "small")
+    cache.set("a", "x" * 100)
+    assert "a" not in _rows(tmp_path, "t")
+
+
+def test_prune_disk_keeps_newest_rows_within_caps(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan_cache, "DISK_PRUNE_EVERY", 10)
+    clock = Clock()
+    cache = ScanCache("t", max_entries=5, ttl=1000, disk_dir=str(tmp_path), clock=clock)
+    for i in range(10):
+        clock.now += 1
+        cache.set(f"k{i}", i)
+    assert sorted(_rows(tmp_path, "t")) == [f"k{i}" for i in range(5, 10)]
+
+    # the byte cap applies too, counting the stored JSON text
+    cache.max_entries, cache.max_bytes = 100, 3 * _size(9)
+    cache._prune_disk()
+    assert sorted(_rows(tmp_path, "t")) == ["k7", "k8", "k9"]
+
+    clock.now += 1001
+    cache._prune_disk()
+    assert _rows(tmp_path, "t") == {}
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("Example.COM", "http://example.com/"),
+    ("https://example.com:443/a?b=1#frag", "https://example.com/a?b=1"),
+    ("http://[::1]:8080/", "http://[::1]:8080/"),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
@@ -0,0 +1,55 @@
+from services import scan_history
+from services.scan_history import ScanHistory
+
+DAY = 24 * 3600
+
+
+class Clock:
+    def __init__(self, now=100 * DAY):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _record(history, url, scanned_at=None, key="k"):
+    analysis = {"verdict": "SAFE", "score": 0, "findings": []}
+    history.record(url, "example.com", "hash", key, analysis, analysis, scanned_at=scanned_at)
+
+
+def _urls(history):
+    return [s["url"] for s in history.domain_scans("example.com")]
+
+
+def test_scans_past_retention_are_pruned_on_open(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    clock = Clock()
+    history = ScanHistory(path, retention_days=30, clock=clock)
+    _record(history, "http://example.com/old", scanned_at=clock.now - 31 * DAY, key="old")
+    _record(history, "http://example.com/new", scanned_at=clock.now - 29 * DAY, key="new")
+    assert len(_urls(history)) == 2
+
+    reopened = ScanHistory(path, retention_days=30, clock=clock)
+    assert _urls(reopened) == ["http://example.com/new"]
+    assert reopened.stored_analysis("http://example.com/new", "new") is not None
+    assert reopened._db.execute("SELECT analysis_key FROM analyses").fetchall() == [("new",)]
+
+
+def test_recording_prunes_periodically(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan_history, "PRUNE_EVERY", 3)
+    clock = Clock()
+    history = ScanHistory(str(tmp_path / "history.sqlite3"), retention_days=1, clock=clock)
+    _record(history, "http://example.com/a")
+    clock.now += 2 * DAY
+    _record(history, "http://example.com/b")
+    assert len(_urls(history)) == 2
+    _record(history, "http://example.com/c")
+    assert _urls(history) == ["http://example.com/c", "http://example.com/b"]
+
+
+def test_zero_retention_keeps_everything(tmp_path):
+    clock = Clock()
+    history = ScanHistory(str(tmp_path / "history.sqlite3"), retention_days=0, clock=clock)
+    _record(history, "http://example.com/a", scanned_at=1)
+    assert history.prune_expired() == 0
+    assert _urls(history) == ["http://example.com/a"]
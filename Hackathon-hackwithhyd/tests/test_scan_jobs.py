@@ -0,0 +1,96 @@
+import asyncio
+import types
+
+from services import scan_jobs
+from services.scan_jobs import DONE, JOB_TTL, JobQueue
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Runner:
+    """run() for a JobQueue: records URLs in the order they start, finishes when released."""
+
+    def __init__(self):
+        self.started = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, url):
+        self.started.append(url)
+        await self.release.wait()
+        return {"url": url}
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_same_url_coalesces_into_one_job():
+    async def scenario():
+        runner = Runner()
+        queue = JobQueue(runner, workers=1)
+        first, attached_first = queue.submit("http://Example.com/a#x")
+        second, attached_second = queue.submit("http://example.com/a")
+        assert second is first and (attached_first, attached_second) == (False, True)
+        assert first.submissions == 2
+
+        runner.release.set()
+        await first.wait(1)
+        await queue.stop()
+        return runner, first
+
+    runner, job = asyncio.run(scenario())
+    assert runner.started == ["http://Example.com/a#x"]
+    assert job.status == DONE
+
+
+def test_higher_priority_resubmit_runs_first():
+    async def scenario():
+        runner = Runner()
+        queue = JobQueue(runner, workers=1)
+        blocker, _ = queue.submit("http://example.com/blocker")
+        await _settle()  # the only worker is now busy
+        queue.submit("http://example.com/normal")
+        low, _ = queue.submit("http://example.com/low", priority="low")
+        bumped, attached = queue.submit("http://example.com/low", priority="high")
+        assert bumped is low and attached and low.priority == "high"
+
+        runner.release.set()
+        for job in list(queue._jobs.values()):
+            await job.wait(1)
+        await _settle()
+        await queue.stop()
+        return runner
+
+    runner = asyncio.run(scenario())
+    # the stale low-priority entry is skipped, so the job runs once
+    assert runner.started == ["http://example.com/blocker", "http://example.com/low", "http://example.com/normal"]
+
+
+def test_finished_jobs_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scan_jobs, "time", types.SimpleNamespace(time=clock))
+
+    async def scenario():
+        runner = Runner()
+        runner.release.set()
+        queue = JobQueue(runner, workers=1)
+        job, _ = queue.submit("http://example.com/a")
+        await job.wait(1)
+        await _settle()
+
+        clock.now += JOB_TTL
+        queue.submit("http://example.com/b")
+        assert queue.get(job.id) is job
+        clock.now += 1
+        queue.submit("http://example.com/c")
+        assert queue.get(job.id) is None
+        await queue.stop()
+
+    asyncio.run(scenario())
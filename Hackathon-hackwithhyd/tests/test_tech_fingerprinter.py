@@ -0,0 +1,14 @@
+from services.tech_fingerprinter import detect_technologies_from_page
+
+
+def test_nested_plugin_path_is_not_hidden_by_its_parent_path():
+    html = '<link rel="stylesheet" href="/wp-content/plugins/woocommerce/assets/x.css">'
+    techs = detect_technologies_from_page(html)
+    assert "WooCommerce" in techs
+    assert "WordPress" in techs
+
+
+def test_headers_cookies_and_scripts():
+    html = '<script src="/js/jquery.min.js"></script>'
+    techs = detect_technologies_from_page(html, {"Server": "nginx", "X-Powered-By": "PHP/8.1"}, ["PHPSESSID"])
+    assert {"jQuery", "Nginx", "PHP"} <= set(techs)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from api.risk_api import app
+from services import cve_lookup
+
+TECHS = ["WordPress", "PHP", "jQuery"]
+
+client = TestClient(app)
+
+
+def _tied_risk(store):
+    # few distinct values, so most pages start and end inside a run of ties; every 7th CVE is unscored
+    risk = np.round(np.nan_to_num(store.numeric["cvss_score"], nan=0.0) / 3)
+    risk[::7] = np.nan
+    return risk
+
+
+def _walk(techs, limit):
+    pages = [client.get("/vulnerabilities", params={"tech": techs, "limit": limit}).json()]
+    while pages[-1]["next_cursor"]:
+        r = client.get("/vulnerabilities", params={"cursor": pages[-1]["next_cursor"], "limit": limit})
+        assert r.status_code == 200
+        pages.append(r.json())
+    return pages
+
+
+def _brute_force(techs, scores):
+    store = cve_lookup.get_store()
+    risk = np.nan_to_num(scores, nan=-np.inf)
+    rows = [(-risk[row], row, tech) for tech, matched in cve_lookup.match_rows(techs).items() for row in matched]
+    return [(store.cve_id(row), tech) for _, row, tech in sorted(rows)]
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50])
+def test_cursor_walk_matches_full_sort(cve_store, limit):
+    cve_lookup.register_risk_scorer(_tied_risk)
+    pages = _walk(TECHS, limit)
+    walked = [(v["cve_id"], v["tech"]) for page in pages for v in page["vulnerabilities"]]
+
+    expected = _brute_force(TECHS, _tied_risk(cve_lookup.get_store()))
+    assert len(expected) > 3 * limit and any(r is None for page in pages for r in
+                                             (v["predicted_risk"] for v in page["vulnerabilities"]))
+    assert len(set(walked)) == len(walked)
+    assert walked == expected
+    assert all(page["total"] == len(expected) for page in pages)
+    assert all(len(page["vulnerabilities"]) == limit for page in pages[:-1])
+
+
+def test_cursor_walk_without_risk_model_follows_cvss(cve_store):
+    walked = [(v["cve_id"], v["tech"]) for page in _walk(TECHS, 25) for v in page["vulnerabilities"]]
+    assert walked == _brute_force(TECHS, cve_lookup.get_store().numeric["cvss_score"])